@@ -1,13 +1,38 @@
 import sys
 import gc
 import os
-import pandas as pd
-import numpy as np
+import re
+import string
+import struct
+import argparse
+import bz2
+import contextlib
 import csv
+import gzip
+import hashlib
+import importlib
+import io
+import json
+import logging
+import logging.handlers
+import lzma
+import queue
+import shutil
 import subprocess
-import openpyxl
-import cv2
-import natsort
+import tarfile
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.error
+import urllib.parse
+import urllib.request
+import xml.etree.ElementTree as ElementTree
+import zipfile
+import zlib
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from PyQt6.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -30,34 +55,1089 @@ from PyQt6.QtCore import (
     Qt
 )
 
-# release_memory 装饰器函数
-# 用于手动触发垃圾回收，释放内存资源
-# 在函数执行完成后调用gc.collect()，防止大型文件处理时内存泄漏
-# 定义一个装饰器，用于释放内存资源
-def release_memory(func):
-    def wrapper(*args, **kwargs):
-        try:
-            result = func(*args, **kwargs)
-            gc.collect()  # 手动触发垃圾回收
-            return result
-        except Exception as e:
-            print(f"Memory release error: {e}")
-            return None
-    return wrapper
-
 
-# --- reserved for extension ---
-# 预留的插件基础类，可扩展
+# LazyModule 类
+# 延迟导入的模块代理：首次访问属性时才真正 import，并把模块全局名替换为真实模块，之后不再经过代理
+# pandas、NumPy、OpenCV、openpyxl、natsort 导入耗时数秒，延迟到处理器第一次运行（或后台预热）时再加载
+class LazyModule:
+    _lock = threading.Lock()
+
+    def __init__(self, module_name, alias):
+        self._module_name = module_name
+        self._alias = alias
+        self._module = None
+
+    def load(self):
+        if self._module is None:
+            with LazyModule._lock:
+                if self._module is None:
+                    module = importlib.import_module(self._module_name)
+                    globals()[self._alias] = module
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+
+pd = LazyModule('pandas', 'pd')
+np = LazyModule('numpy', 'np')
+cv2 = LazyModule('cv2', 'cv2')
+openpyxl = LazyModule('openpyxl', 'openpyxl')
+natsort = LazyModule('natsort', 'natsort')
+LAZY_MODULES = [np, pd, cv2, openpyxl, natsort]
+
+
+# warm_up_heavy_modules 函数
+# 在后台线程中预先加载科学计算模块，用户选择文件夹期间即可完成导入
+def warm_up_heavy_modules():
+    # 显式的 import 语句让 PyInstaller 打包时能发现这些依赖
+    import numpy, pandas, cv2, openpyxl, natsort  # noqa: F401
+    for module in LAZY_MODULES:
+        module.load()
+
+
+# FA 采样默认参数
+# FA_SAMPLE_RATE 为短视频的默认采样率（Hz），长视频（超过 FA_LONG_VIDEO_SECONDS）使用 FA_LONG_VIDEO_SAMPLE_RATE
+# SEEK_GAP_SECONDS 为顺序 grab() 跳帧与关键帧 seek 之间的切换阈值（秒）
+FA_SAMPLE_RATE = 1.0
+# FA 输出中各区域列的名称与顺序
+FA_REGIONS = ('top_left', 'top_right', 'bottom_left', 'bottom_right')
+FA_LONG_VIDEO_SECONDS = 600
+FA_LONG_VIDEO_SAMPLE_RATE = 0.2
+SEEK_GAP_SECONDS = 2.0
+# 视频内并行：分析时长不少于 FA_SHARD_MIN_SECONDS 的视频按时间分片，由 FA_WORKERS 个线程同时解码
+FA_WORKERS = max(1, os.cpu_count() or 1)
+FA_SHARD_MIN_SECONDS = 300
+# FA 解码后端：默认 'opencv'，保证同一视频在不同机器上的结果一致（与是否安装 ffmpeg 无关）
+# 'ffmpeg' / 'auto' 需显式指定：使用 ffmpeg 管道按同一帧号规划解码，区域均值与 OpenCV 解码约有 1% 的差异，不适用时回退 OpenCV
+FA_BACKEND = 'opencv'
+FFMPEG_BINARY = 'ffmpeg'
+
+
+# 日志参数：合并发送到界面的时间片（秒）、界面日志保留的行数、输出文件夹中的滚动日志文件
+LOG_FLUSH_SECONDS = 0.2
+LOG_VIEW_LINES = 5000
+LOG_FILE_NAME = 'plateletpro.log'
+# 分片运行各自写入的日志文件（多个节点同时滚动同一个日志文件会互相覆盖），由 merge_shards 合并到 LOG_FILE_NAME
+SHARD_LOG_FILE_PATTERN = 'plateletpro.shard{index}.log'
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+LOG_FILE_BACKUPS = 3
+LOG_FILE_FORMAT = '%(asctime)s %(levelname)s %(message)s'
+
+# 处理函数统一通过该 logger 输出，由 RunLogHandler 转发到当前运行的 LogChannel
+logger = logging.getLogger('plateletpro')
+logger.setLevel(logging.INFO)
+
+
+# LogChannel 类
+# 一次运行的日志通道：消息先进入缓冲区，由后台线程每 interval 秒合并为一条多行文本交给 sink（通常是 update_log 信号）
+# 同时通过队列异步写入输出文件夹中的滚动日志文件，写文件不占用处理线程和界面线程
+class LogChannel:
+    active = set()  # 正在运行的通道；没有日志上下文的线程在只有一个通道时写入该通道
+
+    def __init__(self, sink, log_path=None, interval=LOG_FLUSH_SECONDS):
+        self.sink = sink
+        self.interval = interval
+        self._lines = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher = None
+        self._listener = None
+        self._queue = None
+        if log_path is not None:
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_path, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding='utf-8')
+            file_handler.setFormatter(logging.Formatter(LOG_FILE_FORMAT))
+            self._queue = queue.SimpleQueue()
+            self._listener = logging.handlers.QueueListener(self._queue, file_handler)
+
+    def start(self):
+        if self._listener is not None:
+            self._listener.start()
+        self._flusher = threading.Thread(target=self._run_flusher, daemon=True)
+        self._flusher.start()
+        LogChannel.active.add(self)
+        return self
+
+    def _run_flusher(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def write(self, message, level=logging.INFO):
+        with self._lock:
+            self._lines.append(message)
+        if self._queue is not None:
+            self._queue.put_nowait(logging.makeLogRecord({
+                'name': logger.name, 'levelno': level, 'levelname': logging.getLevelName(level),
+                'msg': message, 'created': time.time()}))
+
+    def flush(self):
+        with self._lock:
+            lines, self._lines = self._lines, []
+        if lines:
+            self.sink('\n'.join(lines))
+
+    def close(self):
+        LogChannel.active.discard(self)
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        if self._listener is not None:
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+
+
+# RunLogHandler 类
+# 把处理函数的日志记录转发到当前线程所属运行的 LogChannel（由 log_context.channel 指定）
+# 服务器模式下多个运行并发时，各自的日志互不混杂
+class RunLogHandler(logging.Handler):
+    def emit(self, record):
+        channel = getattr(log_context, 'channel', None)
+        if channel is None and len(LogChannel.active) == 1:
+            channel = next(iter(LogChannel.active), None)
+        if channel is not None:
+            channel.write(self.format(record), record.levelno)
+
+
+log_context = threading.local()
+logger.addHandler(RunLogHandler())
+
+
+# JobCost 命名元组
+# 处理器对单个文件的开销估计：work 为相对工作量（约等于需要处理的像素数或字节数），memory 为峰值内存估计（字节）
+JobCost = namedtuple('JobCost', ['work', 'memory'])
+
+# 处理器的资源类型，供调度器选择执行器
+RESOURCE_CPU = 'cpu'
+RESOURCE_IO = 'io'
+RESOURCE_SUBPROCESS = 'subprocess'
+
+
+# PluginBase 类
+# 处理器插件基础类：声明支持的扩展名、内容嗅探、开销估计与资源类型
+# 子类实现 process()；batch 为 True 的处理器改为实现 process_batch()，由调度器收集整个文件夹后一次处理
 class PluginBase:
-    """预留插件基础类"""
+    """处理器插件基础类"""
+    name = ''                  # 处理器名称
+    extensions = ()            # 支持的扩展名（小写，含点）
+    count_keys = ()            # 处理成功后递增的 file_type_counts 键
+    output_suffix = ''         # 输出文件名后缀：output-[原文件名][output_suffix]
+    resource = RESOURCE_CPU    # 'cpu' / 'io' / 'subprocess'
+    priority = 0               # 同一扩展名有多个处理器时，数值小的先嗅探
+    batch = False
+    results_module = None      # 启用结果库时写入的模块分区名；None 表示始终写出单独的输出文件
+    dedup = True               # 内容相同的输入只处理一次，其余副本由 materialize_duplicate 生成输出
+    heavy = False              # 大作业：内存紧张时暂缓放行（估计内存超过 MEMORY_HEAVY_JOB_BYTES 的作业也按大作业处理）
+
     def __init__(self):
         pass
 
-# 预留的插件基础类，可扩展
+    def sniff(self, file_path):
+        """内容嗅探：扩展名匹配后进一步确认文件内容是否由本处理器处理"""
+        return True
+
+    def estimate_cost(self, file_path):
+        size = input_stat(file_path)[0]
+        return JobCost(work=size, memory=size * 4)
+
+    def output_path(self, file_path, output_folder):
+        return os.path.join(output_folder, f"output-{os.path.splitext(os.path.basename(file_path))[0]}{self.output_suffix}")
+
+    def process(self, file_path, output_folder, runner=None):
+        """处理单个文件，返回输出文件路径"""
+        raise NotImplementedError
+
+    def results_store(self, runner):
+        """运行启用了结果库且本处理器支持时返回 ResultsStore，否则返回 None"""
+        if self.results_module is None:
+            return None
+        return getattr(runner, 'results_store', None)
+
+    def append_results(self, runner, output_folder, output_file_path, df):
+        """把结果行写入结果库，分区为相对运行输出文件夹的路径，file 列为名义输出文件名"""
+        folder = os.path.relpath(output_folder, runner.output_folder)
+        runner.results_store.append(self.results_module, folder, os.path.basename(output_file_path), df)
+
+    def copy_results(self, runner, source_output, output_file_path, **updates):
+        """在结果库中把 source_output 的结果行复制为 output_file_path 的结果，updates 中的列替换为新值"""
+        runner.results_store.copy(self.results_module,
+                                  os.path.relpath(os.path.dirname(source_output), runner.output_folder),
+                                  os.path.basename(source_output),
+                                  os.path.relpath(os.path.dirname(output_file_path), runner.output_folder),
+                                  os.path.basename(output_file_path), **updates)
+
+    def materialize_duplicate(self, runner, source_path, source_output, file_path, output_folder):
+        """为与 source_path 内容相同的 file_path 生成输出（复制 source_path 的结果），返回输出文件路径"""
+        output_file_path = self.output_path(file_path, output_folder)
+        if self.results_store(runner) is not None:
+            self.copy_results(runner, source_output, output_file_path)
+        else:
+            link_or_copy(source_output, output_file_path)
+        return output_file_path
+
+    def process_batch(self, jobs, runner=None):
+        """批量处理 [(file_path, output_path)]，返回 {file_path: None 或错误信息}"""
+        results = {}
+        for file_path, output_path in jobs:
+            try:
+                self.process(file_path, os.path.dirname(output_path), runner)
+                results[file_path] = None
+            except Exception as e:
+                results[file_path] = str(e)
+        return results
+
+    def log(self, runner, message):
+        if runner is not None:
+            runner.log(message)
+        else:
+            logger.info(message)
+
+
+# VideoProcessorPlugin 类
+# 视频处理器基础类：按 分辨率 × 帧数 估计开销；压缩包中的视频不为估计开销而解压，按文件大小估计
 class VideoProcessorPlugin(PluginBase):
-    def process(self, video_path):
+    heavy = True
+
+    def estimate_cost(self, file_path):
+        if isinstance(file_path, ArchiveMember):
+            return super().estimate_cost(file_path)
+        cap = cv2.VideoCapture(file_path)
+        width = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
+        height = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+        frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        cap.release()
+        frame_bytes = int(width * height * 3) or os.path.getsize(file_path)
+        return JobCost(work=frame_bytes * max(frames, 1), memory=frame_bytes * 8)
+
+
+# ProcessorRegistry 类
+# 处理器注册表：按扩展名索引处理器，按优先级依次嗅探内容选出处理器
+# 第三方插件通过 entry point 组 "plateletpro.processors" 注册，在首次查询时才加载
+class ProcessorRegistry:
+    ENTRY_POINT_GROUP = 'plateletpro.processors'
+
+    def __init__(self):
+        self._by_extension = {}
+        self._entry_points_loaded = False
+
+    def register(self, processor):
+        """注册处理器类或实例，可作为类装饰器使用"""
+        instance = processor() if isinstance(processor, type) else processor
+        for extension in instance.extensions:
+            candidates = self._by_extension.setdefault(extension.lower(), [])
+            candidates.append(instance)
+            candidates.sort(key=lambda p: p.priority)
+        return processor
+
+    def load_entry_points(self):
+        if self._entry_points_loaded:
+            return
+        self._entry_points_loaded = True
+        try:
+            from importlib.metadata import entry_points
+            plugins = entry_points(group=self.ENTRY_POINT_GROUP)
+        except Exception as e:
+            logger.warning(f"读取插件入口失败: {e}")
+            return
+        for entry_point in plugins:
+            try:
+                self.register(entry_point.load())
+            except Exception as e:
+                logger.warning(f"加载插件 {entry_point.name} 失败: {e}")
+
+    def extensions(self):
+        self.load_entry_points()
+        return tuple(self._by_extension)
+
+    def processors(self):
+        self.load_entry_points()
+        unique = []
+        for candidates in self._by_extension.values():
+            unique.extend(p for p in candidates if p not in unique)
+        return unique
+
+    def find(self, file_path):
+        """返回处理该文件的处理器，扩展名不支持或所有处理器都拒绝时返回 None"""
+        self.load_entry_points()
+        extension = os.path.splitext(file_path)[1].lower()
+        for processor in self._by_extension.get(extension, []):
+            if processor.sniff(file_path):
+                return processor
+        return None
+
+
+PROCESSOR_REGISTRY = ProcessorRegistry()
+register_processor = PROCESSOR_REGISTRY.register
+
+
+# 结果库参数：输出文件夹中的数据集目录、缓冲多少行后写出一个 Parquet 分片；设置环境变量后图形界面启用结果库
+RESULTS_STORE_DIR = '.plateletpro-results'
+RESULTS_STORE_FLUSH_ROWS = 50000
+RESULTS_STORE_ENV = 'PLATELETPRO_RESULTS_STORE'
+
+
+# ResultsStore 类
+# 可选的运行级列式结果库（需要 pyarrow）：TEG 曲线与 Transwell 结果不再逐个写出 output-*.csv，
+# 而是按 module=<模块>/folder=<相对文件夹> 分区缓冲，攒够 RESULTS_STORE_FLUSH_ROWS 行或运行结束时写成 Parquet 分片
+# visualized-* 与 summarized-* 文件直接从结果库按分区读取生成；目录可用 pyarrow.dataset 以 hive 分区方式做跨运行分析
+# 每行带有 file（名义输出文件名）与 batch（写入时间戳）列，同一文件被重新处理时读取端只保留最新一次的结果
+class ResultsStore:
+    def __init__(self, output_folder):
+        self.root = os.path.join(output_folder, RESULTS_STORE_DIR)
+        self.run_id = f"{int(time.time())}-{os.getpid()}"
+        self._buffers = {}
+        self._rows = 0
+        self._part = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def available():
+        try:
+            importlib.import_module('pyarrow.parquet')
+            return True
+        except ImportError:
+            return False
+
+    @staticmethod
+    def exists(output_folder):
+        return os.path.isdir(os.path.join(output_folder, RESULTS_STORE_DIR))
+
+    def clear(self):
+        if os.path.isdir(self.root):
+            shutil.rmtree(self.root)
+
+    def partition_dir(self, module, folder):
+        return os.path.join(self.root, f'module={module}', f"folder={urllib.parse.quote(folder, safe='')}")
+
+    # ResultsStore.append 方法
+    # 追加一个文件的结果行（DataFrame），folder 为相对输出文件夹的路径
+    def append(self, module, folder, file, df):
+        df = df.assign(file=file, batch=time.time_ns())
+        with self._lock:
+            self._buffers.setdefault((module, os.path.normpath(folder)), []).append(df)
+            self._rows += len(df)
+            if self._rows >= RESULTS_STORE_FLUSH_ROWS:
+                self._flush_locked()
+
+    # ResultsStore.copy 方法
+    # 把一个文件已写入的结果行复制为另一个文件的结果（内容相同的重复输入），updates 中的列替换为新值
+    # 结果仍在缓冲区时直接复制，已写出时从分区的 Parquet 分片中按 file 列读取最新一批
+    def copy(self, module, folder, file, new_folder, new_file, **updates):
+        folder = os.path.normpath(folder)
+        with self._lock:
+            frames = [df for df in self._buffers.get((module, folder), []) if len(df) and df['file'].iat[0] == file]
+        if frames:
+            df = frames[-1]
+        else:
+            partition_dir = self.partition_dir(module, folder)
+            parts = [os.path.join(partition_dir, f) for f in os.listdir(partition_dir) if f.endswith('.parquet')] \
+                if os.path.isdir(partition_dir) else []
+            if not parts:
+                return
+            df = pd.concat([pd.read_parquet(part, filters=[('file', '==', file)]) for part in parts],
+                           ignore_index=True)
+            df = df[df['batch'] == df['batch'].max()]
+        self.append(module, new_folder, new_file, df.drop(columns=['file', 'batch']).assign(**updates))
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        parquet = importlib.import_module('pyarrow.parquet')
+        pyarrow = importlib.import_module('pyarrow')
+        for (module, folder), frames in self._buffers.items():
+            partition_dir = self.partition_dir(module, folder)
+            os.makedirs(partition_dir, exist_ok=True)
+            table = pyarrow.Table.from_pandas(pd.concat(frames, ignore_index=True), preserve_index=False)
+            part_path = os.path.join(partition_dir, f'part-{self.run_id}-{self._part}.parquet')
+            parquet.write_table(table, part_path + '.tmp')
+            os.replace(part_path + '.tmp', part_path)
+            self._part += 1
+        self._buffers = {}
+        self._rows = 0
+
+    # ResultsStore.read 方法
+    # 读取模块的结果，返回 {相对文件夹: DataFrame}；folders 给定时只读取这些分区
+    def read(self, module, folders=None):
+        module_dir = os.path.join(self.root, f'module={module}')
+        if not os.path.isdir(module_dir):
+            return {}
+        wanted = None if folders is None else {os.path.normpath(folder) for folder in folders}
+        results = {}
+        for partition in os.listdir(module_dir):
+            if not partition.startswith('folder='):
+                continue
+            folder = urllib.parse.unquote(partition[len('folder='):])
+            if wanted is not None and folder not in wanted:
+                continue
+            partition_dir = os.path.join(module_dir, partition)
+            parts = [os.path.join(partition_dir, f) for f in os.listdir(partition_dir) if f.endswith('.parquet')]
+            if not parts:
+                continue
+            df = pd.concat([pd.read_parquet(part) for part in parts], ignore_index=True)
+            # 同一文件多次处理时只保留最新一批结果
+            latest = df.groupby('file')['batch'].transform('max')
+            results[folder] = df[df['batch'] == latest]
+        return results
+
+
+# 作为虚拟文件夹读取的压缩包扩展名（小写）；压缩包对应的输出文件夹名去掉扩展名，例如 data.zip -> data
+ARCHIVE_EXTENSIONS = ('.tar.gz', '.tar.bz2', '.tar.xz', '.tgz', '.tbz2', '.txz', '.tar', '.zip')
+# 压缩包中忽略的成员：macOS 打包时附带的资源分支文件
+ARCHIVE_IGNORED_PREFIXES = ('__MACOSX/',)
+
+
+# archive_folder_name 函数
+# 文件名是支持的压缩包时返回去掉压缩包扩展名后的文件夹名，否则返回 None
+def archive_folder_name(file_name):
+    lower = file_name.lower()
+    for extension in ARCHIVE_EXTENSIONS:
+        if lower.endswith(extension) and len(file_name) > len(extension):
+            return file_name[:-len(extension)]
+    return None
+
+
+# ArchiveReader 类
+# 只读打开一个 zip / tar(.gz/.bz2/.xz) 压缩包，把其中的文件作为虚拟文件夹中的文件按需读入内存，不解压到磁盘
+# 压缩的 tar 不支持随机访问，第一次读取成员时把解压后的 tar 顺序写入一个匿名临时文件，之后按偏移读取
+# 多个工作线程共享同一个压缩包，读取成员时串行化
+class ArchiveReader:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._zip = None
+        self._tar = None
+        self._spool = None
+        self._decompress = None  # 压缩 tar 的解压函数，未压缩的 tar 与 zip 为 None
+        self.members = {}  # 成员路径（/ 分隔）-> (大小, 修改时间)
+        self._names = {}   # 成员路径 -> 压缩包中记录的原始名称
+        if zipfile.is_zipfile(path):
+            self._zip = zipfile.ZipFile(path)
+            for info in self._zip.infolist():
+                if not info.is_dir():
+                    self._add_member(info.filename, info.file_size, time.mktime(info.date_time + (0, 0, -1)))
+        else:
+            with open(path, 'rb') as f:
+                magic = f.read(2)
+            self._decompress = {b'\x1f\x8b': gzip.open, b'BZ': bz2.open, b'\xfd7': lzma.open}.get(magic)
+            self._tar = tarfile.open(path)
+            for info in self._tar.getmembers():
+                if info.isfile():
+                    self._add_member(info.name, info.size, info.mtime)
+
+    def _add_member(self, original, size, mtime):
+        name = original.replace('\\', '/')
+        normalized = os.path.normpath(name).replace(os.sep, '/')
+        # 跳过绝对路径与指向压缩包外的成员，以及资源分支文件
+        if os.path.isabs(name) or normalized.startswith('../') or normalized == '..' or \
+                name.startswith(ARCHIVE_IGNORED_PREFIXES) or os.path.basename(normalized).startswith('._'):
+            return
+        self.members[normalized] = (size, mtime)
+        self._names[normalized] = original
+
+    # ArchiveReader.folders 方法
+    # 返回压缩包内全部成员所在的文件夹（/ 分隔的相对路径，根为 ''）
+    def folders(self):
+        folders = {''}
+        for member in self.members:
+            parts = member.split('/')[:-1]
+            folders.update('/'.join(parts[:i]) for i in range(1, len(parts) + 1))
+        return folders
+
+    def _open_tar_for_read(self):
+        if self._decompress is None or self._spool is not None:
+            return
+        self._spool = tempfile.TemporaryFile(prefix='plateletpro-archive-')
+        with self._decompress(self.path, 'rb') as source:
+            shutil.copyfileobj(source, self._spool, 1024 * 1024)
+        self._spool.seek(0)
+        self._tar.close()
+        self._tar = tarfile.open(fileobj=self._spool, mode='r:')
+
+    def read(self, member):
+        """读取成员的全部内容（bytes）"""
+        name = self._names[member]
+        with self._lock:
+            if self._zip is not None:
+                return self._zip.read(name)
+            self._open_tar_for_read()
+            f = self._tar.extractfile(name)
+            if f is None:
+                raise ValueError(f"{self.path} 中的 {member} 不是普通文件")
+            return f.read()
+
+    def close(self):
+        with self._lock:
+            for handle in (self._zip, self._tar, self._spool):
+                if handle is not None:
+                    handle.close()
+            self._zip = self._tar = self._spool = None
+
+
+# ArchiveMember 类
+# 压缩包成员的虚拟路径：字符串值为 <压缩包路径>/<成员路径>，可以像普通文件路径一样取文件名、扩展名、相对路径
+# 读取内容需通过 open_input / input_source / local_input_path，而不是直接交给 open() 或 OpenCV
+class ArchiveMember(str):
+    def __new__(cls, reader, member):
+        self = super().__new__(cls, os.path.join(reader.path, *member.split('/')))
+        self.reader = reader
+        self.member = member
+        return self
+
+    def read_bytes(self):
+        return self.reader.read(self.member)
+
+
+# archive_folders 函数
+# 返回压缩包内的文件夹列表（/ 分隔的相对路径，根为 ''）；压缩包无法读取时返回空列表
+def archive_folders(archive_path):
+    try:
+        reader = ArchiveReader(archive_path)
+    except (OSError, zipfile.BadZipFile, tarfile.TarError):
+        return []
+    try:
+        return reader.folders()
+    finally:
+        reader.close()
+
+
+# input_stat 函数
+# 返回输入文件的 (大小, 修改时间)；压缩包成员取压缩包中记录的值
+def input_stat(file_path):
+    if isinstance(file_path, ArchiveMember):
+        return file_path.reader.members[file_path.member]
+    stat = os.stat(file_path)
+    return stat.st_size, stat.st_mtime
+
+
+# open_input 函数
+# 打开输入文件；压缩包成员从内存缓冲区读取。mode 为 'r' 时按 encoding / errors 解码为文本
+def open_input(file_path, mode='rb', encoding=None, errors=None):
+    if not isinstance(file_path, ArchiveMember):
+        return open(file_path, mode, encoding=encoding, errors=errors)
+    buffer = io.BytesIO(file_path.read_bytes())
+    if 'b' in mode:
+        return buffer
+    return io.TextIOWrapper(buffer, encoding=encoding, errors=errors)
+
+
+# input_source 函数
+# 返回可直接交给 pandas 读取函数的输入：普通文件返回路径，压缩包成员返回内存缓冲区
+def input_source(file_path):
+    if isinstance(file_path, ArchiveMember):
+        return io.BytesIO(file_path.read_bytes())
+    return file_path
+
+
+# local_input_path 函数
+# 上下文管理器：需要真实文件路径的处理（视频解码、ffmpeg、obabel）使用
+# 普通文件直接返回原路径；压缩包成员写入临时文件夹（保留原文件名），退出时删除
+@contextlib.contextmanager
+def local_input_path(file_path):
+    if not isinstance(file_path, ArchiveMember):
+        yield file_path
+        return
+    temp_dir = tempfile.mkdtemp(prefix='plateletpro-member-')
+    try:
+        local_path = os.path.join(temp_dir, os.path.basename(file_path))
+        with open(local_path, 'wb') as f:
+            f.write(file_path.read_bytes())
+        yield local_path
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+# 内容去重参数：部分哈希读取文件首尾各多少字节
+# 副本的输出默认复制；硬链接更省空间，但原输出之后被原地重写（续跑、监视模式重新处理）时副本会随之改变
+DEDUP_PARTIAL_BYTES = 64 * 1024
+DEDUP_HARDLINK = False
+
+
+# content_digest 函数
+# 计算输入文件内容的 BLAKE2b 摘要；partial 为 True 时只读取文件首尾各 DEDUP_PARTIAL_BYTES 字节（小文件读取全部内容）
+def content_digest(file_path, partial=False):
+    digest = hashlib.blake2b(digest_size=20)
+    with open_input(file_path, 'rb') as f:
+        if partial and input_stat(file_path)[0] > 2 * DEDUP_PARTIAL_BYTES:
+            digest.update(f.read(DEDUP_PARTIAL_BYTES))
+            f.seek(-DEDUP_PARTIAL_BYTES, os.SEEK_END)
+            digest.update(f.read(DEDUP_PARTIAL_BYTES))
+        else:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+# find_duplicate_groups 函数
+# 找出内容完全相同的输入文件，返回 [[file_path, ...], ...]，每组至少两个文件并保持输入顺序
+# 先按大小分组；大小相同的再比较首尾部分哈希，部分哈希也相同时才计算完整哈希；大小唯一的文件不读取内容
+def find_duplicate_groups(file_paths, workers=1):
+    def digest_or_none(file_path, partial):
+        try:
+            return content_digest(file_path, partial)
+        except (OSError, ValueError, KeyError):
+            return None  # 无法读取的文件视为唯一，由处理器报告错误
+
+    def regroup(groups, partial):
+        paths = [file_path for group in groups for file_path in group]
+        digests = dict(zip(paths, executor.map(lambda file_path: digest_or_none(file_path, partial), paths)))
+        regrouped = []
+        for group in groups:
+            by_digest = {}
+            for file_path in group:
+                if digests[file_path] is not None:
+                    by_digest.setdefault(digests[file_path], []).append(file_path)
+            regrouped.extend(g for g in by_digest.values() if len(g) > 1)
+        return regrouped
+
+    by_size = {}
+    for file_path in file_paths:
+        by_size.setdefault(input_stat(file_path)[0], []).append(file_path)
+    groups = [group for group in by_size.values() if len(group) > 1]
+    if not groups:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        groups = regroup(groups, partial=True)
+        # 小文件的部分哈希已覆盖全部内容，不再计算完整哈希
+        small = [g for g in groups if input_stat(g[0])[0] <= 2 * DEDUP_PARTIAL_BYTES]
+        large = [g for g in groups if input_stat(g[0])[0] > 2 * DEDUP_PARTIAL_BYTES]
+        return small + (regroup(large, partial=False) if large else [])
+
+
+# link_or_copy 函数
+# 把已有的输出文件物化到新位置：DEDUP_HARDLINK 为 True 时优先创建硬链接，不支持（跨文件系统等）时复制
+def link_or_copy(source, destination):
+    if os.path.abspath(source) == os.path.abspath(destination):
+        return
+    os.makedirs(os.path.dirname(destination) or '.', exist_ok=True)
+    if os.path.lexists(destination):
+        os.remove(destination)
+    if DEDUP_HARDLINK:
+        try:
+            os.link(source, destination)
+            return
+        except OSError:
+            pass
+    shutil.copy2(source, destination)
+
+
+# ProcessingCancelled 异常
+# 用户取消处理时由检查点抛出，正在运行的作业在下一个检查点处停止
+class ProcessingCancelled(Exception):
+    pass
+
+
+# 分片完成标记文件名：{index} 从 0 开始；所有分片的标记都存在后才能执行合并
+SHARD_MARKER_PATTERN = '.plateletpro-shard-{index}of{count}.json'
+
+
+# parse_shard 函数
+# 解析 "i/N" 形式的分片参数（i 从 0 开始），返回 (i, N)
+def parse_shard(text):
+    index, _, count = text.partition('/')
+    index, count = int(index), int(count)
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"无效的分片参数: {text}（应为 i/N 且 0 <= i < N）")
+    return index, count
+
+
+# file_in_shard 函数
+# 按输入文件相对路径的 CRC32 做确定性哈希分区，不同机器、不同进程得到相同的划分
+# 不使用内置 hash()，因为字符串哈希在每个进程中随机化
+def file_in_shard(relative_path, shard):
+    index, count = shard
+    key = relative_path.replace(os.sep, '/').encode('utf-8')
+    return zlib.crc32(key) % count == index
+
+
+# RunJournal 类
+# 持久化的运行日志（JSON Lines，保存在输出文件夹中），每完成一个文件追加一行并立即写盘
+# 处理中断（取消或崩溃）后重新运行时，跳过大小与修改时间均未变化、且输出仍存在的已完成文件
+# 整个运行正常结束后删除日志，下一次运行从头开始
+class RunJournal:
+    FILE_NAME = '.plateletpro-journal.jsonl'
+
+    def __init__(self, input_folder, output_folder, shard=None):
+        self.input_folder = os.path.abspath(input_folder)
+        # 分片运行时每个分片使用各自的日志文件，多个进程共享输出文件夹时互不覆盖
+        file_name = self.FILE_NAME if shard is None else f'.plateletpro-journal-{shard[0]}of{shard[1]}.jsonl'
+        self.path = os.path.join(output_folder, file_name)
+        self.completed = {}
+        self._file = None
+
+    def exists(self):
+        return os.path.isfile(self.path)
+
+    def load(self):
+        """读取已有日志；日志属于其他输入文件夹或已损坏的行会被忽略"""
+        self.completed = {}
+        if not self.exists():
+            return self.completed
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # 崩溃时可能留下半行
+                if 'input_folder' in entry:
+                    if entry['input_folder'] != self.input_folder:
+                        self.completed = {}
+                        return self.completed
+                    continue
+                self.completed[entry['file']] = entry
+        return self.completed
+
+    def open(self, resume):
+        if not resume or not self.exists():
+            self.completed = {}
+            self._file = open(self.path, 'w', encoding='utf-8')
+            self._write({'input_folder': self.input_folder, 'started': time.time()})
+        else:
+            self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def _key(self, file_path):
+        return os.path.relpath(os.path.abspath(file_path), self.input_folder)
+
+    def is_completed(self, file_path):
+        entry = self.completed.get(self._key(file_path))
+        if entry is None:
+            return None
+        # 写入结果库的文件没有单独的输出文件，只要求结果库仍然存在
+        output_dir = os.path.dirname(self.path)
+        if not (os.path.exists(entry['output']) or entry.get('stored') and ResultsStore.exists(output_dir)):
+            return None
+        size, mtime = input_stat(file_path)
+        if entry['size'] != size or entry['mtime'] != mtime:
+            return None
+        return entry
+
+    def record(self, file_path, output_file_path, processor_name, stored=False):
+        size, mtime = input_stat(file_path)
+        entry = {'file': self._key(file_path), 'size': size, 'mtime': mtime,
+                 'output': output_file_path, 'processor': processor_name}
+        if stored:
+            entry['stored'] = True
+        self.completed[entry['file']] = entry
+        self._write(entry)
+
+    def close(self, finished):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if finished and self.exists():
+            os.remove(self.path)
+
+
+# ProcessingJob 命名元组
+# 调度器中的一个作业：单文件作业 file_path 为文件路径；批量作业 file_path 为 None，batch_jobs 为 [(file_path, output_path)]
+ProcessingJob = namedtuple('ProcessingJob', ['processor', 'file_path', 'output_folder', 'cost', 'batch_jobs'])
+
+# 调度器默认参数：内存预算占物理内存的比例，以及各资源类型的并发数
+MEMORY_BUDGET_FRACTION = 0.5
+SCHEDULER_WORKERS = {
+    RESOURCE_CPU: max(1, os.cpu_count() or 1),
+    RESOURCE_IO: min(32, 2 * (os.cpu_count() or 1)),
+    RESOURCE_SUBPROCESS: max(1, os.cpu_count() or 1),
+}
+
+
+# cpu_share 函数
+# 每个 CPU 作业内部还可使用的线程数：CPU 核数按 CPU 线程池的并发数均分，至少为 1
+def cpu_share(cpu_workers):
+    return max(1, (os.cpu_count() or 1) // max(1, cpu_workers))
+
+
+# total_memory_bytes 函数
+# 返回物理内存总量（字节），无法检测时按 8GB 计算
+def total_memory_bytes():
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
         pass
-# --- reserved for extension ---
+    if sys.platform == 'win32':
+        import ctypes
+
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [('dwLength', ctypes.c_ulong), ('dwMemoryLoad', ctypes.c_ulong),
+                        ('ullTotalPhys', ctypes.c_ulonglong), ('ullAvailPhys', ctypes.c_ulonglong),
+                        ('ullTotalPageFile', ctypes.c_ulonglong), ('ullAvailPageFile', ctypes.c_ulonglong),
+                        ('ullTotalVirtual', ctypes.c_ulonglong), ('ullAvailVirtual', ctypes.c_ulonglong),
+                        ('ullAvailExtendedVirtual', ctypes.c_ulonglong)]
+
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullTotalPhys
+    return 8 * 1024 ** 3
+
+
+# 内存监控参数：进程内存的采样间隔（秒），以及估计内存达到多少即视为大作业（内存紧张时暂缓放行）
+MEMORY_SAMPLE_SECONDS = 0.25
+MEMORY_HEAVY_JOB_BYTES = 256 * 1024 ** 2
+# 处理结果统计中列出的内存峰值最高的作业数
+MEMORY_REPORT_TOP = 5
+
+
+# psutil_process 函数
+# 返回本进程的 psutil.Process 对象（psutil 为可选依赖），未安装时返回 None；结果缓存，避免每次采样都重新尝试导入
+def psutil_process():
+    if not hasattr(psutil_process, 'process'):
+        try:
+            psutil_process.process = importlib.import_module('psutil').Process()
+        except ImportError:
+            psutil_process.process = None
+    return psutil_process.process
+
+
+# process_rss_bytes 函数
+# 返回本进程当前的常驻内存（RSS，字节）：优先使用 psutil，否则读取 /proc 或调用 Windows API；无法获取时返回 None
+def process_rss_bytes():
+    process = psutil_process()
+    if process is not None:
+        return process.memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if sys.platform == 'win32':
+        import ctypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', ctypes.c_ulong), ('PageFaultCount', ctypes.c_ulong),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(PROCESS_MEMORY_COUNTERS)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+    return None
+
+
+# is_heavy_job 函数
+# 判断作业是否为大作业：处理器声明为 heavy（视频），或估计内存达到 MEMORY_HEAVY_JOB_BYTES（例如很大的 TIFF）
+def is_heavy_job(job):
+    return job.processor.heavy or job.cost.memory >= MEMORY_HEAVY_JOB_BYTES
+
+
+# MemoryMonitor 类
+# 运行级内存监控：
+# 1. 后台线程每 MEMORY_SAMPLE_SECONDS 秒采样一次进程 RSS（无法获取 RSS 的平台改用 tracemalloc 统计 Python 分配）
+# 2. track() 记录每个作业运行期间的内存峰值与相对开始时的增长；并发运行时同一时刻的峰值由所有运行中的作业共享
+# 3. 作业结束时进程内存超出预算才调用 gc.collect()，不在每次调用后都做完整回收
+# 4. throttle() 供调度器判断内存是否紧张，决定是否暂缓放行新的大作业
+class MemoryMonitor:
+    def __init__(self, budget=None, interval=MEMORY_SAMPLE_SECONDS):
+        self.budget = budget or int(total_memory_bytes() * MEMORY_BUDGET_FRACTION)
+        self.interval = interval
+        self.source = 'rss' if process_rss_bytes() is not None else 'tracemalloc'
+        self.peak = 0
+        self.collections = 0
+        self.throttled = set()
+        self.jobs = []
+        self._active = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._owns_tracemalloc = False
+
+    def sample(self):
+        """采样一次当前内存（字节），同时更新运行峰值与所有运行中作业的峰值"""
+        if self.source == 'rss':
+            current = process_rss_bytes() or 0
+        else:
+            current = tracemalloc.get_traced_memory()[0]
+        with self._lock:
+            self.peak = max(self.peak, current)
+            for record in self._active.values():
+                record[1] = max(record[1], current)
+        return current
+
+    def start(self):
+        if self.source == 'tracemalloc' and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._sample_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample_loop(self):
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+
+    @contextlib.contextmanager
+    def track(self, label, processor_name):
+        """记录 with 块（一次处理器调用）期间的内存峰值；结束时超出预算则触发一次垃圾回收"""
+        token = object()
+        start = self.sample()
+        with self._lock:
+            self._active[token] = [start, start]
+        try:
+            yield
+        finally:
+            current = self.sample()
+            with self._lock:
+                start, peak = self._active.pop(token)
+                self.jobs.append({'file': label, 'processor': processor_name,
+                                  'peak_mb': round(peak / 1024 ** 2, 1),
+                                  'growth_mb': round(max(0, peak - start) / 1024 ** 2, 1)})
+            if current > self.budget:
+                gc.collect()
+                self.collections += 1
+
+    def throttle(self, job):
+        """当前内存加上作业的估计内存超出预算时返回 True（调度器暂缓放行该作业）"""
+        if self.sample() + job.cost.memory <= self.budget:
+            return False
+        self.throttled.add(id(job))
+        return True
+
+    def report(self, top=None):
+        """按峰值从大到小返回作业内存记录 [{'file', 'processor', 'peak_mb', 'growth_mb'}]"""
+        with self._lock:
+            jobs = sorted(self.jobs, key=lambda record: record['peak_mb'], reverse=True)
+        return jobs[:top] if top else jobs
+
+    def summary(self):
+        return (f"内存峰值 {self.peak / 1024 ** 2:.0f} MB（预算 {self.budget / 1024 ** 2:.0f} MB，"
+                f"{'RSS' if self.source == 'rss' else 'tracemalloc'}），"
+                f"超出预算触发垃圾回收 {self.collections} 次，因内存紧张暂缓放行 {len(self.throttled)} 个大作业")
+
+
+# configure_opencv_threads 函数
+# 按 CPU 线程池的并发数设置 OpenCV 内部线程数（cv2.setNumThreads 是进程级设置，整个进程只设置一次），
+# 避免 OpenCV 内部线程与作业线程叠加造成过度订阅；多个调度器并发运行时不再各自设置与恢复
+def configure_opencv_threads(cpu_workers):
+    with configure_opencv_threads.lock:
+        if not configure_opencv_threads.configured:
+            cv2.setNumThreads(cpu_share(cpu_workers))
+            configure_opencv_threads.configured = True
+
+
+configure_opencv_threads.lock = threading.Lock()
+configure_opencv_threads.configured = False
+
+
+# WorkerShares 类
+# 多个同时运行的调度器共享的本机并发额度（服务器模式）：每种资源类型的总并发数按当前活跃的调度器数量动态均分，
+# 至少为 1；只有一个任务在运行时独占全部额度，有任务开始或结束时，其他任务此后放行作业时按新的份额计算
+class WorkerShares:
+    def __init__(self, workers=None):
+        self.total = dict(SCHEDULER_WORKERS)
+        if workers:
+            self.total.update(workers)
+        self.active = 0
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def join(self):
+        """在 with 块内把调用方计为一个活跃的调度器"""
+        with self._lock:
+            self.active += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def limits(self):
+        """当前每个活跃调度器可使用的各资源类型并发数"""
+        with self._lock:
+            active = max(1, self.active)
+        return {kind: max(1, count // active) for kind, count in self.total.items()}
+
+
+# JobScheduler 类
+# 资源感知的作业调度器：
+# 1. 按估计工作量从小到大排序，小作业先完成，结果尽早出现
+# 2. 按处理器资源类型（cpu / io / subprocess）分配到各自的线程池，分别限制并发数
+# 3. 正在运行作业的估计内存之和不超过 memory_budget；空闲时即使超出预算也允许单个大作业运行
+# 4. 给定 monitor（MemoryMonitor）时，进程实际内存加上大作业的估计内存超出预算则暂缓放行该大作业，直到有作业完成
+# 5. 给定 shares（WorkerShares）时，各资源类型的并发数为与其他同时运行的调度器动态均分后的份额，每轮放行前重新计算
+# 6. 首次运行时按 CPU 线程池的总并发数设置 OpenCV 内部线程数（见 configure_opencv_threads）
+class JobScheduler:
+    def __init__(self, memory_budget=None, workers=None, monitor=None, shares=None):
+        self.memory_budget = memory_budget or int(total_memory_bytes() * MEMORY_BUDGET_FRACTION)
+        self.monitor = monitor
+        self.shares = shares
+        self.workers = dict(shares.total if shares is not None else SCHEDULER_WORKERS)
+        if workers and shares is None:
+            self.workers.update(workers)
+
+    def run(self, jobs, execute, on_done, checkpoint=None):
+        """
+        execute(job) 在线程池中执行并返回结果；on_done(job, result, error) 在调用 run 的线程中依次回调。
+        checkpoint 在每轮放行作业前调用：暂停时阻塞，取消时抛出 ProcessingCancelled，此后不再放行新作业。
+        """
+        pending = sorted(jobs, key=lambda job: job.cost.work)
+        executors = {kind: ThreadPoolExecutor(max_workers=n) for kind, n in self.workers.items()}
+        running = {}
+        running_by_kind = dict.fromkeys(self.workers, 0)
+        running_memory = 0
+
+        configure_opencv_threads(self.workers[RESOURCE_CPU])
+        with self.shares.join() if self.shares is not None else contextlib.nullcontext():
+            try:
+                while pending or running:
+                    if checkpoint is not None and pending:
+                        try:
+                            checkpoint()
+                        except ProcessingCancelled:
+                            pending.clear()
+                            if not running:
+                                break
+
+                    # 依次尝试放行等待中的作业：资源类型未满且内存预算足够
+                    limits = self.shares.limits() if self.shares is not None else self.workers
+                    index = 0
+                    while index < len(pending):
+                        job = pending[index]
+                        kind = job.processor.resource if job.processor.resource in executors else RESOURCE_CPU
+                        over_budget = running and running_memory + job.cost.memory > self.memory_budget
+                        throttled = (running and self.monitor is not None and is_heavy_job(job)
+                                     and not over_budget and self.monitor.throttle(job))
+                        if running_by_kind[kind] >= limits[kind] or over_budget or throttled:
+                            index += 1
+                            continue
+                        pending.pop(index)
+                        running[executors[kind].submit(execute, job)] = (job, kind)
+                        running_by_kind[kind] += 1
+                        running_memory += job.cost.memory
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job, kind = running.pop(future)
+                        running_by_kind[kind] -= 1
+                        running_memory -= job.cost.memory
+                        error = future.exception()
+                        on_done(job, None if error else future.result(), error)
+            finally:
+                for executor in executors.values():
+                    executor.shutdown(wait=True)
+
+
 # FileProcessorThread.run 方法
 # 文件处理线程的主执行方法
 # 初始化文件计数器和错误列表，然后递归处理所有文件夹
@@ -66,14 +1146,118 @@ class FileProcessorThread(QThread):
     update_log = pyqtSignal(str)
     processing_completed = pyqtSignal(list, dict, list)
 
-    def __init__(self, input_folder, output_folder):
+    def __init__(self, input_folder, output_folder, fa_sample_rate=None, fa_start_time=None, fa_end_time=None,
+                 fa_workers=FA_WORKERS, fa_backend=FA_BACKEND, contact_sheet_frames=0, resume=False, scheduler_workers=None, shard=None,
+                 use_results_store=False, deduplicate=True, memory_budget=None, worker_shares=None):
         super().__init__()
         self.input_folder = input_folder
         self.output_folder = output_folder
-
-    def run(self):
-        # 初始化文件类型计数器和错误文件列表
-        file_type_counts = {
+        # FA 采样参数：fa_sample_rate 为 None 时按视频时长自动选择
+        self.fa_sample_rate = fa_sample_rate
+        self.fa_start_time = fa_start_time
+        self.fa_end_time = fa_end_time
+        self.fa_workers = fa_workers
+        # FA 解码后端，见 FA_BACKEND
+        self.fa_backend = fa_backend
+        # 大于 0 时为每个视频额外生成缩略图拼版
+        self.contact_sheet_frames = contact_sheet_frames
+        # resume 为 True 时读取输出文件夹中的运行日志，跳过上次已完成的文件
+        self.resume_journal = resume
+        self.journal = None
+        # 每种资源类型的并发数，None 时使用 SCHEDULER_WORKERS
+        self.scheduler_workers = scheduler_workers
+        # 服务器模式下与其他同时运行的任务共享的并发额度（WorkerShares），给定时取代 scheduler_workers
+        self.worker_shares = worker_shares
+        # 分片 (i, N)：只处理哈希落在第 i 片的文件，跳过可视化，完成后写入分片标记，由 merge_shards 汇总
+        self.shard = shard
+        self.log_channel = None
+        # 启用列式结果库（需要 pyarrow）时，TEG / Transwell 结果写入结果库而不是逐个写出 output-*.csv
+        self.use_results_store = use_results_store
+        self.results_store = None
+        # 扫描时打开的压缩包（作为虚拟文件夹读取），运行结束时关闭
+        self.archive_readers = []
+        # 内容去重：内容相同的输入文件只处理一次，其余副本复制其结果
+        self.deduplicate = deduplicate
+        # 内存监控：记录每个作业的内存峰值，超出预算（字节，None 时为物理内存的 MEMORY_BUDGET_FRACTION）时才回收并限流大作业
+        self.memory_monitor = MemoryMonitor(memory_budget)
+        # 协作式取消与暂停：处理函数在每帧 / 每个文件处调用 checkpoint()
+        self.cancelled = False
+        self._cancel_event = threading.Event()
+        self._resume_event = threading.Event()
+        self._resume_event.set()
+
+    # FileProcessorThread.cancel / pause / resume 方法
+    # 可在任意线程（通常是 GUI 线程）中调用；取消会同时解除暂停，使等待中的工作线程尽快退出
+    def cancel(self):
+        self._cancel_event.set()
+        self._resume_event.set()
+
+    def pause(self):
+        if not self._cancel_event.is_set():
+            self._resume_event.clear()
+
+    def resume(self):
+        self._resume_event.set()
+
+    def is_paused(self):
+        return not self._resume_event.is_set()
+
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
+
+    # FileProcessorThread.log 方法
+    # 写入本次运行的日志通道（按时间片批量发送到界面并写入日志文件）；通道未打开时直接写入 logger
+    def log(self, message, level=logging.INFO):
+        if self.log_channel is not None:
+            self.log_channel.write(message, level)
+        else:
+            logger.log(level, message)
+
+    # FileProcessorThread.open_log_channel / close_log_channel 方法
+    # 打开本次运行的日志通道，并把当前线程的处理函数日志转发到该通道；关闭时发送剩余的日志
+    def open_log_channel(self):
+        os.makedirs(self.output_folder, exist_ok=True)
+        log_name = LOG_FILE_NAME if self.shard is None else SHARD_LOG_FILE_PATTERN.format(index=self.shard[0])
+        self.log_channel = LogChannel(self.update_log.emit, os.path.join(self.output_folder, log_name)).start()
+        log_context.channel = self.log_channel
+
+    def close_log_channel(self):
+        log_context.channel = None
+        if self.log_channel is not None:
+            self.log_channel.close()
+            self.log_channel = None
+
+    # FileProcessorThread.open_results_store 方法
+    # 按需打开结果库；clear 为 True 时（完整的新运行）先清空上次的结果，pyarrow 不可用时退回逐个写出 CSV
+    def open_results_store(self, clear):
+        if not self.use_results_store:
+            return
+        if not ResultsStore.available():
+            self.log("未安装 pyarrow，结果库不可用，改为逐个写出结果文件", logging.WARNING)
+            return
+        self.results_store = ResultsStore(self.output_folder)
+        if clear:
+            self.results_store.clear()
+
+    # FileProcessorThread.close_archives 方法
+    # 关闭扫描时打开的全部压缩包，删除压缩 tar 的临时解压文件
+    def close_archives(self):
+        for reader in self.archive_readers:
+            reader.close()
+        self.archive_readers = []
+
+    # FileProcessorThread.checkpoint 方法
+    # 暂停时阻塞直到继续或取消；已取消时抛出 ProcessingCancelled
+    def checkpoint(self):
+        self._resume_event.wait()
+        if self._cancel_event.is_set():
+            raise ProcessingCancelled("处理已取消")
+
+    # FileProcessorThread.new_file_type_counts 方法
+    # 返回全部内置文件类型计数为 0 的计数器；第三方处理器的计数项在首次成功时加入
+    @staticmethod
+    def new_file_type_counts():
+        return {
             'TEG': 0,
             'AA': 0,
             'Transwell': 0,
@@ -83,202 +1267,1029 @@ class FileProcessorThread(QThread):
             'cif2pdb':0,
             'video2pic':0,
             'xvg2csv':0,
+            'Deduplicated': 0,
             'Total': 0
         }
+
+    def run(self):
+        # 初始化文件类型计数器和错误文件列表
+        file_type_counts = self.new_file_type_counts()
         error_files = []
         processed_files = []
 
-        # 调用递归处理方法
-        self.recursive_process_folder(
-            self.input_folder,
-            self.output_folder,
-            file_type_counts,
-            error_files,
-            processed_files,
-            initial_input_folder=self.input_folder
-        )
+        # 0. 打开日志通道和运行日志；续跑时载入上次已完成的文件
+        self.open_log_channel()
+        if self.shard is not None:
+            marker_path = shard_marker_path(self.output_folder, self.shard)
+            if os.path.exists(marker_path):
+                os.remove(marker_path)
+        self.journal = RunJournal(self.input_folder, self.output_folder, self.shard)
+        if self.resume_journal:
+            self.journal.load()
+        self.journal.open(self.resume_journal)
+        self.open_results_store(clear=not self.resume_journal and self.shard is None)
+        finished = False
+        try:
+            # 1. 递归扫描所有文件夹，为每个文件选出处理器并估计开销
+            jobs = []
+            skipped = []
+            self.recursive_process_folder(self.input_folder, self.output_folder, jobs, error_files, skipped)
+            if skipped:
+                self.log(f"根据运行日志跳过 {len(skipped)} 个已完成的文件")
+            for processor, output_file_path in skipped:
+                self.record_success(processor, output_file_path, file_type_counts, processed_files)
+
+            # 2. 内容相同的文件只保留一个作业，再交给调度器按开销和资源类型并发执行
+            jobs, duplicates = self.deduplicate_jobs(jobs)
+            self.run_jobs(jobs, file_type_counts, error_files, processed_files, duplicates)
+
+            # 3. 处理可视化和汇总（取消时跳过，保留运行日志以便下次续跑）
+            if self.is_cancelled():
+                self.cancelled = True
+                self.log("处理已取消，已完成的文件会在下次运行时跳过")
+            elif self.shard is not None:
+                write_shard_marker(self.input_folder, self.output_folder, self.shard,
+                                   processed_files, file_type_counts, error_files)
+                self.log(f"分片 {self.shard[0]}/{self.shard[1]} 处理完成，等待合并")
+                finished = True
+            else:
+                self.visualize_results(self.input_folder, self.output_folder, processed_files)
+                finished = True
+        finally:
+            self.close_archives()
+            if self.results_store is not None:
+                self.results_store.flush()
+            self.journal.close(finished)
+            self.close_log_channel()
 
         # 发送处理结果
         self.processing_completed.emit(processed_files, file_type_counts, error_files)
 
     # FileProcessorThread.recursive_process_folder 方法
-    # 递归处理文件夹中的所有文件和子文件夹
-    # 根据文件扩展名调用相应的处理函数，并更新处理进度和日志
-    def recursive_process_folder(self, input_folder, output_folder, file_type_counts, error_files, processed_files,
-                                 initial_input_folder):
-        # 更新日志，显示当前处理的文件夹
-        self.update_log.emit(f"\n开始处理文件夹: {input_folder}")
+    # 递归扫描文件夹中的所有文件和子文件夹，创建对应的输出文件夹
+    # 通过处理器注册表为每个文件选出处理器并估计开销，生成作业列表；批量处理器按文件夹合并为一个作业
+    # 运行日志中记录为已完成的文件不再生成作业，以 (处理器, 输出文件) 形式加入 skipped
+    # zip / tar 压缩包作为虚拟文件夹扫描，见 scan_archive
+    def recursive_process_folder(self, input_folder, output_folder, jobs, error_files, skipped=None):
+        # 更新日志，显示当前扫描的文件夹
+        self.log(f"\n开始扫描文件夹: {input_folder}")
 
         # 1. 检查是否有次级文件夹
         all_items = os.listdir(input_folder)
         subfolders = [f for f in all_items if os.path.isdir(os.path.join(input_folder, f))]
 
-        # 2.1 如果有次级文件夹，递归处理
-        if subfolders:
-            for subfolder in subfolders:
-                new_input_path = os.path.join(input_folder, subfolder)
-                new_output_path = os.path.join(output_folder, subfolder)
-                os.makedirs(new_output_path, exist_ok=True)
-
-                # 递归调用子文件夹
-                self.recursive_process_folder(
-                    new_input_path,
-                    new_output_path,
-                    file_type_counts,
-                    error_files,
-                    processed_files,
-                    initial_input_folder
-                )
-
-        # 2.2 处理当前文件夹中的文件
-        # 重置进度条为0%
-        self.update_progress.emit(0)
-
-        # 获取当前文件夹中的可处理文件
+        # 2.1 如果有次级文件夹，递归扫描
+        for subfolder in subfolders:
+            new_input_path = os.path.join(input_folder, subfolder)
+            new_output_path = os.path.join(output_folder, subfolder)
+            os.makedirs(new_output_path, exist_ok=True)
+            self.recursive_process_folder(new_input_path, new_output_path, jobs, error_files, skipped)
+
+        # 2.2 压缩包作为虚拟文件夹扫描
+        for archive in all_items:
+            archive_path = os.path.join(input_folder, archive)
+            if archive_folder_name(archive) is not None and os.path.isfile(archive_path):
+                self.scan_archive(archive_path, output_folder, jobs, error_files, skipped)
+
+        # 2.3 获取当前文件夹中的可处理文件（扩展名由处理器注册表决定）
+        supported_extensions = PROCESSOR_REGISTRY.extensions()
         processable_files = [
-            f for f in os.listdir(input_folder)
+            f for f in all_items
             if os.path.isfile(os.path.join(input_folder, f)) and
-               f.endswith(('.tif', '.tiff', '.mov', '.mp4', '.avi', '.txt', '.xlsx', '.xls', '.xlsm', '.csv', '.cif', '.xvg')) and
+               os.path.splitext(f)[1].lower() in supported_extensions and
                not f.startswith(('visualized-', 'summarized-'))
         ]
 
-        total_files = len(processable_files)
-        if total_files == 0:
-            self.update_log.emit(f"文件夹 {input_folder} 中没有可处理的文件")
+        if not processable_files:
+            self.log(f"文件夹 {input_folder} 中没有可处理的文件")
             return
 
-        # 处理当前文件夹中的每个文件
-        for index, file in enumerate(processable_files, 1):
+        self.plan_folder_jobs(input_folder, output_folder, processable_files, jobs, error_files, skipped)
+        self.log(f"文件夹 {input_folder} 中找到 {len(processable_files)} 个可处理文件")
+
+    # FileProcessorThread.scan_archive 方法
+    # 把压缩包作为虚拟文件夹扫描，不解压：成员以 ArchiveMember 形式交给处理器，由处理器从内存读取
+    # 输出写入与压缩包同级、去掉压缩包扩展名的文件夹（data.zip -> data），保持压缩包内的文件夹层级
+    def scan_archive(self, archive_path, output_folder, jobs, error_files, skipped=None):
+        self.log(f"\n开始扫描压缩包: {archive_path}")
+        try:
+            reader = ArchiveReader(archive_path)
+        except (OSError, zipfile.BadZipFile, tarfile.TarError) as e:
+            error_files.append({'file': archive_path, 'error_message': f"无法读取压缩包: {e}"})
+            self.log(f"无法读取压缩包 {os.path.basename(archive_path)}: {e}", logging.WARNING)
+            return
+        self.archive_readers.append(reader)
+
+        archive_output = os.path.join(output_folder, archive_folder_name(os.path.basename(archive_path)))
+        for folder in reader.folders():
+            os.makedirs(os.path.normpath(os.path.join(archive_output, folder)), exist_ok=True)
+
+        supported_extensions = PROCESSOR_REGISTRY.extensions()
+        by_folder = {}
+        for member in reader.members:
+            folder, _, name = member.rpartition('/')
+            if os.path.splitext(name)[1].lower() in supported_extensions and \
+                    not name.startswith(('visualized-', 'summarized-')):
+                by_folder.setdefault(folder, []).append(ArchiveMember(reader, member))
+
+        for folder, members in by_folder.items():
+            self.plan_folder_jobs(os.path.join(archive_path, folder), os.path.normpath(os.path.join(archive_output, folder)),
+                                  members, jobs, error_files, skipped)
+        self.log(f"压缩包 {archive_path} 中找到 {sum(len(m) for m in by_folder.values())} 个可处理文件")
+
+    # FileProcessorThread.plan_folder_jobs 方法
+    # 为同一文件夹中的一组文件选出处理器并估计开销，生成作业；批量处理器的文件合并为一个作业
+    # files 为文件名，或压缩包虚拟文件夹中的 ArchiveMember
+    def plan_folder_jobs(self, input_folder, output_folder, files, jobs, error_files, skipped=None):
+        batch_jobs = {}  # 批量处理器 -> [(file_path, output_path)]，合并为当前文件夹的一个作业
+        for file in files:
+            file_path = file if isinstance(file, ArchiveMember) else os.path.join(input_folder, file)
             try:
-                file_path = os.path.join(input_folder, file)
-                output_file_path = os.path.join(output_folder, f"output-{os.path.splitext(file)[0]}")
-
-                self.update_log.emit(f"正在处理文件: {file} ({index}/{total_files})")
-
-                if file.endswith('.xvg'):
-                    # 构造输出文件夹：可以将转换后的文件存放在当前文件夹对应的输出路径下
-                    # 例如，对于每个 xvg 文件，都在当前 output_folder 下建立一个子目录 "xvg_csv" 用于保存转换结果
-                    xvg_output_dir = os.path.join(output_folder, "xvg_csv")
-                    xvg2csv(input_folder, xvg_output_dir)
-                    file_type_counts['xvg2csv'] += 1
-                    # 对其他文件类型的判断……
-                elif file.endswith(('.mov', '.mp4')):
-                    # 打开视频文件，获取 fps 和总帧数来计算时长
-                    cap = cv2.VideoCapture(file_path)
-                    if not cap.isOpened():
-                        self.update_log.emit(f"无法打开视频文件: {file}")
-                        continue  # 跳过处理
-
-                    fps = cap.get(cv2.CAP_PROP_FPS)
-                    total_frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
-                    duration = total_frames / fps if fps else 0
-
-                    cap.release()  # 检测完毕后及时释放资源
-
-                    # 判断视频时长是否小于10分钟（600秒）
-                    if duration < 600:
-                        output_file_path += "_fa.csv"
-                        self.update_log.emit(f"处理视频: {file} 时长 {duration:.2f}s 小于10min，进行FA处理")
-                        process_fa(file_path, output_file_path)
-                        file_type_counts['MOV_MP4'] += 1
-                    else:
-                        self.update_log.emit(f"视频 {file} 时长 {duration:.2f}s 超过10min，跳过MFI处理")
-                    cap = cv2.VideoCapture(file_path)
-                    fps = cap.get(cv2.CAP_PROP_FPS)
-                    total_frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
-                    duration = total_frames / fps if fps else 0
-                    cap.release()
-
-                    # 根据时长确定时间点（注意这里的时间点单位均为分钟）
-                    if duration < 300:  # 小于5分钟
-                        timestamps = [1, 2, 3]
-                    elif duration < 600:  # 5到10分钟
-                        timestamps = [1, 3, 5]
-                    else:  # 超过10分钟
-                        timestamps = [3, 6, 9, 12, 15]
-
-                    # 调用 process_video_screenshots 来生成截图
-                    process_video_screenshots(file_path, output_folder, timestamps)
-                    file_type_counts['video2pic'] += 1
-                elif file.endswith('.avi'):
-                    output_file_path += "_a2m.mp4"
-                    process_avi2mp4(file_path, output_file_path)
-                    file_type_counts['AVI2MP4'] += 1
-                elif file.endswith('.txt'):
-                    output_file_path += "_teg.csv"
-                    process_teg(file_path, output_file_path)
-                    file_type_counts['TEG'] += 1
-                elif file.endswith('.cif'):
-                    output_file_path = os.path.splitext(os.path.join(output_folder, f"output-{os.path.splitext(file)[0]}"))[0] + ".pdb"
-                    process_cif2pdb(file_path, output_file_path)
-                    file_type_counts['cif2pdb'] += 1
-                elif file.endswith('.xvg'):
-                    output_file_path += "_.csv"
-                    process_teg(file_path, output_file_path)
-                    file_type_counts['xvg2csv'] += 1
-                elif file.endswith(('.tif', '.jpg', '.jpeg')):
-                    output_file_path += "_transwell.csv"
-                    process_transwell(file_path, output_file_path)
-                    file_type_counts['Transwell'] += 1
-                elif file.endswith(('.xlsx', '.xls', '.xlsm', '.csv')):
-                    output_file_path += ".xlsx"
-
-                    if file.endswith('.csv'):
-                        df = pd.read_csv(file_path, header=None)
-                    else:
-                        df = pd.read_excel(file_path, header=None)
+                # 先判断分片归属：每个节点只读取（识别文件内容）并报告属于自己分片的文件
+                if self.shard is not None and not file_in_shard(
+                        os.path.relpath(file_path, self.input_folder), self.shard):
+                    continue
+
+                processor = PROCESSOR_REGISTRY.find(file_path)
+                if processor is None:
+                    self.log(f"无法识别文件内容，跳过: {file}")
+                    continue
 
-                    first_value = df.iloc[0, 0] if not df.empty else None
-                    second_value = df.iloc[1, 0] if df.shape[0] > 1 else None
+                entry = self.journal.is_completed(file_path) if self.journal is not None else None
+                if entry is not None and skipped is not None:
+                    skipped.append((processor, entry['output']))
+                    continue
 
-                    if first_value == 'NjData' and second_value == 'ADPrateData':
-                        process_aa(file_path, output_file_path)
-                        file_type_counts['AA'] += 1
+                if processor.batch:
+                    batch_jobs.setdefault(processor, []).append(
+                        (file_path, processor.output_path(file_path, output_folder)))
+                else:
+                    jobs.append(ProcessingJob(processor, file_path, output_folder,
+                                              processor.estimate_cost(file_path), None))
+            except Exception as e:
+                error_files.append({'file': file_path, 'error_message': str(e)})
+                self.log(f"处理文件 {file} 时出错: {str(e)}", logging.WARNING)
+
+        for processor, batch in batch_jobs.items():
+            costs = [processor.estimate_cost(file_path) for file_path, _ in batch]
+            cost = JobCost(work=sum(c.work for c in costs), memory=max(c.memory for c in costs))
+            jobs.append(ProcessingJob(processor, None, output_folder, cost, batch))
+
+    # FileProcessorThread.worker_limits 方法
+    # 本次运行当前每种资源类型的并发数（共享额度时为当前份额；scheduler_workers 未给出的类型使用 SCHEDULER_WORKERS）
+    def worker_limits(self):
+        if self.worker_shares is not None:
+            return self.worker_shares.limits()
+        return {**SCHEDULER_WORKERS, **(self.scheduler_workers or {})}
+
+    # FileProcessorThread.deduplicate_jobs 方法
+    # 内容去重：同一处理器的内容完全相同的输入只保留扫描顺序中的第一个作业，返回 (作业列表, duplicates)
+    # duplicates 为 {主文件: [(副本文件, 副本输出文件夹)]}，主文件处理成功后由处理器的 materialize_duplicate 生成副本的输出
+    # 批量处理器与 dedup 为 False 的处理器不参与去重
+    def deduplicate_jobs(self, jobs):
+        candidates = [job for job in jobs if job.batch_jobs is None and job.processor.dedup]
+        if not self.deduplicate or len(candidates) < 2:
+            return jobs, {}
+        groups = find_duplicate_groups([job.file_path for job in candidates],
+                                       workers=self.worker_limits()[RESOURCE_IO])
+        by_path = {job.file_path: job for job in candidates}
+        duplicates = {}
+        removed = set()
+        for group in groups:
+            by_processor = {}
+            for file_path in group:
+                by_processor.setdefault(by_path[file_path].processor, []).append(by_path[file_path])
+            for primary, *copies in by_processor.values():
+                if copies:
+                    duplicates[primary.file_path] = [(job.file_path, job.output_folder) for job in copies]
+                    removed.update(job.file_path for job in copies)
+        if not removed:
+            return jobs, {}
+        self.log(f"内容去重：{len(removed)} 个文件与其他文件内容相同，只处理一次并复制结果")
+        return [job for job in jobs if job.batch_jobs is not None or job.file_path not in removed], duplicates
+
+    # FileProcessorThread.execute_job 方法
+    # 在调度器的工作线程中执行单个作业
+    def execute_job(self, job):
+        log_context.channel = self.log_channel
+        try:
+            if job.batch_jobs is not None:
+                with self.memory_monitor.track(f"{job.processor.name} 批量作业（{len(job.batch_jobs)} 个文件）",
+                                               job.processor.name):
+                    return job.processor.process_batch(job.batch_jobs, self)
+            self.log(f"正在处理文件: {os.path.basename(job.file_path)}")
+            with self.memory_monitor.track(job.file_path, job.processor.name):
+                return job.processor.process(job.file_path, job.output_folder, self)
+        finally:
+            log_context.channel = None
+
+    # FileProcessorThread.record_success 方法
+    # 记录一个处理成功的文件：加入输出列表并累加处理器对应的计数项
+    def record_success(self, processor, output_file_path, file_type_counts, processed_files):
+        processed_files.append(output_file_path)
+        for key in processor.count_keys:
+            file_type_counts[key] = file_type_counts.get(key, 0) + 1
+        file_type_counts['Total'] += 1
+
+    # FileProcessorThread.run_jobs 方法
+    # 调度并执行所有作业，在本线程中汇总计数、错误与进度，并把成功的文件写入运行日志
+    # duplicates（见 deduplicate_jobs）中的副本在主文件完成后生成输出；主文件失败时副本记录相同的错误
+    def run_jobs(self, jobs, file_type_counts, error_files, processed_files, duplicates=None):
+        duplicates = duplicates or {}
+        total_files = sum(len(job.batch_jobs) if job.batch_jobs is not None else 1 for job in jobs)
+        total_files += sum(len(copies) for copies in duplicates.values())
+        if total_files == 0:
+            return
+        finished = 0
+        last_percent = 0
+
+        def record_success(processor, file_path, output_file_path):
+            self.record_success(processor, output_file_path, file_type_counts, processed_files)
+            if self.journal is not None:
+                self.journal.record(file_path, output_file_path, processor.name,
+                                    stored=processor.results_store(self) is not None)
+
+        def record_error(file_path, error):
+            if isinstance(error, ProcessingCancelled):
+                self.log(f"已取消: {os.path.basename(file_path)}")
+                return
+            error_files.append({'file': file_path, 'error_message': str(error)})
+            self.log(f"处理文件 {os.path.basename(file_path)} 时出错: {error}", logging.WARNING)
+
+        def on_done(job, result, error):
+            nonlocal finished, last_percent
+            if job.batch_jobs is None:
+                finished += 1
+                if error is None:
+                    record_success(job.processor, job.file_path, result)
+                else:
+                    record_error(job.file_path, error)
+                for file_path, output_folder in duplicates.get(job.file_path, ()):
+                    finished += 1
+                    if error is not None:
+                        record_error(file_path, error)
+                        continue
+                    try:
+                        output_file_path = job.processor.materialize_duplicate(self, job.file_path, result,
+                                                                               file_path, output_folder)
+                    except Exception as e:
+                        record_error(file_path, e)
+                        continue
+                    record_success(job.processor, file_path, output_file_path)
+                    file_type_counts['Deduplicated'] = file_type_counts.get('Deduplicated', 0) + 1
+            else:
+                # 批量处理器（例如 cif 转换）逐个记录成功与失败
+                finished += len(job.batch_jobs)
+                for file_path, output_file_path in job.batch_jobs:
+                    error_message = error if error is not None else result.get(file_path, "未返回处理结果")
+                    if error_message is None:
+                        record_success(job.processor, file_path, output_file_path)
                     else:
-                        process_mr(file_path, output_file_path)
-                        file_type_counts['Excel_CSV'] += 1
+                        record_error(file_path, error_message)
 
-                processed_files.append(output_file_path)
-                file_type_counts['Total'] += 1
+            # 更新进度条 - 使用全部文件的整体进度，百分比变化时才发送，避免大量小文件时频繁刷新界面
+            percent = int(finished / total_files * 100)
+            if percent != last_percent:
+                last_percent = percent
+                self.update_progress.emit(percent)
 
-                # 更新进度条 - 使用当前文件夹的进度
-                progress = int((index / total_files) * 100)
-                self.update_progress.emit(progress)
-
-            except Exception as e:
-                error_info = {'file': file_path, 'error_message': str(e)}
-                error_files.append(error_info)
-                self.update_log.emit(f"处理文件 {file} 时出错: {str(e)}")
-
-        # 处理可视化和汇总
-        if input_folder == initial_input_folder:
-            # TEG文件可视化
-            teg_files = [f for f in processed_files if f.endswith('teg.csv')]
-            if teg_files:
-                self.update_log.emit("正在生成TEG可视化文件...")
-                teg_visualized_files = visualize_teg_files(input_folder, output_folder)
-                processed_files.extend(teg_visualized_files)
-
-            # Transwell文件可视化和汇总
-            transwell_files = [f for f in processed_files if f.endswith('transwell.csv')]
-            if transwell_files:
-                self.update_log.emit("正在生成Transwell可视化文件...")
-                transwell_visualized_files = visualize_transwell_files(input_folder, output_folder)
-                processed_files.extend(transwell_visualized_files)
+        self.update_progress.emit(0)
+        monitor = self.memory_monitor.start()
+        try:
+            JobScheduler(memory_budget=monitor.budget, workers=self.scheduler_workers, monitor=monitor,
+                         shares=self.worker_shares).run(
+                jobs, self.execute_job, on_done, checkpoint=self.checkpoint)
+        finally:
+            monitor.stop()
+        self.log(monitor.summary())
+
+    # FileProcessorThread.visualize_results 方法
+    # 所有文件处理完成后，生成 TEG / Transwell / FA 可视化文件和 Transwell 汇总文件
+    # incremental 为 True 时（监视模式）只重建 processed_files 所在文件夹的可视化文件，并增量更新 Transwell 汇总
+    def visualize_results(self, input_folder, output_folder, processed_files, incremental=False):
+        def changed_folders(files):
+            if not incremental:
+                return None
+            return {os.path.relpath(os.path.dirname(f), output_folder) for f in files}
+
+        # 启用结果库时，TEG / Transwell 可视化与汇总直接从结果库按分区读取
+        store = self.results_store
+        if store is not None:
+            store.flush()
+
+        # TEG文件可视化
+        teg_files = [f for f in processed_files if f.endswith('teg.csv')]
+        if teg_files:
+            self.log("正在生成TEG可视化文件...")
+            if store is not None:
+                teg_visualized_files = visualize_teg_results(store, input_folder, output_folder,
+                                                             changed_folders(teg_files))
+            else:
+                teg_visualized_files = visualize_teg_files(input_folder, output_folder, changed_folders(teg_files))
+            processed_files.extend(teg_visualized_files)
+
+        # Transwell文件可视化和汇总
+        transwell_files = [f for f in processed_files if f.endswith('transwell.csv')]
+        if transwell_files:
+            self.log("正在生成Transwell可视化文件...")
+            folders = changed_folders(transwell_files)
+            if store is not None:
+                transwell_visualized_files = visualize_transwell_results(store, input_folder, output_folder, folders)
+            else:
+                transwell_visualized_files = visualize_transwell_files(input_folder, output_folder, folders)
+            processed_files.extend(transwell_visualized_files)
+            # 启用结果库时汇总文件已由 visualize_transwell_results 生成
+            if store is None and folders is None:
                 summarize_transwell_files(output_folder)
+            elif store is None:
+                update_transwell_summary(output_folder, folders)
+
+        # 添加FA文件可视化
+        fa_files = [f for f in processed_files if f.endswith('fa.csv')]
+        if fa_files:
+            self.log("正在生成FA可视化文件...")
+            fa_visualized_files = visualize_fa_files(input_folder, output_folder, changed_folders(fa_files))
+            processed_files.extend(fa_visualized_files)
+
+        # 血小板聚集曲线指标与酶标仪动力学参数（两者的输出都是 .xlsx，由 summarize_xlsx_outputs 按内容区分）
+        xlsx_files = [f for f in processed_files if f.endswith('.xlsx')]
+        if xlsx_files:
+            self.log("正在计算血小板聚集曲线指标与酶标仪动力学参数...")
+            processed_files.extend(summarize_xlsx_outputs(input_folder, output_folder, changed_folders(xlsx_files)))
+
+        self.log(f"文件夹 {input_folder} 处理完成")
+        # 确保处理完成时进度条显示100%
+        self.update_progress.emit(100)
 
-            # 添加FA文件可视化
-            fa_files = [f for f in processed_files if f.endswith('fa.csv')]
-            if fa_files:
-                self.update_log.emit("正在生成FA可视化文件...")
-                fa_visualized_files = visualize_fa_files(input_folder, output_folder)
-                processed_files.extend(fa_visualized_files)
 
-        self.update_log.emit(f"文件夹 {input_folder} 处理完成")
-        # 确保当前文件夹处理完成时进度条显示100%
-        self.update_progress.emit(100)
+# shard_marker_path 函数
+# 返回分片完成标记文件的路径
+def shard_marker_path(output_folder, shard):
+    return os.path.join(output_folder, SHARD_MARKER_PATTERN.format(index=shard[0], count=shard[1]))
+
+
+# write_shard_marker 函数
+# 分片处理完成后写入标记：处理结果、计数和出错文件；先写临时文件再改名，合并方不会读到半个文件
+def write_shard_marker(input_folder, output_folder, shard, processed_files, file_type_counts, error_files):
+    marker_path = shard_marker_path(output_folder, shard)
+    with open(marker_path + '.part', 'w', encoding='utf-8') as f:
+        json.dump({'input_folder': os.path.abspath(input_folder), 'shard': list(shard),
+                   'processed_files': processed_files, 'file_type_counts': file_type_counts,
+                   'error_files': error_files}, f, ensure_ascii=False)
+    os.replace(marker_path + '.part', marker_path)
+
+
+# merge_shard_logs 函数
+# 按分片顺序把各分片的日志（含滚动出的旧文件，从旧到新）追加到输出文件夹的主日志文件，然后删除分片日志
+def merge_shard_logs(output_folder, shard_count):
+    with open(os.path.join(output_folder, LOG_FILE_NAME), 'a', encoding='utf-8') as merged:
+        for index in range(shard_count):
+            shard_log = os.path.join(output_folder, SHARD_LOG_FILE_PATTERN.format(index=index))
+            paths = [f"{shard_log}.{backup}" for backup in range(LOG_FILE_BACKUPS, 0, -1)] + [shard_log]
+            paths = [path for path in paths if os.path.exists(path)]
+            if not paths:
+                continue
+            merged.write(f"===== 分片 {index}/{shard_count} =====\n")
+            for path in paths:
+                with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                    shutil.copyfileobj(f, merged)
+            for path in paths:
+                os.remove(path)
+
+
+# merge_shards 函数
+# 所有分片完成后执行一次 TEG / FA / Transwell 可视化与汇总，返回合并后的 (processed_files, counts, error_files)
+# wait_seconds 大于 0 时等待未完成的分片，超时或仍有分片缺失时抛出 RuntimeError；合并成功后删除分片标记
+# 各分片的日志先合并到主日志文件，合并过程本身的日志随后写入同一文件，并交给 on_log（如 print）显示
+def merge_shards(input_folder, output_folder, shard_count, wait_seconds=0, poll_seconds=5.0, on_log=None):
+    marker_paths = [shard_marker_path(output_folder, (index, shard_count)) for index in range(shard_count)]
+    deadline = time.monotonic() + wait_seconds
+    missing = [path for path in marker_paths if not os.path.exists(path)]
+    while missing and time.monotonic() < deadline:
+        time.sleep(poll_seconds)
+        missing = [path for path in marker_paths if not os.path.exists(path)]
+    if missing:
+        raise RuntimeError(f"以下分片尚未完成: {', '.join(os.path.basename(path) for path in missing)}")
+
+    processed_files = []
+    file_type_counts = FileProcessorThread.new_file_type_counts()
+    error_files = []
+    for marker_path in marker_paths:
+        with open(marker_path, 'r', encoding='utf-8') as f:
+            marker = json.load(f)
+        if marker['input_folder'] != os.path.abspath(input_folder):
+            raise RuntimeError(f"分片标记 {marker_path} 属于其他输入文件夹: {marker['input_folder']}")
+        processed_files.extend(marker['processed_files'])
+        error_files.extend(marker['error_files'])
+        for key, count in marker['file_type_counts'].items():
+            file_type_counts[key] = file_type_counts.get(key, 0) + count
+
+    merge_shard_logs(output_folder, shard_count)
+    merger = FileProcessorThread(input_folder, output_folder)
+    if ResultsStore.exists(output_folder) and ResultsStore.available():
+        merger.results_store = ResultsStore(output_folder)
+    if on_log is not None:
+        merger.update_log.connect(on_log, Qt.ConnectionType.DirectConnection)
+    merger.open_log_channel()
+    try:
+        merger.log(f"合并 {shard_count} 个分片的结果")
+        merger.visualize_results(input_folder, output_folder, processed_files)
+    finally:
+        merger.close_log_channel()
+    for marker_path in marker_paths:
+        os.remove(marker_path)
+    return processed_files, file_type_counts, error_files
+
+
+# 监视模式参数：轮询间隔、文件大小与修改时间保持不变多久后视为写入完成、事件模式下的兜底全量扫描间隔（秒）
+WATCH_POLL_SECONDS = 1.0
+WATCH_STABLE_SECONDS = 2.0
+WATCH_RESCAN_SECONDS = 60.0
+
+
+# FolderWatcher 类
+# 监视输入文件夹树中新出现或被修改的可处理文件，只返回已经写入完成（大小与修改时间稳定）的文件
+# 安装了 watchdog 时使用系统文件事件（Linux 上为 inotify），否则退回定时全量扫描
+class FolderWatcher:
+    def __init__(self, folder, exclude=(), stable_seconds=WATCH_STABLE_SECONDS, use_events=True):
+        self.folder = os.path.abspath(folder)
+        # 输出文件夹位于输入文件夹内时需要排除，否则处理结果会被再次当作新文件
+        self.exclude = [os.path.abspath(path) for path in exclude if path]
+        self.stable_seconds = stable_seconds
+        self.use_events = use_events
+        self.backend = 'polling'
+        self.known = {}    # 已分发的文件 -> (大小, 修改时间)
+        self.pending = {}  # 等待写入完成的文件 -> (大小, 修改时间, 首次观察到该状态的时间)
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._observer = None
+        self._last_scan = None
+
+    def start(self):
+        if not self.use_events:
+            return
+        try:
+            observers = importlib.import_module('watchdog.observers')
+            events = importlib.import_module('watchdog.events')
+        except ImportError:
+            return
+
+        watcher = self
+
+        class Handler(events.FileSystemEventHandler):
+            def on_any_event(self, event):
+                if not event.is_directory:
+                    watcher.mark_dirty(getattr(event, 'dest_path', None) or event.src_path)
+
+        self._observer = observers.Observer()
+        self._observer.schedule(Handler(), self.folder, recursive=True)
+        self._observer.start()
+        self.backend = 'watchdog'
+
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+
+    def mark_dirty(self, path):
+        with self._lock:
+            self._dirty.add(os.path.abspath(path))
+
+    def is_excluded(self, path):
+        return any(path == folder or path.startswith(folder + os.sep) for folder in self.exclude)
+
+    def is_candidate(self, path):
+        name = os.path.basename(path)
+        return ((os.path.splitext(name)[1].lower() in PROCESSOR_REGISTRY.extensions() or
+                 archive_folder_name(name) is not None) and
+                not name.startswith(('visualized-', 'summarized-', '.', '~$')) and
+                not self.is_excluded(path))
+
+    def scan(self):
+        paths = []
+        for root, dirs, files in os.walk(self.folder):
+            dirs[:] = [d for d in dirs if not self.is_excluded(os.path.join(root, d))]
+            paths.extend(os.path.join(root, f) for f in files)
+        return paths
+
+    # FolderWatcher.poll 方法
+    # 更新候选文件的状态，返回本次判定为写入完成的新文件（自然排序），不阻塞
+    def poll(self):
+        now = time.monotonic()
+        if self._observer is None or self._last_scan is None or now - self._last_scan >= WATCH_RESCAN_SECONDS:
+            candidates = self.scan()
+            self._last_scan = now
+        else:
+            with self._lock:
+                candidates, self._dirty = list(self._dirty), set()
+        candidates = set(path for path in candidates if self.is_candidate(path)) | set(self.pending)
+
+        for path in candidates:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # 文件已被删除或移走
+                self.pending.pop(path, None)
+                self.known.pop(path, None)
+                continue
+            signature = (stat.st_size, stat.st_mtime)
+            if self.known.get(path) == signature:
+                self.pending.pop(path, None)
+            elif self.pending.get(path, (None, None))[:2] != signature:
+                self.pending[path] = signature + (now,)
+
+        ready = [path for path, (size, mtime, since) in self.pending.items()
+                 if size > 0 and now - since >= self.stable_seconds]
+        for path in ready:
+            self.known[path] = self.pending.pop(path)[:2]
+        return natsort.natsorted(ready)
+
+
+# WatchFolderThread 类
+# 监视模式的处理线程：持续监视输入文件夹，新文件写入完成后只处理这些文件，
+# 并只重建相关文件夹的 visualized-* 文件、增量更新 summarized-transwell.csv
+# 已完成的文件记录在运行日志中，重新开始监视时跳过未变化的文件；调用 cancel() 停止监视
+class WatchFolderThread(FileProcessorThread):
+    def __init__(self, input_folder, output_folder, poll_seconds=WATCH_POLL_SECONDS, use_events=True, **kwargs):
+        super().__init__(input_folder, output_folder, resume=True, **kwargs)
+        self.poll_seconds = poll_seconds
+        self.use_events = use_events
+
+    def run(self):
+        file_type_counts = self.new_file_type_counts()
+        error_files = []
+        processed_files = []
+
+        self.open_log_channel()
+        self.journal = RunJournal(self.input_folder, self.output_folder)
+        self.journal.load()
+        self.journal.open(resume=True)
+        self.open_results_store(clear=False)
+        watcher = FolderWatcher(self.input_folder, exclude=[self.output_folder], use_events=self.use_events)
+        watcher.start()
+        self.log(f"开始监视文件夹: {self.input_folder}（{watcher.backend}）")
+        try:
+            while not self._cancel_event.wait(self.poll_seconds):
+                try:
+                    self.checkpoint()  # 暂停时在这里等待
+                except ProcessingCancelled:
+                    break
+                ready = watcher.poll()
+                if ready:
+                    self.process_new_files(ready, file_type_counts, error_files, processed_files)
+        finally:
+            watcher.stop()
+            if self.results_store is not None:
+                self.results_store.flush()
+            self.journal.close(finished=False)
+            self.log(f"已停止监视文件夹: {self.input_folder}")
+            self.close_log_channel()
+        self.processing_completed.emit(processed_files, file_type_counts, error_files)
+
+    # WatchFolderThread.process_new_files 方法
+    # 按文件夹生成作业并交给调度器执行，随后只更新这些文件所在文件夹的可视化与汇总文件
+    # 新出现的压缩包整体作为虚拟文件夹扫描，其中未变化的成员根据运行日志跳过
+    def process_new_files(self, file_paths, file_type_counts, error_files, processed_files):
+        self.log(f"\n检测到 {len(file_paths)} 个新文件")
+        by_folder = {}
+        for file_path in file_paths:
+            by_folder.setdefault(os.path.dirname(file_path), []).append(os.path.basename(file_path))
+
+        jobs = []
+        skipped = []
+        for folder, files in by_folder.items():
+            relative_path = os.path.relpath(folder, os.path.abspath(self.input_folder))
+            output_folder = os.path.normpath(os.path.join(self.output_folder, relative_path))
+            os.makedirs(output_folder, exist_ok=True)
+            archives = [f for f in files if archive_folder_name(f) is not None]
+            for archive in archives:
+                self.scan_archive(os.path.join(folder, archive), output_folder, jobs, error_files, skipped)
+            files = [f for f in files if f not in archives]
+            if files:
+                self.plan_folder_jobs(folder, output_folder, files, jobs, error_files, skipped)
+        if skipped:
+            self.log(f"根据运行日志跳过 {len(skipped)} 个已处理且未变化的文件")
+
+        batch_processed = []
+        try:
+            jobs, duplicates = self.deduplicate_jobs(jobs)
+            self.run_jobs(jobs, file_type_counts, error_files, batch_processed, duplicates)
+        finally:
+            self.close_archives()
+        if batch_processed:
+            self.visualize_results(self.input_folder, self.output_folder, batch_processed, incremental=True)
+        processed_files.extend(batch_processed)
+
+
+# 服务器模式参数：只监听本机地址；同时运行的任务数（各任务均分 SCHEDULER_WORKERS）；每个任务保留的日志行数
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8765
+SERVER_MAX_RUNS = 2
+SERVER_LOG_LINES = 2000
+# 设置该环境变量（例如 http://127.0.0.1:8765）后，图形界面把任务提交给服务器而不在本进程中处理
+SERVER_URL_ENV = 'PLATELETPRO_SERVER'
+
+
+# ServerRun 类
+# 服务器中的一次处理任务：提交参数、状态、进度、最近的日志和处理报告
+class ServerRun:
+    def __init__(self, run_id, user, input_folder, output_folder, resume=False, use_results_store=False):
+        self.id = run_id
+        self.user = user
+        self.input_folder = input_folder
+        self.output_folder = output_folder
+        self.resume = resume
+        self.use_results_store = use_results_store
+        self.status = 'queued'  # queued / running / completed / cancelled / failed
+        self.progress = 0
+        self.error = None
+        self.report = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.thread = None
+        self.log = deque(maxlen=SERVER_LOG_LINES)
+        self.log_count = 0  # 累计日志行数，客户端用 since 参数增量获取
+
+    def append_log(self, message):
+        # 处理线程按时间片发送多行文本，这里拆成单行保存
+        for line in message.split('\n'):
+            self.log.append(line)
+            self.log_count += 1
+
+    def log_since(self, since):
+        first = self.log_count - len(self.log)
+        return list(self.log)[max(0, since - first):]
+
+    def to_dict(self, since=None):
+        data = {'id': self.id, 'user': self.user, 'input_folder': self.input_folder,
+                'output_folder': self.output_folder, 'status': self.status, 'progress': self.progress,
+                'error': self.error, 'submitted': self.submitted, 'started': self.started,
+                'finished': self.finished, 'log_count': self.log_count}
+        if since is not None:
+            data['log'] = self.log_since(since)
+        return data
+
+
+# ProcessingServer 类
+# 多用户共享的任务队列：最多 max_runs 个任务同时运行，按正在运行的任务数动态均分本机的 CPU / IO / 子进程并发额度
+# 有空位时优先启动正在运行任务最少、已获服务最少的用户的任务，同一用户内按提交顺序
+class ProcessingServer:
+    def __init__(self, max_runs=SERVER_MAX_RUNS):
+        self.max_runs = max_runs
+        self.runs = {}
+        self.served = {}  # 用户 -> 已启动的任务数
+        self.worker_shares = WorkerShares()
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    def submit(self, user, input_folder, output_folder, resume=False, use_results_store=False):
+        if not input_folder or not os.path.isdir(input_folder):
+            raise ValueError(f"输入文件夹不存在: {input_folder}")
+        if not output_folder:
+            raise ValueError("未指定输出文件夹")
+        os.makedirs(output_folder, exist_ok=True)
+        with self._lock:
+            for run in self.runs.values():
+                if run.status in ('queued', 'running') and \
+                        os.path.abspath(run.output_folder) == os.path.abspath(output_folder):
+                    raise ValueError(f"输出文件夹正被任务 {run.id} 使用: {output_folder}")
+            run = ServerRun(str(self._next_id), user or 'anonymous', input_folder, output_folder, resume,
+                            use_results_store)
+            self._next_id += 1
+            self.runs[run.id] = run
+        self.dispatch()
+        return run
+
+    def get(self, run_id):
+        run = self.runs.get(run_id)
+        if run is None:
+            raise KeyError(f"任务不存在: {run_id}")
+        return run
+
+    def control(self, run_id, action):
+        run = self.get(run_id)
+        with self._lock:
+            if action == 'cancel' and run.status == 'queued':
+                run.status = 'cancelled'
+                run.finished = time.time()
+            elif run.status != 'running' or run.thread is None:
+                raise ValueError(f"任务 {run_id} 当前状态为 {run.status}，无法{action}")
+            elif action == 'cancel':
+                run.thread.cancel()
+            elif action == 'pause':
+                run.thread.pause()
+            elif action == 'resume':
+                run.thread.resume()
+            else:
+                raise ValueError(f"未知操作: {action}")
+        return run
+
+    # ProcessingServer.dispatch 方法
+    # 在有空位时按公平顺序启动排队中的任务
+    def dispatch(self):
+        with self._lock:
+            while True:
+                running = [run for run in self.runs.values() if run.status == 'running']
+                queued = [run for run in self.runs.values() if run.status == 'queued']
+                if len(running) >= self.max_runs or not queued:
+                    return
+                running_by_user = {}
+                for run in running:
+                    running_by_user[run.user] = running_by_user.get(run.user, 0) + 1
+                run = min(queued, key=lambda r: (running_by_user.get(r.user, 0), self.served.get(r.user, 0),
+                                                 r.submitted))
+                self.served[run.user] = self.served.get(run.user, 0) + 1
+                run.status = 'running'
+                run.started = time.time()
+                run.thread = FileProcessorThread(run.input_folder, run.output_folder, resume=run.resume,
+                                                 worker_shares=self.worker_shares,
+                                                 use_results_store=run.use_results_store)
+                threading.Thread(target=self.execute, args=(run,), daemon=True).start()
+
+    # ProcessingServer.execute 方法
+    # 在后台线程中直接调用处理线程的 run()，信号以直接连接方式写回任务状态
+    def execute(self, run):
+        thread = run.thread
+        direct = Qt.ConnectionType.DirectConnection
+        thread.update_log.connect(run.append_log, direct)
+        thread.update_progress.connect(lambda value: setattr(run, 'progress', value), direct)
+        thread.processing_completed.connect(
+            lambda processed, counts, errors: setattr(run, 'report', {
+                'processed_files': processed, 'file_type_counts': counts, 'error_files': errors,
+                'job_memory': thread.memory_monitor.report()}), direct)
+        try:
+            thread.run()
+            run.status = 'cancelled' if thread.cancelled else 'completed'
+        except Exception as e:
+            run.status = 'failed'
+            run.error = str(e)
+            run.append_log(f"处理失败: {e}")
+        finally:
+            run.finished = time.time()
+            self.dispatch()
+
+
+# ProcessingRequestHandler 类
+# 服务器的 HTTP/JSON 接口：
+#   POST /jobs                          提交任务 {"user", "input_folder", "output_folder", "resume", "results_store"}
+#   GET  /jobs                          列出所有任务
+#   GET  /jobs/<id>?since=N             任务状态与第 N 行之后的日志
+#   GET  /jobs/<id>/report              处理报告（文件列表、计数、出错文件）
+#   POST /jobs/<id>/cancel|pause|resume 控制正在运行的任务
+# 未知路径返回 404，参数错误返回 400，其他意外异常返回 500，错误信息都以 {"error": ...} 返回而不是断开连接
+class ProcessingRequestHandler(BaseHTTPRequestHandler):
+    server_version = 'PlateletPro'
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def route(self):
+        path, _, query = self.path.partition('?')
+        parts = [part for part in path.split('/') if part]
+        params = dict(item.partition('=')[::2] for item in query.split('&') if item)
+        return parts, params
+
+    def do_GET(self):
+        parts, params = self.route()
+        processing = self.server.processing
+        try:
+            if parts == ['jobs']:
+                self.send_json(200, [run.to_dict() for run in processing.runs.values()])
+            elif len(parts) == 2 and parts[0] == 'jobs':
+                run = processing.get(parts[1])
+                self.send_json(200, run.to_dict(since=int(params.get('since', 0))))
+            elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'report':
+                run = processing.get(parts[1])
+                self.send_json(200, {'id': run.id, 'status': run.status, 'report': run.report})
+            else:
+                self.send_json(404, {'error': f"未知路径: {self.path}"})
+        except KeyError as e:
+            self.send_json(404, {'error': e.args[0]})
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+        except Exception as e:
+            self.send_json(500, {'error': f"{type(e).__name__}: {e}"})
+
+    def do_POST(self):
+        parts, _ = self.route()
+        processing = self.server.processing
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            payload = json.loads(self.rfile.read(length) or b'{}') if length else {}
+            if parts == ['jobs']:
+                run = processing.submit(payload.get('user'), payload.get('input_folder'),
+                                        payload.get('output_folder'), bool(payload.get('resume')),
+                                        bool(payload.get('results_store')))
+                self.send_json(201, run.to_dict())
+            elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] in ('cancel', 'pause', 'resume'):
+                self.send_json(200, processing.control(parts[1], parts[2]).to_dict())
+            else:
+                self.send_json(404, {'error': f"未知路径: {self.path}"})
+        except KeyError as e:
+            self.send_json(404, {'error': e.args[0]})
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+        except Exception as e:
+            self.send_json(500, {'error': f"{type(e).__name__}: {e}"})
+
+    def log_message(self, format, *args):
+        pass  # 不在控制台输出每个请求
+
+
+# create_processing_server 函数
+# 创建绑定在 host:port 上的 HTTP 服务器（port 为 0 时由系统分配），processing 属性为任务队列
+def create_processing_server(host=SERVER_HOST, port=SERVER_PORT, max_runs=SERVER_MAX_RUNS):
+    http_server = ThreadingHTTPServer((host, port), ProcessingRequestHandler)
+    http_server.daemon_threads = True
+    http_server.processing = ProcessingServer(max_runs)
+    return http_server
+
 
+# serve_processing 函数
+# 服务器模式入口：python RC.py --server [--port 8765]
+def serve_processing(host=SERVER_HOST, port=SERVER_PORT, max_runs=SERVER_MAX_RUNS):
+    http_server = create_processing_server(host, port, max_runs)
+    print(f"PlateletPro 服务器已启动: http://{host}:{http_server.server_port}")
+    try:
+        http_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        http_server.server_close()
+
+
+# server_request 函数
+# 向处理服务器发送 JSON 请求并返回解析后的响应；服务器返回错误时抛出 RuntimeError
+def server_request(server_url, path, payload=None, timeout=10):
+    data = None if payload is None else json.dumps(payload).encode('utf-8')
+    request = urllib.request.Request(server_url.rstrip('/') + path, data=data,
+                                     headers={'Content-Type': 'application/json'},
+                                     method='GET' if payload is None else 'POST')
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+    except urllib.error.HTTPError as e:
+        raise RuntimeError(json.loads(e.read().decode('utf-8')).get('error', str(e)))
+
+
+# RemoteProcessorThread 类
+# 图形界面的瘦客户端：把任务提交给处理服务器，定时轮询状态，以与 FileProcessorThread 相同的信号回传进度、日志和报告
+class RemoteProcessorThread(QThread):
+    update_progress = pyqtSignal(int)
+    update_log = pyqtSignal(str)
+    processing_completed = pyqtSignal(list, dict, list)
+
+    def __init__(self, server_url, input_folder, output_folder, resume=False, poll_seconds=1.0,
+                 use_results_store=False):
+        super().__init__()
+        self.server_url = server_url
+        self.input_folder = input_folder
+        self.output_folder = output_folder
+        # 服务器端是否按运行日志跳过上次已完成的文件（不能命名为 resume，否则会覆盖 resume() 方法）
+        self.resume_journal = resume
+        self.use_results_store = use_results_store
+        self.poll_seconds = poll_seconds
+        self.run_id = None
+        self.cancelled = False
+        self._paused = False
+
+    def control(self, action):
+        if self.run_id is not None:
+            try:
+                server_request(self.server_url, f"/jobs/{self.run_id}/{action}", {})
+            except (OSError, RuntimeError) as e:
+                self.update_log.emit(f"无法{action}任务: {e}")
 
+    def cancel(self):
+        self.control('cancel')
+
+    def pause(self):
+        self._paused = True
+        self.control('pause')
+
+    def resume(self):
+        self._paused = False
+        self.control('resume')
+
+    def is_paused(self):
+        return self._paused
+
+    def run(self):
+        try:
+            run = server_request(self.server_url, '/jobs', {
+                'user': os.environ.get('USERNAME') or os.environ.get('USER'),
+                'input_folder': os.path.abspath(self.input_folder),
+                'output_folder': os.path.abspath(self.output_folder),
+                'resume': self.resume_journal, 'results_store': self.use_results_store})
+            self.run_id = run['id']
+            self.update_log.emit(f"已提交到处理服务器 {self.server_url}，任务编号 {self.run_id}")
+
+            since = 0
+            while run['status'] in ('queued', 'running'):
+                time.sleep(self.poll_seconds)
+                run = server_request(self.server_url, f"/jobs/{self.run_id}?since={since}")
+                if run['log']:
+                    self.update_log.emit('\n'.join(run['log']))
+                since = run['log_count']
+                self.update_progress.emit(run['progress'])
+
+            report = server_request(self.server_url, f"/jobs/{self.run_id}/report")['report'] or {}
+        except (OSError, RuntimeError) as e:
+            self.update_log.emit(f"处理服务器请求失败: {e}")
+            report = {'error_files': [{'file': self.input_folder, 'error_message': str(e)}]}
+            run = {'status': 'failed'}
+
+        self.cancelled = run['status'] == 'cancelled'
+        if run['status'] == 'failed' and run.get('error'):
+            self.update_log.emit(f"服务器处理失败: {run['error']}")
+        self.processing_completed.emit(report.get('processed_files', []),
+                                       report.get('file_type_counts') or FileProcessorThread.new_file_type_counts(),
+                                       report.get('error_files', []))
+
+
+# print_run_summary 函数
+# 命令行模式下打印处理计数、内存峰值最高的作业（memory_monitor 给定时）和出错文件
+def print_run_summary(file_type_counts, error_files, memory_monitor=None):
+    print("文件处理统计：")
+    for key, count in file_type_counts.items():
+        if count:
+            print(f"    {key}: {count}")
+    if memory_monitor is not None and memory_monitor.jobs:
+        print("内存峰值最高的作业：")
+        for record in memory_monitor.report(top=MEMORY_REPORT_TOP):
+            print(f"    {record['peak_mb']:.1f} MB（增长 {record['growth_mb']:.1f} MB）  {record['processor']}  {record['file']}")
+    for error_file in error_files:
+        print(f"出错文件: {error_file['file']}  错误信息: {error_file['error_message']}")
+
+
+# run_command_line 函数
+# 无界面的命令行入口，返回进程退出码（有出错文件时为 1）：
+#   python RC.py --server [--port 8765]
+#   python RC.py --batch --input IN --output OUT [--shard i/N] [--resume]
+#   python RC.py --merge --input IN --output OUT --shards N [--wait 秒]
+# 多台计算节点挂载同一共享目录时，每个节点用不同的 --shard 运行 --batch，全部完成后任一节点运行一次 --merge
+def run_command_line(argv):
+    parser = argparse.ArgumentParser(prog='RC.py', description="PlateletPro 命令行模式")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--server', action='store_true', help="启动本机处理服务器")
+    mode.add_argument('--batch', action='store_true', help="处理输入文件夹（可只处理一个分片）")
+    mode.add_argument('--merge', action='store_true', help="合并全部分片的可视化与汇总")
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument('--input')
+    parser.add_argument('--output')
+    parser.add_argument('--shard', type=parse_shard, default=None, help="i/N，i 从 0 开始")
+    parser.add_argument('--shards', type=int, default=None, help="合并时的分片总数 N")
+    parser.add_argument('--resume', action='store_true', help="跳过运行日志中已完成的文件")
+    parser.add_argument('--wait', type=float, default=0, help="合并时等待未完成分片的秒数")
+    parser.add_argument('--results-store', action='store_true', help="TEG / Transwell 结果写入列式结果库（需要 pyarrow）")
+    parser.add_argument('--no-dedup', action='store_true', help="不合并内容相同的输入文件，逐个处理")
+    parser.add_argument('--fa-backend', choices=('opencv', 'ffmpeg', 'auto'), default=FA_BACKEND,
+                        help="FA 解码后端，默认 opencv；ffmpeg 需显式指定")
+    parser.add_argument('--memory-budget', type=float, default=None,
+                        help="内存预算（MB），超出时才回收内存并暂缓放行视频等大作业；默认为物理内存的一半")
+    args = parser.parse_args(argv)
+
+    if args.server:
+        serve_processing(SERVER_HOST, args.port)
+        return 0
+    if not args.input or not args.output:
+        parser.error("--batch / --merge 需要 --input 和 --output")
+
+    memory_monitor = None
+    if args.merge:
+        if not args.shards:
+            parser.error("--merge 需要 --shards")
+        try:
+            processed_files, file_type_counts, error_files = merge_shards(args.input, args.output, args.shards,
+                                                                          args.wait, on_log=print)
+        except RuntimeError as e:
+            print(e)
+            return 1
+        print(f"已合并 {args.shards} 个分片的结果: {args.output}")
+    else:
+        os.makedirs(args.output, exist_ok=True)
+        result = {}
+        thread = FileProcessorThread(args.input, args.output, resume=args.resume, shard=args.shard,
+                                     use_results_store=args.results_store, deduplicate=not args.no_dedup,
+                                     fa_backend=args.fa_backend,
+                                     memory_budget=int(args.memory_budget * 1024 ** 2) if args.memory_budget else None)
+        thread.update_log.connect(print, Qt.ConnectionType.DirectConnection)
+        thread.processing_completed.connect(
+            lambda processed, counts, errors: result.update(counts=counts, errors=errors),
+            Qt.ConnectionType.DirectConnection)
+        thread.run()
+        file_type_counts, error_files = result['counts'], result['errors']
+        memory_monitor = thread.memory_monitor
+
+    print_run_summary(file_type_counts, error_files, memory_monitor)
+    return 1 if error_files else 0
 
 
 class FileProcessorApp(QMainWindow):
@@ -351,6 +2362,11 @@ class FileProcessorApp(QMainWindow):
         self.process_button.clicked.connect(self.start_processing)
         layout.addWidget(self.process_button)
 
+        # 监视按钮：持续处理输入文件夹中新出现的文件
+        self.watch_button = QPushButton("👁️监视文件夹")
+        self.watch_button.clicked.connect(self.start_watching)
+        layout.addWidget(self.watch_button)
+
         # 退出按钮
         exit_button = QPushButton("⏏️退出程序")
         exit_button.clicked.connect(self.close)
@@ -364,12 +2380,24 @@ class FileProcessorApp(QMainWindow):
         # 日志+进度条组合区域
         self.log_text = QTextEdit()
         self.log_text.setReadOnly(True)
+        # 只保留最近 LOG_VIEW_LINES 行，完整日志写入输出文件夹中的 plateletpro.log
+        self.log_text.document().setMaximumBlockCount(LOG_VIEW_LINES)
 
         self.progress_bar = QProgressBar()
 
+        # 暂停/继续与取消按钮，仅在处理过程中可用
+        control_layout = QHBoxLayout()
+        self.pause_button = QPushButton("⏸️暂停")
+        self.pause_button.clicked.connect(self.toggle_pause)
+        self.cancel_button = QPushButton("⏹️取消")
+        self.cancel_button.clicked.connect(self.cancel_processing)
+        control_layout.addWidget(self.pause_button)
+        control_layout.addWidget(self.cancel_button)
+
         self.log_group = QGroupBox("📄 日志记录")
         log_layout = QVBoxLayout()
         log_layout.addWidget(self.progress_bar)  # ✅ 进度条放进日志区域
+        log_layout.addLayout(control_layout)
         log_layout.addWidget(self.log_text)
         self.log_group.setLayout(log_layout)
 
@@ -560,7 +2588,7 @@ class FileProcessorApp(QMainWindow):
                 <td>根据数据特征进行识别和相应处理</td>
             </tr>
             <tr>
-                <td>.tif, .jpg, .jpeg</td>
+                <td>.tif, .tiff, .jpg, .jpeg</td>
                 <td>Transwell细胞穿膜实验图像</td>
                 <td>分析紫色区域占比并生成结果文件</td>
             </tr>
@@ -634,7 +2662,7 @@ class FileProcessorApp(QMainWindow):
         
         <section id="transwell">
             <h3>Transwell 细胞穿膜实验</h3>
-            <p><strong>支持文件类型：</strong>.tif, .jpg, .jpeg</p>
+            <p><strong>支持文件类型：</strong>.tif, .tiff, .jpg, .jpeg</p>
             <p><strong>处理流程：</strong></p>
             <ol>
                 <li>读取图像文件</li>
@@ -657,19 +2685,20 @@ class FileProcessorApp(QMainWindow):
             <h4>视频格式转换：</h4>
             <ul>
                 <li><strong>支持文件类型：</strong>.avi</li>
-                <li><strong>处理方式：</strong>转换为MP4格式</li>
+                <li><strong>处理方式：</strong>转换为MP4格式（H.264/HEVC/MPEG-4编码且安装了ffmpeg时直接流复制封装，不重新编码）</li>
                 <li><strong>输出文件：</strong>output-[原文件名]_a2m.mp4</li>
             </ul>
             
             <h4>荧光强度分析(FA)：</h4>
             <ul>
-                <li><strong>支持文件类型：</strong>.mov, .mp4 (小于10分钟的视频)</li>
+                <li><strong>支持文件类型：</strong>.mov, .mp4</li>
                 <li><strong>处理流程：</strong></li>
                 <ol>
                     <li>自动检测视频时长</li>
                     <li>对视频中五个固定区域(左上、右上、左下、右下、中心)进行荧光强度分析</li>
-                    <li>每秒采样一次，计算平均强度</li>
+                    <li>按采样规划只解码需要的帧：小于10分钟的视频每秒采样一次，10分钟以上的视频每5秒采样一次，计算平均强度</li>
                     <li>生成时间序列数据</li>
+                    <li>默认使用OpenCV解码，保证同一视频在不同机器上的结果一致；命令行可用 --fa-backend ffmpeg|auto 改用ffmpeg管道按同一采样帧号解码灰度帧（区域均值与OpenCV约有1%差异，采样帧不等间隔或未安装ffmpeg时自动回退OpenCV）</li>
                 </ol>
                 <li><strong>输出文件：</strong>output-[原文件名]_fa.csv</li>
             </ul>
@@ -698,7 +2727,7 @@ class FileProcessorApp(QMainWindow):
             <p><strong>支持文件类型：</strong>.cif</p>
             <p><strong>处理流程：</strong></p>
             <ol>
-                <li>使用Open Babel工具将CIF格式转换为PDB格式</li>
+                <li>mmCIF文件(如结构预测输出model_0.cif)由内置解析器直接转换为PDB格式；其他CIF使用Open Babel工具转换</li>
                 <li>保留原始文件的分子结构信息</li>
             </ol>
             <p><strong>输出文件：</strong>output-[原文件名].pdb</p>
@@ -773,7 +2802,7 @@ class FileProcessorApp(QMainWindow):
         <p>A: 视频处理通常较为耗时，特别是高分辨率或长时间的视频。请耐心等待处理完成。</p>
         
         <p class="question">Q: Open Babel相关错误</p>
-        <p>A: 分子结构文件转换依赖于Open Babel工具。请确保系统中正确安装了Open Babel，并已添加到系统PATH中。</p>
+        <p>A: 常见mmCIF文件无需Open Babel即可转换；内置解析器无法处理的CIF依赖于Open Babel工具。请确保系统中正确安装了Open Babel，并已添加到系统PATH中。</p>
     </section>
     
     <section id="contact">
@@ -814,12 +2843,48 @@ class FileProcessorApp(QMainWindow):
 
     # FileProcessorApp.start_processing 方法
     # 开始处理文件的方法
-    # 调整UI显示状态，创建并启动文件处理线程
+    # 检查上次中断留下的运行日志，创建并启动文件处理线程
     def start_processing(self):
         if not self.input_folder or not self.output_folder:
             self.log_text.append("请先选择输入和输出文件夹!")
             return
 
+        # 输出文件夹中留有上次中断的运行日志时，询问是否跳过已完成的文件继续处理
+        resume = False
+        journal = RunJournal(self.input_folder, self.output_folder)
+        if journal.exists():
+            if journal.load():
+                answer = QMessageBox.question(
+                    self, "继续上次处理",
+                    f"输出文件夹中有上次未完成的处理记录（已完成 {len(journal.completed)} 个文件）。\n"
+                    "是否跳过已完成的文件继续处理？选择“否”将重新处理全部文件。")
+                resume = answer == QMessageBox.StandardButton.Yes
+            if not resume:
+                os.remove(journal.path)
+
+        server_url = os.environ.get(SERVER_URL_ENV)
+        use_results_store = bool(os.environ.get(RESULTS_STORE_ENV))
+        if server_url:
+            self.launch_processing_thread(RemoteProcessorThread(server_url, self.input_folder, self.output_folder,
+                                                                resume=resume, use_results_store=use_results_store))
+        else:
+            self.launch_processing_thread(FileProcessorThread(self.input_folder, self.output_folder, resume=resume,
+                                                              use_results_store=use_results_store))
+
+    # FileProcessorApp.start_watching 方法
+    # 以监视模式启动处理线程，直到点击“停止监视”
+    def start_watching(self):
+        if not self.input_folder or not self.output_folder:
+            self.log_text.append("请先选择输入和输出文件夹!")
+            return
+
+        self.launch_processing_thread(WatchFolderThread(self.input_folder, self.output_folder,
+                                                        use_results_store=bool(os.environ.get(RESULTS_STORE_ENV))))
+        self.cancel_button.setText("⏹️停止监视")
+
+    # FileProcessorApp.launch_processing_thread 方法
+    # 调整UI显示状态，连接信号并启动处理线程
+    def launch_processing_thread(self, thread):
         # 重置界面状态
         self.progress_bar.setValue(0)
         self.log_text.clear()
@@ -828,9 +2893,14 @@ class FileProcessorApp(QMainWindow):
         self.input_button.setVisible(False)
         self.output_button.setVisible(False)
         self.process_button.setVisible(False)
+        self.watch_button.setVisible(False)
+        self.pause_button.setText("⏸️暂停")
+        self.pause_button.setEnabled(True)
+        self.cancel_button.setText("⏹️取消")
+        self.cancel_button.setEnabled(True)
 
         # ✅ 创建处理线程
-        self.processing_thread = FileProcessorThread(self.input_folder, self.output_folder)
+        self.processing_thread = thread
         self.processing_thread.update_progress.connect(self.update_progress)
         self.processing_thread.update_log.connect(self.update_log)
         self.processing_thread.processing_completed.connect(self.processing_completed)
@@ -839,6 +2909,26 @@ class FileProcessorApp(QMainWindow):
         # ✅ 启动线程
         self.processing_thread.start()
 
+    # FileProcessorApp.toggle_pause 方法
+    # 暂停或继续处理线程；暂停在各处理函数的下一个检查点生效
+    def toggle_pause(self):
+        if self.processing_thread.is_paused():
+            self.processing_thread.resume()
+            self.pause_button.setText("⏸️暂停")
+            self.log_text.append("继续处理")
+        else:
+            self.processing_thread.pause()
+            self.pause_button.setText("▶️继续")
+            self.log_text.append("已暂停，正在处理的文件会在下一个检查点停下")
+
+    # FileProcessorApp.cancel_processing 方法
+    # 请求取消处理：不再启动新文件，正在处理的文件在下一个检查点停止，已完成的文件保留在运行日志中
+    def cancel_processing(self):
+        self.processing_thread.cancel()
+        self.pause_button.setEnabled(False)
+        self.cancel_button.setEnabled(False)
+        self.log_text.append("正在取消，等待正在处理的文件停止...")
+
     # FileProcessorApp.update_progress 方法
     # 更新进度条显示的方法
     # 接收处理线程发送的进度信号并更新UI
@@ -855,7 +2945,11 @@ class FileProcessorApp(QMainWindow):
     # 处理完成后的回调方法
     # 显示处理统计信息，包括各类文件数量和错误信息，并弹出结果对话框
     def processing_completed(self, processed_files, file_type_counts, error_files):
-        summary_text = "处理完成！文件处理统计：\n"
+        cancelled = self.processing_thread.cancelled
+        if cancelled:
+            summary_text = "处理已取消！再次开始处理时可跳过已完成的文件。已完成文件统计：\n"
+        else:
+            summary_text = "处理完成！文件处理统计：\n"
         summary_text += f"    总文件数：{file_type_counts['Total']}\n"
         summary_text += f"    TEG文件：{file_type_counts['TEG']}\n"
         summary_text += f"    血小板聚集仪文件：{file_type_counts['AA']}\n"
@@ -866,6 +2960,18 @@ class FileProcessorApp(QMainWindow):
         summary_text += f"    cif转pdb文件：{file_type_counts['cif2pdb']}\n"
         summary_text += f"    xvg转CSV文件：{file_type_counts['xvg2csv']}\n"
         summary_text += f"    video2pic 文件：{file_type_counts['video2pic']}\n"
+        summary_text += f"    内容重复（复用结果）文件：{file_type_counts.get('Deduplicated', 0)}\n"
+        # 本地运行时附上内存峰值与占用最多的作业（远程运行的内存记录在服务器报告中）
+        memory_monitor = getattr(self.processing_thread, 'memory_monitor', None)
+        if memory_monitor is not None and memory_monitor.jobs:
+            summary_text += f"    {memory_monitor.summary()}\n"
+            for record in memory_monitor.report(top=MEMORY_REPORT_TOP):
+                summary_text += f"        {record['peak_mb']:.1f} MB  {os.path.basename(record['file'])}\n"
+        # 第三方插件的计数
+        for key, count in file_type_counts.items():
+            if key not in ('Total', 'TEG', 'AA', 'Transwell', 'AVI2MP4', 'MOV_MP4', 'Excel_CSV',
+                           'cif2pdb', 'xvg2csv', 'video2pic', 'Deduplicated'):
+                summary_text += f"    {key} 文件：{count}\n"
 
         # 添加错误文件报告
         if error_files:
@@ -880,43 +2986,58 @@ class FileProcessorApp(QMainWindow):
         # 添加弹窗提醒
         msg_box = QMessageBox()
         msg_box.setIcon(QMessageBox.Icon.Information)
-        msg_box.setText("FINISHED")
+        msg_box.setText("CANCELLED" if cancelled else "FINISHED")
         msg_box.setDetailedText(summary_text)
         msg_box.setWindowTitle("RESULT")
         msg_box.exec()
 
     def on_processing_thread_finished(self):
-        self.log_text.append("✅ 所有处理完成！可以在输出文件夹中查看结果。")
+        if self.processing_thread.cancelled:
+            self.log_text.append("⏹️ 处理已取消，已完成的结果保留在输出文件夹中。")
+        else:
+            self.log_text.append("✅ 所有处理完成！可以在输出文件夹中查看结果。")
+        self.pause_button.setEnabled(False)
+        self.cancel_button.setEnabled(False)
 
         # 如果你希望处理完成后恢复按钮可点击，也可以添加：
         self.folder_group.setVisible(True)
         self.input_button.setVisible(True)
         self.output_button.setVisible(True)
         self.process_button.setVisible(True)
+        self.watch_button.setVisible(True)
 
 
 # process_teg 函数
 # 处理TEG(血栓弹力图)数据文件，将输入的txt文件转换为带x、y、z三列的csv文件
 # 其中z列是y列的负值，用于数据可视化
 def process_teg(file_path, output_file_path):
+    df = read_teg_trace(file_path)
+
+    # 保存处理后的数据到指定输出文件
+    df.to_csv(output_file_path, index=False)
+
+    # 可选：打印处理完成的提示
+    logger.info(f"处理 CSV 文件: {output_file_path}")
+
+
+# read_teg_trace 函数
+# 读取 TEG 仪器导出的 txt，去掉单位后返回 x、y、z 三列（字符串），z 为 y 的负值
+def read_teg_trace(file_path):
     # 读取 CSV 文件并设置列名
-    df = pd.read_csv(file_path, header=None, names=['x', 'y'])
+    df = pd.read_csv(input_source(file_path), header=None, names=['x', 'y'])
 
     # 替换非数字和小数点的字符为空字符串
     df = df.replace({r'[^0-9.]': ''}, regex=True)
 
     # 新增一列 'z'，值为 'y' 列加负号
     df['z'] = '-' + df['y']
+    return df
 
-    # 保存处理后的数据到指定输出文件
-    df.to_csv(output_file_path, index=False)
 
-    # 可选：打印处理完成的提示
-    print(f"处理 CSV 文件: {output_file_path}")
 # process_video_screenshots 函数
-# 在视频的指定时间点截取帧并保存为图片
-# 根据传入的时间点列表(单位:分钟)生成截图，并保存到以视频名称命名的子文件夹中
-def process_video_screenshots(video_path, output_folder, timestamps):
+# 在视频的指定时间点截取帧并保存为图片，可选在同一次解码中生成缩略图拼版(contact sheet)
+# 预先规划全部帧号，按间隔大小在顺序 grab() 与关键帧 seek 之间选择，超出视频时长的时间点单独报告
+def process_video_screenshots(video_path, output_folder, timestamps, contact_sheet_frames=0, thumbnail_width=320):
     """
     对单个视频文件，在指定的时间点（以分钟为单位）生成截图，
     截图保存于 output_folder 下一个以视频文件名命名的子文件夹中。
@@ -928,6 +3049,13 @@ def process_video_screenshots(video_path, output_folder, timestamps):
             指定的输出根目录。
         timestamps: list of int/float
             时间点列表（单位分钟），将在这些时间点处截取视频帧。
+        contact_sheet_frames: int
+            大于 0 时，额外均匀抽取该数量的帧，缩小后拼成一张 "视频名_contact_sheet.jpg"。
+        thumbnail_width: int
+            拼版中每张缩略图的宽度（像素），高度按原始比例计算。
+
+    返回：
+        成功保存的图片路径列表。
     """
 
     # 获取视频文件基本名称（不含扩展名）
@@ -940,51 +3068,443 @@ def process_video_screenshots(video_path, output_folder, timestamps):
     cap = cv2.VideoCapture(video_path)
     fps = cap.get(cv2.CAP_PROP_FPS)
     if not fps or fps == 0:
-        print(f"无法获取视频 {video_path} 的帧率！")
+        logger.warning(f"无法获取视频 {video_path} 的帧率！")
         cap.release()
-        return
+        return []
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
 
-    # 遍历指定的时间点，生成截图
+    # 1. 规划截图帧号：frame -> 该帧对应的时间点（分钟）列表
+    screenshot_plan = {}
     for minute in timestamps:
         # 计算第 minute 分钟对应的帧号
         frame_number = int(fps * 60 * minute)
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-        ret, frame = cap.read()
-        if ret:
+        if total_frames and frame_number >= total_frames:
+            logger.info(f"视频 {video_path} 时长不足，{minute} 分钟超出视频长度，跳过截图")
+            continue
+        screenshot_plan.setdefault(frame_number, []).append(minute)
+
+    # 2. 规划缩略图帧号：在视频中均匀分布，取每段的中点
+    thumbnail_plan = []
+    if contact_sheet_frames and total_frames:
+        n_thumbnails = min(int(contact_sheet_frames), total_frames)
+        thumbnail_plan = ((np.arange(n_thumbnails) + 0.5) * total_frames / n_thumbnails).astype(int).tolist()
+    thumbnail_set = set(thumbnail_plan)
+
+    # 3. 一次顺序遍历所有需要的帧
+    saved_paths = []
+    thumbnails = {}
+    planned_frames = sorted(set(screenshot_plan) | thumbnail_set)
+    for frame_number, frame in iter_planned_frames(cap, planned_frames):
+        for minute in screenshot_plan.pop(frame_number, []):
             # 构造截图图片名称，格式为 "视频名_分钟min.jpg"
             img_filename = f"{video_name}_{minute}min.jpg"
             img_path = os.path.join(video_output_folder, img_filename)
             cv2.imwrite(img_path, frame)
-        else:
-            # 此处仅打印错误，详细错误处理由主脚本记录日志或计数
-            print(f"视频 {video_path} 在 {minute} 分钟处截图失败！")
+            saved_paths.append(img_path)
+        if frame_number in thumbnail_set:
+            height, width = frame.shape[:2]
+            thumbnail_height = max(1, int(height * thumbnail_width / width))
+            thumbnails[frame_number] = cv2.resize(frame, (thumbnail_width, thumbnail_height),
+                                                  interpolation=cv2.INTER_AREA)
     cap.release()
 
+    # 元数据中的帧数可能偏大，未能读取到的时间点在此报告
+    for minutes in screenshot_plan.values():
+        for minute in minutes:
+            # 此处仅打印错误，详细错误处理由主脚本记录日志或计数
+            logger.warning(f"视频 {video_path} 在 {minute} 分钟处截图失败！")
+
+    if thumbnails:
+        sheet_path = os.path.join(video_output_folder, f"{video_name}_contact_sheet.jpg")
+        cv2.imwrite(sheet_path, build_contact_sheet([thumbnails[f] for f in thumbnail_plan if f in thumbnails]))
+        saved_paths.append(sheet_path)
+
+    return saved_paths
+
+
+# build_contact_sheet 函数
+# 将尺寸相同的缩略图按近似正方形的网格拼接成一张图片，空位填黑
+def build_contact_sheet(thumbnails):
+    columns = int(np.ceil(np.sqrt(len(thumbnails))))
+    rows = int(np.ceil(len(thumbnails) / columns))
+    thumbnail_height, thumbnail_width = thumbnails[0].shape[:2]
+    sheet = np.zeros((rows * thumbnail_height, columns * thumbnail_width, 3), dtype=np.uint8)
+    for i, thumbnail in enumerate(thumbnails):
+        row, col = divmod(i, columns)
+        sheet[row * thumbnail_height:(row + 1) * thumbnail_height,
+              col * thumbnail_width:(col + 1) * thumbnail_width] = thumbnail
+    return sheet
+
+
+# CIF 转换参数
+# CIF_BATCH_SIZE 为每次 obabel 调用处理的文件数，CIF_WORKERS 为并发的 obabel 进程数
+# CIF_TIMEOUT 为单个文件允许的最长转换时间（秒），批量调用的超时按文件数等比放大
+CIF_BATCH_SIZE = 50
+CIF_WORKERS = max(1, os.cpu_count() or 1)
+CIF_TIMEOUT = 60
+
+
+# mmCIF 原生转换参数
+# CIF_TOKEN_PATTERN 按 CIF 规则切分值：引号内的值仅在引号后紧跟空白时结束，允许 O5' 这类原子名
+# PDB_CHAIN_IDS 为多字符链号截断时可分配的单字符链号
+CIF_TOKEN_PATTERN = re.compile(r"""'(.*?)'(?=\s|$)|"(.*?)"(?=\s|$)|(\S+)""")
+PDB_CHAIN_IDS = string.ascii_uppercase + string.ascii_lowercase + string.digits
+
+
+# split_cif_values 函数
+# 将一行 CIF 数据切分为值列表；不含引号的行（绝大多数原子行）直接按空白切分
+def split_cif_values(line):
+    if "'" not in line and '"' not in line:
+        return line.split()
+    return [a or b or c for a, b, c in CIF_TOKEN_PATTERN.findall(line)]
+
+
+# iter_cif_atom_site 函数
+# 流式解析 mmCIF 文件中的 _atom_site 循环，逐个原子产出 {字段名: 值} 字典
+# 只读取 _atom_site 循环本身，不构建整个 CIF 数据结构；不存在该循环时抛出 ValueError
+def iter_cif_atom_site(file_path):
+    fields = []
+    pending = []
+    in_header = False
+    in_rows = False
+
+    with open_input(file_path, 'r', errors='replace') as f:
+        for line in f:
+            stripped = line.strip()
+            if in_rows:
+                if not stripped or stripped.startswith('#'):
+                    continue
+                if stripped.startswith(('loop_', '_', 'data_')):
+                    break
+                if stripped.startswith(';'):
+                    raise ValueError("_atom_site 中包含多行文本字段，无法原生解析")
+                pending.extend(split_cif_values(stripped))
+                while len(pending) >= len(fields):
+                    yield dict(zip(fields, pending[:len(fields)]))
+                    del pending[:len(fields)]
+            elif stripped == 'loop_':
+                in_header = True
+                fields = []
+            elif in_header and stripped.startswith('_'):
+                if stripped.startswith('_atom_site.'):
+                    fields.append(stripped.split()[0][len('_atom_site.'):])
+                elif fields:
+                    break
+                else:
+                    in_header = False
+            elif in_header and fields:
+                in_header = False
+                in_rows = True
+                pending.extend(split_cif_values(stripped))
+                while len(pending) >= len(fields):
+                    yield dict(zip(fields, pending[:len(fields)]))
+                    del pending[:len(fields)]
+            else:
+                in_header = False
+
+    if not fields:
+        raise ValueError("未找到 _atom_site 循环")
+    if pending:
+        raise ValueError("_atom_site 循环的值数量与字段数量不一致")
+
+
+# format_pdb_atom_line 函数
+# 按 PDB 固定列宽格式生成一行 ATOM/HETATM 记录
+def format_pdb_atom_line(record, serial, name, alt_loc, res_name, chain_id, res_seq, i_code,
+                         x, y, z, occupancy, b_factor, element, charge):
+    # 单字母元素且名称不足 4 个字符时，原子名从第 14 列开始（例如 " CA "）
+    if len(name) < 4 and len(element) == 1:
+        name = f" {name}"
+    # 残基号 -999..9999 原样写出，超过 9999 时与 obabel 一样回绕；小于 -999 无法写入 4 列，交由 obabel 处理
+    if res_seq < -999:
+        raise ValueError(f"残基号 {res_seq} 超出 PDB 格式范围")
+    if res_seq > 9999:
+        res_seq %= 10000
+    return (f"{record:<6}{serial % 100000:>5} {name:<4}{alt_loc:1}{res_name:>3} {chain_id:1}"
+            f"{res_seq:>4}{i_code:1}   {x:>8.3f}{y:>8.3f}{z:>8.3f}{occupancy:>6.2f}{b_factor:>6.2f}"
+            f"          {element:>2}{charge:>2}\n")
+
+
+# convert_cif_native 函数
+# 纯 Python 的 mmCIF → PDB 转换：流式读取 _atom_site 并直接写出 ATOM/HETATM 记录
+# 支持多模型（MODEL/ENDMDL）和多字符链号截断；遇到无法处理的 CIF 时抛出 ValueError，由调用方回退 obabel
+def convert_cif_native(file_path, output_file_path):
+    def value(atom, *keys, default=''):
+        for key in keys:
+            v = atom.get(key)
+            if v is not None and v not in ('?', '.'):
+                return v
+        return default
+
+    def atom_chain(atom):
+        return value(atom, 'auth_asym_id', 'label_asym_id', default='A')
+
+    chain_map = {}
+    reserved = None
+
+    # 多字符链号截断为未被占用的单字符链号：第一次遇到多字符链号时预先扫描整个文件，
+    # 文件中真实存在的单字符链号都不能再分配；没有可用链号时抛出 ValueError，由调用方回退 obabel
+    def pdb_chain(chain_id):
+        nonlocal reserved
+        if len(chain_id) <= 1:
+            return chain_id
+        if chain_id not in chain_map:
+            if reserved is None:
+                reserved = {c for c in map(atom_chain, iter_cif_atom_site(file_path)) if len(c) <= 1}
+            used = reserved | set(chain_map.values())
+            free = [c for c in PDB_CHAIN_IDS if c not in used]
+            if not free:
+                raise ValueError("可用的单字符链号不足，无法截断多字符链号")
+            chain_map[chain_id] = free[0]
+        return chain_map[chain_id]
+
+    model_lines = []
+    models_written = 0
+    current_model = None
+    last_chain = None
+    atom_count = 0
+    serial = 0
+
+    tmp_path = output_file_path + '.part'
+    try:
+        with open(tmp_path, 'w') as out:
+            def flush_model(final):
+                nonlocal models_written
+                if not model_lines:
+                    return
+                # 只有一个模型时不写 MODEL/ENDMDL，与 obabel 输出保持一致
+                multi_model = models_written > 0 or not final
+                if multi_model:
+                    out.write(f"MODEL     {models_written + 1:>4}\n")
+                out.writelines(model_lines)
+                out.write("TER\n")
+                if multi_model:
+                    out.write("ENDMDL\n")
+                models_written += 1
+                model_lines.clear()
+
+            out.write(f"COMPND    {os.path.splitext(os.path.basename(file_path))[0]}\n")
+            for atom in iter_cif_atom_site(file_path):
+                if 'Cartn_x' not in atom:
+                    raise ValueError("_atom_site 中没有笛卡尔坐标")
+                model = value(atom, 'pdbx_PDB_model_num', default='1')
+                if current_model is not None and model != current_model:
+                    flush_model(final=False)
+                    serial = 0
+                    last_chain = None
+                current_model = model
+
+                chain_id = pdb_chain(atom_chain(atom))
+                if last_chain is not None and chain_id != last_chain:
+                    model_lines.append("TER\n")
+                last_chain = chain_id
+
+                element = value(atom, 'type_symbol').upper()[:2]
+                charge = value(atom, 'pdbx_formal_charge', default='0')
+                charge = '' if charge in ('0', '+0', '-0') else f"{charge.lstrip('+-')}{'-' if charge.startswith('-') else '+'}"
+                serial += 1
+                model_lines.append(format_pdb_atom_line(
+                    'HETATM' if value(atom, 'group_PDB') == 'HETATM' else 'ATOM',
+                    serial,
+                    value(atom, 'auth_atom_id', 'label_atom_id')[:4],
+                    value(atom, 'label_alt_id')[:1],
+                    value(atom, 'auth_comp_id', 'label_comp_id')[:3],
+                    chain_id,
+                    int(value(atom, 'auth_seq_id', 'label_seq_id', default='0')),
+                    value(atom, 'pdbx_PDB_ins_code')[:1],
+                    float(atom['Cartn_x']), float(atom['Cartn_y']), float(atom['Cartn_z']),
+                    float(value(atom, 'occupancy', default='1')),
+                    float(value(atom, 'B_iso_or_equiv', default='0')),
+                    element,
+                    charge[:2],
+                ))
+                atom_count += 1
+            flush_model(final=True)
+            out.write("END\n")
+
+        if atom_count == 0:
+            raise ValueError("_atom_site 中没有原子")
+        os.replace(tmp_path, output_file_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if chain_map:
+        logger.warning(f"{file_path} 的多字符链号已截断: {chain_map}")
+    return atom_count
+
+
 # process_cif2pdb 函数
 # 将.cif分子结构文件转换为.pdb格式
-# 调用Open Babel工具执行转换，适用于分子建模数据处理
-def process_cif2pdb(file_path, output_file_path):
+# 默认先用原生 mmCIF 解析器转换，无法处理的 CIF 再调用Open Babel工具执行转换
+def process_cif2pdb(file_path, output_file_path, timeout=CIF_TIMEOUT, native=True):
     """
-    将指定的 .cif 文件转换为 .pdb 文件。依赖于 Open Babel 工具，
-    要求传入的文件名中包含 'model_0' 作为符合条件的标识。
+    将指定的 .cif 文件转换为 .pdb 文件。结构预测输出（例如 model_0.cif）等 mmCIF
+    文件由 convert_cif_native 直接转换；其余 CIF 依赖于 Open Babel 工具。
+    转换失败或超时会抛出异常，由调用方记录到错误列表。
     """
+    if native:
+        try:
+            convert_cif_native(file_path, output_file_path)
+            logger.info(f"Converted {file_path} to {output_file_path}")
+            return
+        except (ValueError, KeyError, UnicodeError) as e:
+            logger.warning(f"原生解析 {file_path} 失败，改用 obabel: {e}")
+
     try:
-        subprocess.run(["obabel", file_path, "-O", output_file_path], check=True)
-        print(f"Converted {file_path} to {output_file_path}")
+        with local_input_path(file_path) as local_path:
+            subprocess.run(["obabel", local_path, "-O", output_file_path], check=True, timeout=timeout,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    except subprocess.TimeoutExpired:
+        raise RuntimeError(f"obabel 转换超时（{timeout}s）: {file_path}")
     except subprocess.CalledProcessError as e:
-        print(f"Error converting {file_path}: {e}")
+        raise RuntimeError(f"obabel 转换失败: {e.stderr.decode(errors='ignore').strip() or e}")
+    except FileNotFoundError:
+        raise RuntimeError("未找到 obabel，请确认 Open Babel 已安装并添加到系统PATH中")
+    # obabel 无法解析输入时仍返回 0，只输出 "0 molecules converted" 和空文件
+    if not os.path.isfile(output_file_path) or os.path.getsize(output_file_path) == 0:
+        if os.path.exists(output_file_path):
+            os.remove(output_file_path)
+        raise RuntimeError(f"obabel 未能从 {file_path} 中转换出任何分子")
+    logger.info(f"Converted {file_path} to {output_file_path}")
+
+
+# convert_cif_batch 函数
+# 将一批 .cif 文件合并为一次 obabel 多输入调用，减少进程启动与力场表加载开销
+# 多输入配合 -m 时 obabel 按输入顺序逐个输出 "batch<文件名>.pdb"，据此回收每个文件的结果
+# 每次批量调用的超时固定为单个文件的 timeout：超时时回收已完成的文件，卡住的文件单独转换，其后的文件重新组成一批，
+# 一个卡住的文件只额外耗费约一个 timeout；批量调用出错或个别文件没有输出时，对这些文件逐个重新转换以隔离问题文件
+def convert_cif_batch(jobs, timeout=CIF_TIMEOUT):
+    """
+    参数：
+        jobs: list of (cif_path, pdb_path)
+    返回：
+        dict，键为 cif_path，值为 None（成功）或错误信息字符串。
+    """
+    results = {}
+    retry = []
+    remaining = list(jobs)
+    stems = [os.path.splitext(os.path.basename(cif_path))[0] for cif_path, _ in jobs]
+    if len(set(stems)) != len(stems):
+        remaining, retry = [], list(jobs)
+
+    while len(remaining) > 1:
+        batch_dir = tempfile.mkdtemp(prefix='cif_batch_', dir=os.path.dirname(remaining[0][1]) or None)
+        batch_outputs = [os.path.join(batch_dir, f"batch{os.path.splitext(os.path.basename(cif_path))[0]}.pdb")
+                         for cif_path, _ in remaining]
+        timed_out = False
+        try:
+            command = ["obabel"] + [cif_path for cif_path, _ in remaining] + \
+                      ["-opdb", "-m", "-O", os.path.join(batch_dir, "batch.pdb")]
+            subprocess.run(command, check=True, timeout=timeout,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+        except (subprocess.SubprocessError, OSError):
+            retry.extend(remaining)
+            shutil.rmtree(batch_dir, ignore_errors=True)
+            break
+
+        produced = [i for i, path in enumerate(batch_outputs) if os.path.isfile(path) and os.path.getsize(path) > 0]
+        # 超时时最后一个产出的文件可能尚未写完，不回收；卡住的是它之后的文件，其余文件重新组成一批
+        last = (produced[-1] if produced else -1) if timed_out else len(remaining)
+        for i, (cif_path, pdb_path) in enumerate(remaining[:max(last, 0)]):
+            if i in produced:
+                shutil.move(batch_outputs[i], pdb_path)
+                results[cif_path] = None
+            else:
+                retry.append((cif_path, pdb_path))
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        logger.info(f"Converted {len(results)}/{len(jobs)} cif files in obabel batches")
+        if not timed_out:
+            remaining = []
+            break
+        hung = last + 1
+        logger.warning(f"obabel 批量转换超时（{timeout}s），{remaining[hung][0] if hung < len(remaining) else ''} "
+                       f"单独转换，其后的文件重新批量转换")
+        retry.extend(remaining[max(last, 0):hung + 1])
+        remaining = remaining[hung + 1:]
+    retry.extend(remaining)
+
+    # 单文件、批量失败、批量中未产出或超时时卡住的文件：逐个转换
+    for cif_path, pdb_path in retry:
+        if cif_path in results:
+            continue
+        try:
+            process_cif2pdb(cif_path, pdb_path, timeout=timeout, native=False)
+            results[cif_path] = None
+        except Exception as e:
+            results[cif_path] = str(e)
+    return results
+
+
+# convert_cif_files 函数
+# CIF 转换阶段：先逐个尝试原生 mmCIF 转换，原生无法处理的文件再交给 obabel
+# obabel 部分按 batch_size 分批，在有界线程池中并发执行
+# 返回 dict，键为 cif_path，值为 None（成功）或错误信息字符串
+def convert_cif_files(jobs, batch_size=CIF_BATCH_SIZE, workers=CIF_WORKERS, timeout=CIF_TIMEOUT, native=True,
+                      checkpoint=None):
+    results = {}
+    obabel_jobs = []
+    for cif_path, pdb_path in jobs:
+        if checkpoint is not None:
+            checkpoint()  # 暂停 / 取消检查点
+        if native:
+            try:
+                convert_cif_native(cif_path, pdb_path)
+                results[cif_path] = None
+                continue
+            except (ValueError, KeyError, UnicodeError) as e:
+                logger.warning(f"原生解析 {cif_path} 失败，改用 obabel: {e}")
+        obabel_jobs.append((cif_path, pdb_path))
+
+    if not obabel_jobs:
+        return results
+
+    # obabel 需要真实文件路径：压缩包成员先写出到临时文件，结果再对应回原路径
+    with contextlib.ExitStack() as stack:
+        local_paths = {}
+        local_jobs = []
+        for cif_path, pdb_path in obabel_jobs:
+            local_path = stack.enter_context(local_input_path(cif_path))
+            local_paths[local_path] = cif_path
+            local_jobs.append((local_path, pdb_path))
+        batches = [local_jobs[i:i + batch_size] for i in range(0, len(local_jobs), batch_size)]
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(batches)))) as executor:
+            for batch_results in executor.map(lambda batch: convert_cif_batch(batch, timeout), batches):
+                results.update((local_paths[path], error) for path, error in batch_results.items())
+    return results
+
+
+# visualization_roots 函数
+# 可视化函数要处理的输入文件夹列表：folders 为 None 时遍历整个输入树
+# 否则只返回 folders 中给出的相对路径，用于监视模式下只重建有新结果的文件夹
+def visualization_roots(input_folder, folders=None):
+    if folders is None:
+        roots = []
+        for root, dirs, files in os.walk(input_folder):
+            roots.append(root)
+            # 压缩包按虚拟文件夹展开（data.zip -> data/...），与扫描时的输出文件夹一致
+            for file in files:
+                name = archive_folder_name(file)
+                if name is not None:
+                    roots.extend(os.path.normpath(os.path.join(root, name, folder))
+                                 for folder in natsort.natsorted(archive_folders(os.path.join(root, file))))
+        return list(dict.fromkeys(roots))
+    return [os.path.normpath(os.path.join(input_folder, folder)) for folder in natsort.natsorted(folders)]
+
 
 # visualize_teg_files 函数
 # 收集并整合所有TEG数据文件，生成可视化汇总文件
 # 递归处理所有子文件夹中的TEG文件，汇总成单个可视化CSV文件便于绘图分析
-def visualize_teg_files(input_folder, output_folder):
-    print(f"开始TEG可视化处理: {input_folder}")
+def visualize_teg_files(input_folder, output_folder, folders=None):
+    logger.info(f"开始TEG可视化处理: {input_folder}")
 
     # 存储所有生成的可视化文件路径
     all_visualized_files = []
 
-    # 递归处理所有子文件夹
-    for root, dirs, files in os.walk(input_folder):
+    # 递归处理所有子文件夹（folders 给定时只处理这些子文件夹）
+    for root in visualization_roots(input_folder, folders):
         # 计算当前处理的输出文件夹
         relative_path = os.path.relpath(root, input_folder)
         current_output_folder = os.path.join(output_folder, relative_path)
@@ -1004,10 +3524,10 @@ def visualize_teg_files(input_folder, output_folder):
                     if set(['x', 'y', 'z']).issubset(df.columns) :
                         teg_files.append(f)
                 except Exception as e:
-                    print(f"校验文件 {f} 时出错: {e}")
+                    logger.warning(f"校验文件 {f} 时出错: {e}")
 
         teg_files = natsort.natsorted(teg_files)  # 自然排序文件名
-        print(f"检测到TEG文件: {teg_files}")
+        logger.debug(f"检测到TEG文件: {teg_files}")
 
         # 如果没有文件，跳过当前文件夹
         if not teg_files:
@@ -1032,33 +3552,130 @@ def visualize_teg_files(input_folder, output_folder):
                     'z': df['z'].tolist()
                 }
             except Exception as e:
-                print(f"读取文件 {file} 时出错: {e}")
+                logger.warning(f"读取文件 {file} 时出错: {e}")
 
         # 如果没有成功读取任何数据
         if not all_data:
-            print("未成功读取任何TEG数据")
+            logger.warning("未成功读取任何TEG数据")
             continue
 
-        # 创建统一的x轴
-        x_axis = [x * 5 for x in range(max_x_length)]
-
-        # 创建最终的DataFrame
-        result_df = pd.DataFrame({'x': x_axis})
-
-        # 填充数据，缺失值用NaN补全
-        for filename, data in all_data.items():
-            result_df[f'{filename}_y'] = pd.Series(data['y'] + [None] * (max_x_length - len(data['y'])))
-            result_df[f'{filename}_z'] = pd.Series(data['z'] + [None] * (max_x_length - len(data['z'])))
-
         # 生成可视化CSV文件
         visualized_file_path = os.path.join(current_output_folder, f'visualized-{os.path.basename(root)}_teg.csv')
-        result_df.to_csv(visualized_file_path, index=False)
-        print(f"生成可视化CSV: {visualized_file_path}")
+        write_teg_visualization(all_data, max_x_length, visualized_file_path)
+
+        # 生成TEG参数表（R、K、α角、MA、LY30）
+        parameters_file_path = os.path.join(current_output_folder,
+                                            f'visualized-{os.path.basename(root)}_teg_parameters.csv')
+        write_teg_parameters(all_data, max_x_length, parameters_file_path)
 
         # 收集所有生成的可视化文件路径
-        all_visualized_files.append(visualized_file_path)
+        all_visualized_files.extend([visualized_file_path, parameters_file_path])
 
     return all_visualized_files  # 返回所有生成的文件路径列表
+
+
+# write_teg_visualization 函数
+# 把 {输出文件名: {'y': [...], 'z': [...]}} 写成以 5 秒为间隔的统一 x 轴宽表，较短的曲线用空值补齐
+def write_teg_visualization(all_data, max_x_length, visualized_file_path):
+    # 创建统一的x轴
+    x_axis = [x * TEG_SAMPLE_SECONDS for x in range(max_x_length)]
+
+    # 先收集全部列再一次构建DataFrame（逐列插入会使DataFrame碎片化），缺失值用NaN补全
+    columns = {'x': x_axis}
+    for filename, data in all_data.items():
+        columns[f'{filename}_y'] = pd.Series(data['y'] + [None] * (max_x_length - len(data['y'])))
+        columns[f'{filename}_z'] = pd.Series(data['z'] + [None] * (max_x_length - len(data['z'])))
+    result_df = pd.DataFrame(columns)
+
+    result_df.to_csv(visualized_file_path, index=False)
+    logger.info(f"生成可视化CSV: {visualized_file_path}")
+
+
+# TEG 参数：仪器每 TEG_SAMPLE_SECONDS 秒记录一个振幅（mm）；R / K 为振幅达到 2mm / 20mm 的时间
+# LY30 为最大振幅后 30 分钟内的溶解百分比；α 角按描记图纸速把时间换算为长度（标准描记图 2mm/min）
+TEG_SAMPLE_SECONDS = 5
+TEG_R_AMPLITUDE = 2.0
+TEG_K_AMPLITUDE = 20.0
+TEG_LYSIS_MINUTES = 30
+TEG_CHART_MM_PER_MIN = 2.0
+# α 角切线只考虑 R 之后至少这么多分钟的采样点，避免紧邻 R 点的噪声被放大为很大的斜率
+TEG_ALPHA_MIN_MINUTES = 1.0
+
+
+# threshold_crossing_times 函数
+# 振幅矩阵（每行一条曲线）中每行第一次达到 threshold 的时间，按相邻两个采样点线性插值；从未达到时为 NaN
+# threshold 可以是所有曲线共用的标量，也可以是每行一个阈值的数组
+def threshold_crossing_times(amplitudes, times, threshold):
+    threshold = np.asarray(threshold, dtype=float)
+    reached = amplitudes >= threshold[..., np.newaxis]  # NaN 比较结果为 False
+    index = reached.argmax(axis=1)
+    rows = np.arange(len(amplitudes))
+    previous = np.maximum(index - 1, 0)
+    a0, a1 = amplitudes[rows, previous], amplitudes[rows, index]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fraction = np.clip(np.where(a1 > a0, (threshold - a0) / (a1 - a0), 1.0), 0, 1)
+    crossing = times[previous] + fraction * (times[index] - times[previous])
+    return np.where(reached.any(axis=1), crossing, np.nan)
+
+
+# compute_teg_parameters 函数
+# 对补齐为同一长度的振幅矩阵（每行一条 TEG 曲线，末尾用 NaN 补齐）一次性计算全部曲线的参数：
+#   R(min)：振幅达到 2mm 的时间；K(min)：从 R 到振幅达到 20mm 的时间；MA(mm)：最大振幅
+#   α(deg)：从 R 点出发与曲线相切的直线的倾角，描记图上下对称，上支高度为振幅的一半
+#   LY30(%)：MA 之后 30 分钟内曲线下面积相对 MA×30min 的减少比例，曲线不足 30 分钟时为 NaN
+# 返回 {参数名: 每条曲线的值数组}
+def compute_teg_parameters(amplitudes, sample_seconds=TEG_SAMPLE_SECONDS):
+    amplitudes = np.asarray(amplitudes, dtype=float)
+    n_traces, n_samples = amplitudes.shape
+    times = np.arange(n_samples) * sample_seconds / 60
+    r_time = threshold_crossing_times(amplitudes, times, TEG_R_AMPLITUDE)
+    k_time = threshold_crossing_times(amplitudes, times, TEG_K_AMPLITUDE) - r_time
+
+    # α 角：R 点之后各采样点与 R 点连线斜率的最大值即切线斜率
+    with np.errstate(invalid='ignore', divide='ignore'):
+        elapsed = times[None, :] - r_time[:, None]
+        rise = (amplitudes - TEG_R_AMPLITUDE) / 2
+        slopes = np.where(elapsed >= TEG_ALPHA_MIN_MINUTES, rise / (elapsed * TEG_CHART_MM_PER_MIN), np.nan)
+    alpha = np.degrees(np.arctan(np.fmax.reduce(slopes, axis=1)))
+
+    # MA 与其位置（全为 NaN 的曲线 MA 为 NaN）
+    valid = ~np.isnan(amplitudes)
+    filled = np.where(valid, amplitudes, 0.0)
+    ma = np.fmax.reduce(amplitudes, axis=1)
+    ma_index = np.where(valid, amplitudes, -np.inf).argmax(axis=1)
+
+    # LY30：按梯形累积面积相减得到 MA 之后 30 分钟窗口内的面积
+    window = int(round(TEG_LYSIS_MINUTES * 60 / sample_seconds))
+    dt = sample_seconds / 60
+    cumulative = np.zeros((n_traces, n_samples))
+    cumulative[:, 1:] = np.cumsum((filled[:, 1:] + filled[:, :-1]) / 2 * dt, axis=1)
+    end_index = ma_index + window
+    lengths = valid.sum(axis=1)
+    complete = end_index < lengths
+    rows = np.arange(n_traces)
+    area = cumulative[rows, np.minimum(end_index, n_samples - 1)] - cumulative[rows, ma_index]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ly30 = np.where(complete & (ma > 0), (1 - area / (ma * TEG_LYSIS_MINUTES)) * 100, np.nan)
+
+    return {'R(min)': r_time, 'K(min)': k_time, 'alpha(deg)': alpha, 'MA(mm)': ma, 'LY30(%)': ly30}
+
+
+# write_teg_parameters 函数
+# 把同一文件夹中的全部 TEG 曲线补齐为一个 NumPy 矩阵，向量化计算参数后写出参数表（每行一个输出文件）
+def write_teg_parameters(all_data, max_x_length, parameters_file_path):
+    amplitudes = np.full((len(all_data), max_x_length), np.nan)
+    for row, data in enumerate(all_data.values()):
+        try:
+            values = np.asarray(data['y'], dtype=float)
+        except (TypeError, ValueError):
+            values = pd.to_numeric(pd.Series(data['y'], dtype=object), errors='coerce').to_numpy(dtype=float)
+        amplitudes[row, :len(values)] = values
+    parameters = compute_teg_parameters(amplitudes)
+    parameters_df = pd.DataFrame({'file': list(all_data), **parameters}).round(2)
+    parameters_df.to_csv(parameters_file_path, index=False)
+    logger.info(f"生成TEG参数表: {parameters_file_path}")
+
+
 # process_mr 函数
 # 处理酶标仪(MicroReader)数据文件，转换为标准格式
 # 将96孔板格式数据重组为更易于分析的表格形式
@@ -1067,9 +3684,9 @@ def process_mr(file_path, output_file_path):
     # skiprows=1 跳过第一行标题（Reading 1）
     # header=None 方便后续通过索引切片
     if file_path.endswith('.csv'):
-        df = pd.read_csv(file_path, header=None, skiprows=1, encoding='GB18030')
+        df = pd.read_csv(input_source(file_path), header=None, skiprows=1, encoding='GB18030')
     else:
-        df = pd.read_excel(file_path, header=None, skiprows=1)
+        df = pd.read_excel(input_source(file_path), header=None, skiprows=1)
 
     # 2. 提取纯数据区域 (第 1 到 12 列)
     # 第一列 (索引 0) 是 A, B, C... 标签，予以排除
@@ -1111,7 +3728,36 @@ def process_mr(file_path, output_file_path):
     else:
         result.to_excel(output_file_path, index=False)
 
-    print(f"处理完成！列标题为孔位，每一行对应一次读数。保存至: {output_file_path}")
+    logger.info(f"处理完成！列标题为孔位，每一行对应一次读数。保存至: {output_file_path}")
+
+
+# convert_xvg_file 函数
+# 将单个 .xvg 文件转换为 CSV：忽略以 @ 或 # 开头的注释行，不包含索引与表头
+# 文件中没有数据时返回 False
+def convert_xvg_file(file_path, csv_path):
+    # 读取 .xvg 文件（忽略注释行）
+    data = []
+    with open_input(file_path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith(('#', '@')):
+                data.append(line.split())
+
+    if not data:
+        logger.warning(f"Warning: No data in {file_path}")
+        return False
+
+    # 转换数据为 DataFrame 并写入 CSV 文件，不包含索引与表头
+    pd.DataFrame(data).to_csv(csv_path, index=False, header=False)
+    logger.info(f"Converted: {file_path} → {csv_path}")
+    return True
+
+
+# xvg_csv_path 函数
+# 构造输出文件名：当前目录名 + "_" + 原文件名（不含扩展名） + ".csv"
+def xvg_csv_path(file_path, output_dir):
+    current_folder_name = os.path.basename(os.path.normpath(os.path.dirname(os.path.abspath(file_path))))
+    return os.path.join(output_dir, f"{current_folder_name}_{os.path.splitext(os.path.basename(file_path))[0]}.csv")
 
 
 # xvg2csv 函数
@@ -1127,124 +3773,363 @@ def xvg2csv(input_folder, output_dir):
     # 确保输出目录存在
     os.makedirs(output_dir, exist_ok=True)
 
-    # 获取当前目录名作为文件名前缀
-    current_folder_name = os.path.basename(os.path.normpath(input_folder))
-
     # 列出指定目录中的所有文件（不使用 os.walk 递归）
     for file in os.listdir(input_folder):
         file_path = os.path.join(input_folder, file)
         if os.path.isfile(file_path) and file.endswith(".xvg"):
-            # 读取 .xvg 文件（忽略注释行）
-            data = []
-            with open(file_path, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith(('#', '@')):
-                        try:
-                            parts = line.split()
-                            data.append(parts)
-                        except Exception as e:
-                            print(f"Error parsing line in {file_path}: {line}")
+            convert_xvg_file(file_path, xvg_csv_path(file_path, output_dir))
 
-            if not data:
-                print(f"Warning: No data in {file_path}")
-                continue
 
-            # 转换数据为 DataFrame
-            df = pd.DataFrame(data)
+# replace_outliers 函数
+# 基于相邻差值的离群点替换，对 (时间 × 区域) 数组按列向量化处理
+# 同时偏离前后两个采样点超过阈值的点，用前后两点的均值替换
+def replace_outliers(data, threshold_factor=3):
+    """
+    对二维数组（行为时间，列为区域）的每一列进行离群点替换。
+    阈值为每列相邻差值标准差的 threshold_factor 倍；一维输入按单列处理。
+    """
+    data = np.array(data, dtype=float)
+    squeeze = data.ndim == 1
+    if squeeze:
+        data = data[:, np.newaxis]
+    if data.shape[0] < 3:
+        return data[:, 0] if squeeze else data
+
+    diffs = np.diff(data, axis=0)
+    threshold = threshold_factor * np.std(diffs, axis=0)
+
+    # 先按原始数值一次性判断全部点：diffs[:-1] 为当前点与前一点之差，diffs[1:] 为后一点与当前点之差
+    mask = (np.abs(diffs[:-1]) > threshold) & (np.abs(diffs[1:]) > threshold)
+    result = data.copy()
+    result[1:-1] = np.where(mask, (data[:-2] + data[2:]) / 2, data[1:-1])
+
+    # 逐点替换时，判断第 i 点用的是已被替换后的前一点；只有前一点被替换的少数点需要按顺序重新判断，
+    # 沿后续点继续传递，直到某点的结果不再改变
+    n_rows = len(data)
+    for row, column in sorted(zip(*np.nonzero(mask)), key=lambda index: (index[1], index[0])):
+        i = row + 2  # mask 第 row 行对应第 row + 1 个点，需要重新判断的是它的后一点
+        while i < n_rows - 1:
+            previous, value, following = result[i - 1, column], data[i, column], data[i + 1, column]
+            if abs(value - previous) > threshold[column] and abs(value - following) > threshold[column]:
+                value = (previous + following) / 2
+            if value == result[i, column]:
+                break
+            result[i, column] = value
+            i += 1
+    return result[:, 0] if squeeze else result
+
+
+# rolling_median_filter 函数
+# 对 (时间 × 区域) 数组沿时间轴做居中滑动中值滤波
+# 边界采用边缘值填充，输出长度与输入一致
+def rolling_median_filter(data, window=5):
+    data = np.asarray(data, dtype=float)
+    window = int(window)
+    if window < 2 or data.shape[0] < 2:
+        return data
+    if window % 2 == 0:
+        window += 1  # 保证窗口居中
+    half = window // 2
+    pad_width = [(half, half)] + [(0, 0)] * (data.ndim - 1)
+    padded = np.pad(data, pad_width, mode='edge')
+    windows = np.lib.stride_tricks.sliding_window_view(padded, window, axis=0)
+    return np.median(windows, axis=-1)
+
+
+# plan_sample_frames 函数
+# 根据目标采样率和可选的起止时间，预先计算需要解码的帧号
+# 返回 (帧号数组, 对应时间数组)，时间单位为秒
+def plan_sample_frames(fps, total_frames, sample_rate=FA_SAMPLE_RATE, start_time=None, end_time=None):
+    """
+    参数：
+        fps: float
+            视频帧率，允许小于 1。
+        total_frames: int/float
+            视频总帧数。
+        sample_rate: float
+            目标采样率（每秒采样次数），例如 0.2 表示每 5 秒一次，10 表示每秒 10 次。
+        start_time, end_time: float 或 None
+            分析时间窗口（秒），None 表示从头开始 / 到视频结束。
+    """
+    empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=float))
+    if sample_rate is None or sample_rate <= 0:
+        raise ValueError(f"采样率必须为正数: {sample_rate}")
+    if not fps or fps <= 0 or not total_frames or total_frames <= 0:
+        return empty
+
+    duration = total_frames / fps
+    start = max(0.0, float(start_time or 0.0))
+    end = duration if end_time is None else min(float(end_time), duration)
+    if end <= start:
+        return empty
+
+    # 采样时间点严格落在 [start, end) 内
+    n_samples = int(np.ceil((end - start) * sample_rate - 1e-9))
+    times = start + np.arange(n_samples) / sample_rate
+    # 取时间点 t 处正在显示的帧，即 floor(t * fps)
+    frames = np.floor(times * fps + 1e-6).astype(np.int64)
+
+    valid = frames < int(total_frames)
+    frames, times = frames[valid], times[valid]
+
+    # 采样率高于帧率时多个时间点会落到同一帧，只保留第一次出现
+    frames, first_index = np.unique(frames, return_index=True)
+    return frames, times[first_index]
+
+
+# iter_planned_frames 函数
+# 按预先规划的帧号依次读取视频帧
+# 相邻帧号间隔较小时用 grab() 顺序跳过，间隔较大或需要回退时用 seek 定位
+def iter_planned_frames(cap, frame_indices, max_grab_gap=None):
+    if max_grab_gap is None:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        max_grab_gap = int(fps * SEEK_GAP_SECONDS) if fps and fps > 0 else 60
+
+    position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))  # 下一次 read() 将返回的帧号
+    for frame_index in frame_indices:
+        frame_index = int(frame_index)
+        gap = frame_index - position
+        if gap < 0 or gap > max_grab_gap:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+            position = frame_index
+        else:
+            while position < frame_index:
+                if not cap.grab():
+                    return
+                position += 1
+
+        ret, frame = cap.read()
+        if not ret:
+            return
+        position += 1
+        yield frame_index, frame
+
+
+# get_fa_quadrants 函数
+# 将画面划分为左上、右上、左下、右下四个象限，返回 (x, y, w, h) 列表
+def get_fa_quadrants(frame):
+    height, width = frame.shape[:2]
+    mid_x = width // 2
+    mid_y = height // 2
+    quadrants = [
+        (0, 0, mid_x, mid_y),                  # 左上
+        (mid_x, 0, width - mid_x, mid_y),      # 右上
+        (0, mid_y, mid_x, height - mid_y),     # 左下
+        (mid_x, mid_y, width - mid_x, height - mid_y)  # 右下
+    ]
+    return quadrants
+
+
+# analyze_fa_frame 函数
+# 计算灰度帧中各区域的平均强度并乘以缩放系数
+def analyze_fa_frame(frame, regions, scale_factor=10000000 / 255):
+    frame_results = []
+    for x, y, w, h in regions:
+        roi = frame[y:y + h, x:x + w]
+        mean_intensity = roi.mean()
+        frame_results.append(mean_intensity * scale_factor)
+    return frame_results
+
+
+# compute_fa_shard 函数
+# 独立打开视频，定位到分片起点，计算分片内各采样帧的区域平均强度
+# 返回 (实际读取到的帧号列表, 区域强度列表)，供并行分片和顺序处理共用
+def compute_fa_shard(video_path, frame_indices, checkpoint=None):
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return [], []
+
+    if len(frame_indices):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(frame_indices[0]))
 
-            # 构造输出文件名：当前目录名 + "_" + 原文件名（不含扩展名） + ".csv"
-            csv_name = f"{current_folder_name}_{os.path.splitext(file)[0]}.csv"
-            csv_path = os.path.join(output_dir, csv_name)
+    read_indices = []
+    results = []
+    quadrants = None
+    try:
+        for frame_index, frame in iter_planned_frames(cap, frame_indices):
+            if checkpoint is not None:
+                checkpoint()  # 暂停 / 取消检查点
+            gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            if quadrants is None:
+                quadrants = get_fa_quadrants(gray_frame)
+            read_indices.append(frame_index)
+            results.append(analyze_fa_frame(gray_frame, quadrants))
+    finally:
+        cap.release()
+    return read_indices, results
 
-            # 写入 CSV 文件，不包含索引与表头
-            df.to_csv(csv_path, index=False, header=False)
-            print(f"Converted: {file_path} → {csv_path}")
 
-# process_fa 函数
-# 处理血流灌注(Flow Adhesion)视频，分析五个固定区域的荧光强度
-# 每秒采样一次，计算左上、右上、左下、右下、中心五个区域的平均强度值
-def process_fa(video_path, output_file_path):
-    def get_quadrants(frame):
-        height, width = frame.shape[:2]
-        mid_x = width // 2
-        mid_y = height // 2
-        quadrants = [
-            (0, 0, mid_x, mid_y),                  # 左上
-            (mid_x, 0, width - mid_x, mid_y),      # 右上
-            (0, mid_y, mid_x, height - mid_y),     # 左下
-            (mid_x, mid_y, width - mid_x, height - mid_y)  # 右下
-        ]
-        return quadrants
-
-    def analyze_frame(frame, regions, scale_factor=10000000 / 255):
-        frame_results = []
-        for x, y, w, h in regions:
-            roi = frame[y:y + h, x:x + w]
-            mean_intensity = roi.mean()
-            frame_results.append(mean_intensity * scale_factor)
-        return frame_results
-
-    def replace_outliers(data, threshold_factor=3):
-        """基于相邻差值的离群点替换"""
-        import numpy as np
-        data = np.array(data, dtype=float)
-        if len(data) < 3:
-            return data.tolist()
-        diffs = np.diff(data)
-        threshold = threshold_factor * np.std(diffs)
-        for i in range(1, len(data) - 1):
-            if abs(data[i] - data[i-1]) > threshold and abs(data[i] - data[i+1]) > threshold:
-                data[i] = (data[i-1] + data[i+1]) / 2
-        return data.tolist()
+# find_ffmpeg 函数
+# 在 PATH 中查找本地 ffmpeg 可执行文件，找不到时返回 None
+def find_ffmpeg():
+    return shutil.which(FFMPEG_BINARY)
 
-    cap = cv2.VideoCapture(video_path)
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    frame_count = 0
 
+# iter_ffmpeg_gray_frames 函数
+# 启动本地 ffmpeg 进程，用 select 滤镜按帧号取出从 first_frame 开始每隔 step 帧的 count 帧，并在解码端完成灰度转换（可选 scale）
+# width / height 为解码后（按旋转元数据校正后）的实际帧尺寸；从管道读取原始灰度帧到同一个复用的 NumPy 缓冲区，逐帧产出 (采样序号, 灰度帧)
+def iter_ffmpeg_gray_frames(video_path, width, height, first_frame, step, count, scale=None, ffmpeg_path=None):
+    """
+    注意：产出的帧对象在下一次迭代时会被覆盖，调用方需在迭代内完成计算或自行复制。
+    scale 为缩放系数（例如 0.25），仅计算区域均值时可显著降低像素处理量。
+    """
+    if scale:
+        # 部分编码器要求偶数尺寸，这里统一取偶数
+        width = max(2, int(width * scale) // 2 * 2)
+        height = max(2, int(height * scale) // 2 * 2)
+
+    # 按解码帧号 n 选帧，与 OpenCV 后端的帧号规划完全一致；passthrough 使输出不会为补齐时间戳而复制或丢弃帧
+    filters = [f"select='gte(n,{first_frame})*not(mod(n-{first_frame},{step}))'", "format=gray"]
+    if scale:
+        filters.append(f"scale={width}:{height}")
+
+    command = [ffmpeg_path or find_ffmpeg() or FFMPEG_BINARY, '-v', 'error', '-nostdin', '-i', video_path,
+               '-vf', ','.join(filters), '-fps_mode', 'passthrough', '-frames:v', str(count),
+               '-f', 'rawvideo', '-pix_fmt', 'gray', '-']
+
+    frame_buffer = np.empty((height, width), dtype=np.uint8)
+    buffer_view = memoryview(frame_buffer).cast('B')
+    frame_size = width * height
+
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=frame_size)
+    try:
+        sample_index = 0
+        while True:
+            received = 0
+            while received < frame_size:
+                n = process.stdout.readinto(buffer_view[received:])
+                if not n:
+                    break
+                received += n
+            if received < frame_size:
+                break
+            yield sample_index, frame_buffer
+            sample_index += 1
+    finally:
+        process.stdout.close()
+        process.kill()
+        process.wait()
+
+
+# compute_fa_ffmpeg 函数
+# 使用 ffmpeg 管道后端按 plan_sample_frames 的帧号规划计算各采样点的区域平均强度，返回区域强度列表
+# 以下情况返回 None，由调用方改用 OpenCV：ffmpeg 不可用；帧号不是等间隔的（例如采样率高于帧率，或帧率不是采样率的整数倍）；
+# 输出帧数与规划不一致
+def compute_fa_ffmpeg(video_path, frame_indices, scale=None, checkpoint=None):
+    ffmpeg_path = find_ffmpeg()
+    if ffmpeg_path is None or not len(frame_indices):
+        return None
+    steps = np.unique(np.diff(frame_indices))
+    if len(steps) > 1 or (len(steps) == 1 and steps[0] < 1):
+        logger.info(f"{os.path.basename(video_path)} 的采样帧不是等间隔的，ffmpeg 管道无法按同一规划取帧，改用 OpenCV 解码")
+        return None
+    step = int(steps[0]) if len(steps) else 1
+
+    # 帧尺寸取 OpenCV 实际解码出的第一帧（已按旋转元数据校正），不使用容器中记录的宽高
+    cap = cv2.VideoCapture(video_path)
     ret, first_frame = cap.read()
+    cap.release()
     if not ret:
-        print(f"无法读取视频: {video_path}")
+        return None
+    height, width = first_frame.shape[:2]
+
+    results = []
+    quadrants = None
+    try:
+        for _, gray_frame in iter_ffmpeg_gray_frames(video_path, width, height, int(frame_indices[0]), step,
+                                                     len(frame_indices), scale, ffmpeg_path):
+            if checkpoint is not None:
+                checkpoint()  # 暂停 / 取消检查点
+            if quadrants is None:
+                quadrants = get_fa_quadrants(gray_frame)
+            results.append(analyze_fa_frame(gray_frame, quadrants))
+    except OSError as e:
+        logger.warning(f"ffmpeg 解码失败，回退 OpenCV: {e}")
+        return None
+
+    if len(results) != len(frame_indices):
+        logger.warning(f"ffmpeg 输出 {len(results)} 帧，与采样规划的 {len(frame_indices)} 帧不一致，回退 OpenCV")
+        return None
+    return results
+
+
+# process_fa 函数
+# 处理血流灌注(Flow Adhesion)视频，分析四个象限区域的荧光强度
+# 按采样规划只解码需要的帧，默认每秒采样一次，可指定采样率与起止时间
+# workers 大于 1 时将采样帧按时间切分为分片，多线程并行解码后按顺序合并
+# backend 默认为 'opencv'；显式指定 'ffmpeg' / 'auto' 时改用 ffmpeg 管道按同一帧号规划解码（scale 可降低分辨率），
+# 不适用或找不到 ffmpeg 时回退 OpenCV；ffmpeg 管道在一个进程中顺序解码，不按 workers 分片
+# checkpoint 为可选的回调，每处理一帧调用一次，用于暂停与取消
+def process_fa(video_path, output_file_path, median_window=None, sample_rate=FA_SAMPLE_RATE,
+               start_time=None, end_time=None, workers=1, backend=FA_BACKEND, scale=None, checkpoint=None):
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        logger.warning(f"无法读取视频: {video_path}")
         return
 
-    first_frame_gray = cv2.cvtColor(first_frame, cv2.COLOR_BGR2GRAY)
-    quadrants = get_quadrants(first_frame_gray)
-    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+    cap.release()
 
     output_file_path_csv = output_file_path.replace('.xlsx', '.csv')
-    results_buffer = []  # 缓存所有结果，便于后续整体去异常值
 
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
+    frame_indices, sample_times = plan_sample_frames(fps, total_frames, sample_rate, start_time, end_time)
 
-        gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    # ffmpeg 管道后端（需显式指定）：解码端直接完成选帧与灰度转换，不适用或不可用时回退 OpenCV
+    ffmpeg_results = None
+    if backend in ('auto', 'ffmpeg'):
+        ffmpeg_results = compute_fa_ffmpeg(video_path, frame_indices, scale, checkpoint)
+        if ffmpeg_results is None and backend == 'ffmpeg':
+            logger.warning(f"ffmpeg 管道不可用，{video_path} 回退到 OpenCV 解码")
+        elif ffmpeg_results is not None and workers and workers > 1:
+            logger.info(f"ffmpeg 管道顺序解码 {os.path.basename(video_path)}，不使用 workers={workers} 的时间分片")
 
-        if frame_count % int(fps) == 0:
-            frame_results = analyze_frame(gray_frame, quadrants)
-            results_buffer.append(frame_results)
+    if ffmpeg_results is not None:
+        read_times, results_buffer = sample_times, ffmpeg_results
+    else:
+        # 按时间连续切分分片，每个分片由一个线程独立 seek 并解码（OpenCV 解码时释放 GIL）
+        n_shards = max(1, min(int(workers or 1), len(frame_indices)))
+        shards = np.array_split(frame_indices, n_shards)
+        if n_shards == 1:
+            shard_results = [compute_fa_shard(video_path, frame_indices, checkpoint)]
+        else:
+            with ThreadPoolExecutor(max_workers=n_shards) as executor:
+                shard_results = list(executor.map(lambda shard: compute_fa_shard(video_path, shard, checkpoint),
+                                                  shards))
 
-        frame_count += 1
+        # 按分片顺序合并，时间点由实际读取到的帧号回查
+        read_indices = [i for indices, _ in shard_results for i in indices]
+        results_buffer = [row for _, rows in shard_results for row in rows]  # 缓存所有结果，便于后续整体去异常值
+        read_times = sample_times[np.searchsorted(frame_indices, read_indices)]
 
-    cap.release()
+    if not results_buffer:
+        logger.warning(f"无法读取视频: {video_path}")
+        return
+
+    # 对 (时间 × 区域) 整个数组一次性进行离群值替换与可选的滑动中值滤波
+    results_array = replace_outliers(results_buffer)
+    if median_window:
+        results_array = rolling_median_filter(results_array, median_window)
 
-    # 对每一列单独进行离群值替换
-    import numpy as np
-    results_array = np.array(results_buffer)
-    for col in range(results_array.shape[1]):
-        results_array[:, col] = replace_outliers(results_array[:, col])
+    write_fa_csv(output_file_path_csv, read_times, results_array)
+    logger.info(f"完成视频分析: {video_path}")
 
-    # 保存到 CSV
-    import csv
-    with open(output_file_path_csv, mode='w', newline='') as file:
+
+# write_fa_csv 函数
+# 将 FA 时间序列写入 CSV，时间点均为整数秒时按整数写出
+def write_fa_csv(output_file_path, sample_times, results_array):
+    sample_times = np.asarray(sample_times, dtype=float)
+    if np.all(sample_times == np.round(sample_times)):
+        time_values = sample_times.astype(np.int64).tolist()
+    else:
+        time_values = np.round(sample_times, 3).tolist()
+
+    with open(output_file_path, mode='w', newline='') as file:
         writer = csv.writer(file)
-        writer.writerow(['time(sec)', 'top_left', 'top_right', 'bottom_left', 'bottom_right'])
-        for t, row in enumerate(results_array):
+        writer.writerow(['time(sec)', *FA_REGIONS])
+        for t, row in zip(time_values, results_array):
             writer.writerow([t] + row.tolist())
 
-    print(f"完成视频分析: {video_path}")
-
 
 # --- reserved for extension ---
 def future_extension_hook():
@@ -1263,14 +4148,79 @@ def debug_placeholder(*args, **kwargs):
 # --- reserved for extension ---
 
 
-def visualize_fa_files(input_folder, output_folder):
-    print(f"开始FA可视化处理: {input_folder}")
+# read_fa_output 函数
+# 读取 process_fa 生成的 output-*_fa.csv；第一列为 time(sec)、其后至少一个区域列时返回 DataFrame，否则返回 None
+def read_fa_output(file_path):
+    df = pd.read_csv(file_path)
+    if len(df.columns) < 2 or df.columns[0] != 'time(sec)':
+        return None
+    return df
+
+
+# build_fa_cube 函数
+# 把 {文件名: FA DataFrame} 一次性装入预分配的数组，较短的视频末尾用 NaN 补齐
+# 返回 (times: 时间 × 视频, cube: 时间 × 视频 × 区域, regions: 区域名列表, columns: 按文件及其列顺序排列的 (视频, 区域) 下标)
+def build_fa_cube(frames):
+    regions = []
+    for df in frames.values():
+        regions.extend(col for col in df.columns[1:] if col not in regions)
+    region_index = {region: r for r, region in enumerate(regions)}
+
+    n_times = max(len(df) for df in frames.values())
+    times = np.full((n_times, len(frames)), np.nan)
+    cube = np.full((n_times, len(frames), len(regions)), np.nan)
+    columns = []
+    for v, df in enumerate(frames.values()):
+        indices = [region_index[col] for col in df.columns[1:]]
+        times[:len(df), v] = pd.to_numeric(df['time(sec)'], errors='coerce').to_numpy(dtype=float)
+        cube[:len(df), v, indices] = df.iloc[:, 1:].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        columns.extend((v, r) for r in indices)
+    return times, cube, regions, np.array(columns).T
+
+
+# compute_fa_kinetics 函数
+# 对 FA 数组（时间 × 视频 × 区域）一次性计算全部视频全部区域的荧光动力学指标，每个视频使用自己的时间列：
+#   AUC：强度曲线下面积（梯形法，单位 强度×秒，只累计相邻两点都有值的区间）
+#   peak / time_to_peak(sec)：最大强度及其出现时间
+#   growth_rate(/sec)：从开始到峰值之间各点的最小二乘斜率
+# 返回 {指标名: 视频 × 区域 的值数组}
+def compute_fa_kinetics(times, cube):
+    t = times[:, :, np.newaxis]
+    valid = ~np.isnan(cube) & ~np.isnan(t)
+    any_valid = valid.any(axis=0)
+
+    peak = np.where(any_valid, np.fmax.reduce(np.where(valid, cube, np.nan), axis=0), np.nan)
+    peak_index = np.where(valid, cube, -np.inf).argmax(axis=0)
+    time_to_peak = np.where(any_valid, times[peak_index, np.arange(times.shape[1])[:, np.newaxis]], np.nan)
+
+    pairs = valid[1:] & valid[:-1]
+    trapezoids = (cube[1:] + cube[:-1]) / 2 * (t[1:] - t[:-1])
+    auc = np.where(any_valid, np.where(pairs, trapezoids, 0.0).sum(axis=0), np.nan)
+
+    # 上升段（峰值之前）的最小二乘斜率，用各项的掩码求和直接代入斜率公式
+    rising = valid & (np.arange(len(cube))[:, np.newaxis, np.newaxis] <= peak_index)
+    tt = np.where(rising, t, 0.0)
+    yy = np.where(rising, cube, 0.0)
+    n = rising.sum(axis=0)
+    st, sy = tt.sum(axis=0), yy.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        growth_rate = (n * (tt * yy).sum(axis=0) - st * sy) / (n * (tt * tt).sum(axis=0) - st * st)
+    growth_rate = np.where(n >= 2, growth_rate, np.nan)
+
+    return {'AUC': auc, 'peak': peak, 'time_to_peak(sec)': time_to_peak, 'growth_rate(/sec)': growth_rate}
+
+
+# visualize_fa_files 函数
+# 汇总每个文件夹中全部 FA 输出：读入一个 时间 × 视频 × 区域 数组，由同一个数组写出
+# visualized-[文件夹名]_fa.csv（各视频各区域并列的宽表）与 visualized-[文件夹名]_fa_metrics.csv（每行一个视频的一个区域）
+def visualize_fa_files(input_folder, output_folder, folders=None):
+    logger.info(f"开始FA可视化处理: {input_folder}")
 
     # 存储所有生成的可视化文件路径
     all_visualized_files = []
 
-    # 递归处理所有子文件夹
-    for root, dirs, files in os.walk(input_folder):
+    # 递归处理所有子文件夹（folders 给定时只处理这些子文件夹）
+    for root in visualization_roots(input_folder, folders):
         # 计算当前处理的输出文件夹
         relative_path = os.path.relpath(root, input_folder)
         current_output_folder = os.path.join(output_folder, relative_path)
@@ -1278,85 +4228,62 @@ def visualize_fa_files(input_folder, output_folder):
         # 确保输出文件夹存在
         os.makedirs(current_output_folder, exist_ok=True)
 
-        # 筛选FA文件
-        fa_files = []
-        for f in os.listdir(current_output_folder):
-            if f.startswith('output') and f.endswith('fa.csv'):
-                file_path = os.path.join(current_output_folder, f)
-                try:
-                    # 读取文件并检查列
-                    df = pd.read_csv(file_path)
-                    # 检查是否为FA处理后的文件（包含time和5个区域数据）
-                    if len(df.columns) == 6 and 'time(sec)' in df.columns:
-                        fa_files.append(f)
-                except Exception as e:
-                    print(f"校验文件 {f} 时出错: {e}")
-                    continue
-
-        fa_files = natsort.natsorted(fa_files)  # 自然排序文件名
-        print(f"检测到FA文件: {fa_files}")
-
-        # 如果没有文件，跳过当前文件夹
-        if not fa_files:
-            continue
-
-        # 存储所有数据
-        all_data = {}
-        max_time_length = 0
-
-        # 读取所有文件
-        for file in fa_files:
-            file_path = os.path.join(current_output_folder, file)
+        # 读取FA文件（自然排序文件名），每个文件只读取一次
+        frames = {}
+        for f in natsort.natsorted(os.listdir(current_output_folder)):
+            if not (f.startswith('output') and f.endswith('fa.csv')):
+                continue
             try:
-                df = pd.read_csv(file_path)
-
-                # 更新最长时间列
-                if len(df) > max_time_length:
-                    max_time_length = len(df)
-                    time_column = df['time(sec)']
-
-                # 存储除time列外的所有数据列
-                data_columns = df.drop('time(sec)', axis=1)
-                base_name = os.path.splitext(file)[0].replace('output-', '')
-
-                # 为每个区域创建带文件名前缀的列名
-                for col in data_columns.columns:
-                    col_name = f'{base_name}_{col}'
-                    all_data[col_name] = data_columns[col].tolist()
-
+                df = read_fa_output(os.path.join(current_output_folder, f))
             except Exception as e:
-                print(f"读取文件 {file} 时出错: {e}")
+                logger.warning(f"读取文件 {f} 时出错: {e}")
+                continue
+            if df is not None and len(df):
+                frames[f] = df
+        logger.debug(f"检测到FA文件: {list(frames)}")
 
-        # 如果没有成功读取任何数据
-        if not all_data or time_column is None:
-            print(f"未成功读取 {relative_path} 中的FA数据")
+        # 如果没有文件，跳过当前文件夹
+        if not frames:
             continue
 
-        # 创建最终的DataFrame
-        result_df = pd.DataFrame({'time(sec)': time_column})
+        times, cube, regions, (video_index, region_index) = build_fa_cube(frames)
+        base_names = [os.path.splitext(f)[0].replace('output-', '') for f in frames]
 
-        # 填充数据，缺失值用NaN补全
-        for col_name, data in all_data.items():
-            result_df[col_name] = pd.Series(data + [None] * (max_time_length - len(data)))
+        # 宽表：时间列取最长的视频，其后按文件顺序排列各自的区域列，缺失值为NaN
+        longest = max(frames.values(), key=len)
+        result_df = pd.DataFrame(cube[:, video_index, region_index],
+                                 columns=[f'{base_names[v]}_{regions[r]}' for v, r in zip(video_index, region_index)])
+        result_df.insert(0, 'time(sec)', longest['time(sec)'].to_numpy())
 
         # 生成可视化CSV文件
         visualized_file_path = os.path.join(current_output_folder, f'visualized-{os.path.basename(root)}_fa.csv')
         result_df.to_csv(visualized_file_path, index=False)
-        print(f"生成可视化CSV: {visualized_file_path}")
+        logger.info(f"生成可视化CSV: {visualized_file_path}")
+
+        # 指标表：与宽表使用同一个数组
+        metrics = compute_fa_kinetics(times, cube)
+        metrics_df = pd.DataFrame({'file': [list(frames)[v] for v in video_index],
+                                   'region': [regions[r] for r in region_index],
+                                   **{name: values[video_index, region_index] for name, values in metrics.items()}})
+        metrics_file_path = os.path.join(current_output_folder, f'visualized-{os.path.basename(root)}_fa_metrics.csv')
+        metrics_df.round(4).to_csv(metrics_file_path, index=False)
+        logger.info(f"生成FA指标表: {metrics_file_path}")
 
         # 收集所有生成的可视化文件路径
-        all_visualized_files.append(visualized_file_path)
+        all_visualized_files.extend([visualized_file_path, metrics_file_path])
 
     return all_visualized_files
+
+
 # process_aa 函数
 # 处理血小板聚集仪(Aggregation Analyzer)数据
 # 解析特殊格式的血小板聚集数据，转换为Excel格式便于分析
 def process_aa(file_path, output_file_path):
     # 读取输入文件
     if file_path.endswith('.csv'):
-        df = pd.read_csv(file_path, header=None)
+        df = pd.read_csv(input_source(file_path), header=None)
     else:
-        df = pd.read_excel(file_path, header=None)
+        df = pd.read_excel(input_source(file_path), header=None)
 
     # 移除前两行
     df = df.iloc[2:]
@@ -1389,38 +4316,353 @@ def process_aa(file_path, output_file_path):
         sheet.append(row)
 
     wb.save(output_file_path)
-    print(f"Analyzing LTA files: {output_file_path}")
+    logger.info(f"Analyzing LTA files: {output_file_path}")
 
 
-# process_avi2mp4 函数
-# 将AVI格式视频转换为MP4格式
-# 读取所有帧然后重新以MP4编码写入，保持原始分辨率和帧率
-def process_avi2mp4(videoPath, outVideoPath):
+# 血小板聚集曲线指标：采样间隔（秒，按仪器实际设置调整）与最大斜率的计算窗口（秒）
+AA_SAMPLE_SECONDS = 1.0
+AA_SLOPE_WINDOW_SECONDS = 60
+
+
+XLSX_NAMESPACE = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+
+# read_xlsx_rows 函数
+# 直接解析 .xlsx 中第一个工作表的 XML，返回各单元格文本组成的行列表，比 openpyxl 逐个创建单元格对象快数倍
+# 只用于本程序写出的规则表格：行之间单元格数量不一致（有空缺单元格）或含公式时返回 None，由调用方改用 openpyxl
+def read_xlsx_rows(file_path):
+    with zipfile.ZipFile(file_path) as archive:
+        names = set(archive.namelist())
+        if 'xl/worksheets/sheet1.xml' not in names:
+            return None
+        shared_strings = []
+        if 'xl/sharedStrings.xml' in names:
+            with archive.open('xl/sharedStrings.xml') as f:
+                shared_strings = [''.join(item.itertext()) for item in ElementTree.parse(f).getroot()]
+        sheet_data = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml')).find(XLSX_NAMESPACE + 'sheetData')
+    rows = []
+    for element in sheet_data if sheet_data is not None else ():
+        row = []
+        for cell in element:
+            if cell.find(XLSX_NAMESPACE + 'f') is not None:
+                return None
+            text = ''.join(cell.itertext())
+            row.append(shared_strings[int(text)] if cell.get('t') == 's' else text)
+        if rows and len(row) != len(rows[0]):
+            return None
+        rows.append(row)
+    return rows
+
+
+# read_output_rows 函数
+# 读取本程序写出的 .xlsx 输出文件，返回各行单元格值组成的列表；优先使用 read_xlsx_rows，不适用时改用 openpyxl
+# 由 .csv 输入生成的输出文件沿用 .xlsx 扩展名但内容是 CSV（不是 zip 包），按 CSV 读取
+def read_output_rows(file_path):
+    if not zipfile.is_zipfile(file_path):
+        with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+            return [row for row in csv.reader(f) if row]
+    rows = read_xlsx_rows(file_path)
+    if rows is None:
+        wb = openpyxl.load_workbook(file_path, read_only=True)
+        try:
+            rows = [list(row) for row in wb.active.iter_rows(values_only=True)]
+        finally:
+            wb.close()
+    return rows
+
+
+# aa_output_curves 函数
+# 把 process_aa 生成的工作簿行（每列一个通道，每行一个采样点）转换为 通道 × 采样点 的数值矩阵
+# 不是聚集曲线输出（例如酶标仪输出的 Reading_Index 表头，或含有非数值单元格）时返回 None
+def aa_output_curves(rows):
+    if not rows or not rows[0] or rows[0][0] == 'Reading_Index':
+        return None
+    try:
+        return np.array(rows, dtype=float).T
+    except (TypeError, ValueError):
+        pass
+    # 含有空单元格或非数值单元格时逐列转换，空单元格作为缺失值，其他非数值单元格说明不是聚集曲线
+    raw = pd.DataFrame(rows).replace('', None)
+    values = raw.apply(pd.to_numeric, errors='coerce')
+    if values.notna().to_numpy().sum() == 0 or (values.notna() != raw.notna()).to_numpy().any():
+        return None
+    return values.to_numpy(dtype=float).T
+
+
+# compute_aa_metrics 函数
+# 对补齐为同一长度的聚集曲线矩阵（每行一个通道，末尾用 NaN 补齐）一次性计算全部通道的指标：
+#   max_aggregation(%)：最大聚集率；slope(%/min)：AA_SLOPE_WINDOW_SECONDS 窗口内上升最快的斜率
+#   AUC(%*min)：曲线下面积（梯形法，只累计相邻两点都有值的区间）
+# 返回 {指标名: 每个通道的值数组}
+def compute_aa_metrics(curves, sample_seconds=AA_SAMPLE_SECONDS):
+    curves = np.asarray(curves, dtype=float)
+    n_samples = curves.shape[1]
+    valid = ~np.isnan(curves)
+    max_aggregation = np.fmax.reduce(curves, axis=1) if n_samples else np.full(len(curves), np.nan)
+
+    window = min(max(1, int(round(AA_SLOPE_WINDOW_SECONDS / sample_seconds))), max(1, n_samples - 1))
+    if n_samples > window:
+        rise = curves[:, window:] - curves[:, :-window]
+        slope = np.fmax.reduce(rise, axis=1) / (window * sample_seconds / 60)
+    else:
+        slope = np.full(len(curves), np.nan)
+
+    pairs = valid[:, 1:] & valid[:, :-1]
+    filled = np.where(valid, curves, 0.0)
+    auc = np.where(pairs, (filled[:, 1:] + filled[:, :-1]) / 2, 0.0).sum(axis=1) * sample_seconds / 60
+    auc = np.where(valid.any(axis=1), auc, np.nan)
+    return {'max_aggregation(%)': max_aggregation, 'slope(%/min)': slope, 'AUC(%*min)': auc}
+
+
+# 酶标仪动力学参数：相邻两次读数的间隔（秒，按仪器动力学程序的设置调整）、最大斜率的最小二乘窗口（读数次数）、
+# 平台值取最后几次读数的平均、达到阈值时间的阈值位置（基线到平台之间的比例）
+MR_READ_INTERVAL_SECONDS = 30
+MR_SLOPE_WINDOW_READS = 5
+MR_PLATEAU_READS = 5
+MR_THRESHOLD_FRACTION = 0.5
+
+
+# mr_output_readings 函数
+# 把 process_mr 生成的工作簿行（Reading_Index 列之后每列一个孔位，每行一次读数）转换为 (孔位列表, 读数 × 孔位 矩阵)
+# 不是酶标仪输出时返回 None；非数值读数（例如 OVER）作为缺失值
+def mr_output_readings(rows):
+    if not rows or not rows[0] or rows[0][0] != 'Reading_Index':
+        return None
+    wells = [str(well) for well in rows[0][1:]]
+    body = [row[1:] for row in rows[1:]]
+    try:
+        readings = np.array(body, dtype=float).reshape(len(body), len(wells))
+    except (TypeError, ValueError):
+        readings = pd.DataFrame(body).replace('', None).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    return wells, readings
+
+
+# compute_mr_kinetics 函数
+# 对 读数 × 孔位 矩阵一次性计算全部孔位（96 或 384 孔）的动力学参数，读数间隔为 interval_seconds：
+#   max_slope(/min)：MR_SLOPE_WINDOW_READS 次连续读数的最小二乘斜率的最大值（信号下降的孔取下降最快的负斜率）
+#   max_slope_time(min)：最大斜率窗口中点的时间
+#   baseline / plateau：第一次读数与最后 MR_PLATEAU_READS 次读数的平均
+#   time_to_threshold(min)：第一次越过 基线 + MR_THRESHOLD_FRACTION × (平台 - 基线) 的时间，线性插值
+# 返回 {参数名: 每个孔位的值数组}
+def compute_mr_kinetics(readings, interval_seconds=MR_READ_INTERVAL_SECONDS):
+    readings = np.asarray(readings, dtype=float)
+    n_reads, n_wells = readings.shape
+    times = np.arange(n_reads) * interval_seconds / 60
+    valid = ~np.isnan(readings)
+
+    baseline = readings[0] if n_reads else np.full(n_wells, np.nan)
+    tail = valid[-MR_PLATEAU_READS:]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        plateau = np.where(tail, readings[-MR_PLATEAU_READS:], 0.0).sum(axis=0) / tail.sum(axis=0)
+    # 信号下降的孔（例如浊度清除）翻转符号后按上升曲线处理
+    direction = np.where(plateau < baseline, -1.0, 1.0)
+
+    # 等间隔读数的最小二乘斜率等于窗口内读数与中心化时间权重的点积，含缺失值的窗口结果为 NaN
+    window = min(MR_SLOPE_WINDOW_READS, n_reads)
+    if window >= 2:
+        weights = np.arange(window) - (window - 1) / 2
+        windows = np.lib.stride_tricks.sliding_window_view(readings, window, axis=0)
+        slopes = windows @ weights / (weights @ weights * interval_seconds / 60) * direction
+        has_slope = ~np.isnan(slopes).all(axis=0)
+        best = np.where(np.isnan(slopes), -np.inf, slopes).argmax(axis=0)
+        max_slope = np.where(has_slope, slopes[best, np.arange(n_wells)] * direction, np.nan)
+        max_slope_time = np.where(has_slope, times[best] + (window - 1) / 2 * interval_seconds / 60, np.nan)
+    else:
+        max_slope = max_slope_time = np.full(n_wells, np.nan)
+
+    threshold = baseline + MR_THRESHOLD_FRACTION * (plateau - baseline)
+    crossing = threshold_crossing_times((readings * direction).T, times, threshold * direction)
+    time_to_threshold = np.where(plateau != baseline, crossing, np.nan)
+
+    return {'max_slope(/min)': max_slope, 'max_slope_time(min)': max_slope_time, 'baseline': baseline,
+            'plateau': plateau, 'time_to_threshold(min)': time_to_threshold}
+
+
+# padded_matrix 函数
+# 把长度不一的一维数组补齐为一个矩阵（每行一个数组，末尾用 NaN 补齐）
+def padded_matrix(arrays):
+    matrix = np.full((len(arrays), max(len(a) for a in arrays)), np.nan)
+    for row, values in enumerate(arrays):
+        matrix[row, :len(values)] = values
+    return matrix
+
+
+# summarize_xlsx_outputs 函数
+# 汇总每个文件夹中全部 output-*.xlsx，每个文件只读取一次并按表头区分：
+#   聚集曲线：所有文件的所有通道补齐为一个矩阵，写出 visualized-[文件夹名]_aa_metrics.csv（每行一个通道）
+#   酶标仪输出（至少两次读数）：每个文件向量化计算全部孔位，写出 visualized-[文件夹名]_mr_kinetics.csv（每行一个孔位）
+# 返回生成的文件路径列表
+def summarize_xlsx_outputs(input_folder, output_folder, folders=None):
+    logger.info(f"开始血小板聚集曲线指标与酶标仪动力学参数计算: {input_folder}")
+    all_summary_files = []
+
+    for root in visualization_roots(input_folder, folders):
+        relative_path = os.path.relpath(root, input_folder)
+        current_output_folder = os.path.join(output_folder, relative_path)
+        if not os.path.isdir(current_output_folder):
+            continue
+
+        labels = []
+        channels = []
+        kinetics = []
+        for f in natsort.natsorted(os.listdir(current_output_folder)):
+            if not (f.startswith('output-') and f.endswith('.xlsx')):
+                continue
+            try:
+                rows = read_output_rows(os.path.join(current_output_folder, f))
+            except Exception as e:
+                logger.warning(f"读取文件 {f} 时出错: {e}")
+                continue
+
+            plate = mr_output_readings(rows)
+            if plate is not None:
+                wells, readings = plate
+                if len(readings) >= 2:
+                    kinetics.append(pd.DataFrame({'file': f, 'well': wells, **compute_mr_kinetics(readings)}))
+                continue
+            curves = aa_output_curves(rows)
+            if curves is not None:
+                labels.extend((f, channel + 1) for channel in range(len(curves)))
+                channels.extend(curves)
+
+        folder_name = os.path.basename(root)
+        if channels:
+            logger.debug(f"检测到血小板聚集曲线: {len(channels)} 个通道")
+            metrics = compute_aa_metrics(padded_matrix(channels))
+            metrics_file_path = os.path.join(current_output_folder, f'visualized-{folder_name}_aa_metrics.csv')
+            pd.DataFrame({'file': [label[0] for label in labels], 'channel': [label[1] for label in labels],
+                          **metrics}).round(2).to_csv(metrics_file_path, index=False)
+            logger.info(f"生成聚集曲线指标: {metrics_file_path}")
+            all_summary_files.append(metrics_file_path)
+
+        if kinetics:
+            logger.debug(f"检测到酶标仪动力学读数: {len(kinetics)} 个文件")
+            kinetics_file_path = os.path.join(current_output_folder, f'visualized-{folder_name}_mr_kinetics.csv')
+            pd.concat(kinetics, ignore_index=True).round(4).to_csv(kinetics_file_path, index=False)
+            logger.info(f"生成酶标仪动力学参数: {kinetics_file_path}")
+            all_summary_files.append(kinetics_file_path)
+
+    return all_summary_files
+
+
+# MP4 容器可直接封装（无需重新编码）的视频编码 FourCC，统一按大写比较
+# 包括 H.264、H.265/HEVC 与 MPEG-4 Part 2（XviD/DivX 等）
+REMUX_COMPATIBLE_FOURCCS = {
+    'H264', 'AVC1', 'X264', 'DAVC',
+    'HEVC', 'H265', 'HVC1', 'HEV1', 'X265',
+    'MP4V', 'FMP4', 'XVID', 'DIVX', 'DX50', 'MP4S', 'M4S2',
+}
+
+
+# probe_video_fourcc 函数
+# 读取视频流的编码 FourCC 字符串（例如 'H264'、'XVID'），无法识别时返回空字符串
+def probe_video_fourcc(video_path):
+    capture = cv2.VideoCapture(video_path)
+    fourcc = int(capture.get(cv2.CAP_PROP_FOURCC))
+    capture.release()
+    return ''.join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)).strip('\x00 ')
+
+
+# remux_avi2mp4 函数
+# 通过本地 ffmpeg 以流复制方式将视频流封装进 MP4 容器，不解码也不重新编码
+# 成功返回 True；ffmpeg 不存在或封装失败时删除残留文件并返回 False
+def remux_avi2mp4(videoPath, outVideoPath):
+    ffmpeg_path = find_ffmpeg()
+    if ffmpeg_path is None:
+        return False
+
+    command = [
+        ffmpeg_path, '-v', 'error', '-nostdin', '-y',
+        '-i', videoPath,
+        '-map', '0:v:0', '-map', '0:a?',
+        '-c:v', 'copy', '-c:a', 'aac',
+        '-movflags', '+faststart',
+        outVideoPath
+    ]
+    try:
+        result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    except OSError as e:
+        logger.warning(f"ffmpeg 调用失败: {e}")
+        return False
+
+    if result.returncode != 0 or not os.path.isfile(outVideoPath) or os.path.getsize(outVideoPath) == 0:
+        logger.warning(f"ffmpeg 封装失败，回退到重新编码: {result.stderr.decode(errors='ignore').strip()}")
+        if os.path.exists(outVideoPath):
+            os.remove(outVideoPath)
+        return False
+    return True
+
+
+# transcode_avi2mp4 函数
+# 逐帧读取并重新以 mp4v 编码写入，保持原始分辨率和帧率
+# 边读边写，内存中只保留当前帧（原实现先缓存全部帧，长视频会占用数 GB 内存）
+def transcode_avi2mp4(videoPath, outVideoPath, checkpoint=None):
     capture = cv2.VideoCapture(videoPath)
     fps = capture.get(cv2.CAP_PROP_FPS)  # 获取帧率
     size = (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
-    # fNUMS = cap.get(cv2.CAP_PROP_FRAME_COUNT)
     suc = capture.isOpened()  # 是否成功打开
 
-    allFrame = []
-    while suc:
-        suc, frame = capture.read()
-        if suc:
-            allFrame.append(frame)
-    capture.release()
-
     fourcc = cv2.VideoWriter_fourcc(*"mp4v")
     videoWriter = cv2.VideoWriter(outVideoPath, fourcc, fps, size)
-    for aFrame in allFrame:
-        videoWriter.write(aFrame)
-    videoWriter.release()
-    print(f"Analyzing video file: {outVideoPath}")
+    completed = False
+    try:
+        while suc:
+            if checkpoint is not None:
+                checkpoint()  # 暂停 / 取消检查点
+            suc, frame = capture.read()
+            if suc:
+                videoWriter.write(frame)
+        completed = True
+    finally:
+        capture.release()
+        videoWriter.release()
+        # 取消或出错时删除写了一半的输出，避免被当作完整结果
+        if not completed and os.path.exists(outVideoPath):
+            os.remove(outVideoPath)
+
+
+# process_avi2mp4 函数
+# 将AVI格式视频转换为MP4格式
+# 视频编码与MP4兼容（H.264/HEVC/MPEG-4）时优先用 ffmpeg 流复制封装，否则回退 OpenCV 重新编码
+def process_avi2mp4(videoPath, outVideoPath, checkpoint=None):
+    fourcc = probe_video_fourcc(videoPath)
+    if fourcc.upper() in REMUX_COMPATIBLE_FOURCCS and remux_avi2mp4(videoPath, outVideoPath):
+        logger.info(f"Remuxed video file ({fourcc}): {outVideoPath}")
+        return
+
+    transcode_avi2mp4(videoPath, outVideoPath, checkpoint)
+    logger.info(f"Analyzing video file: {outVideoPath}")
+
+
 # process_transwell 函数
 # 处理细胞穿膜(Transwell)实验的图像数据
 # 通过HSV颜色空间检测图像中紫色区域，计算穿膜细胞占比
 def process_transwell(file_path, output_file_path):
-    # 读取图像
-    image = cv2.imread(file_path)
+    purple_percentage = measure_transwell(file_path)
+
+    # 获取文件名（不含扩展名）
+    filename = os.path.splitext(os.path.basename(file_path))[0]
+
+    # 创建DataFrame并保存
+    df = pd.DataFrame({
+        'filename': [filename],
+        'purple_percentage': [purple_percentage]
+    })
+
+    # 保存为CSV
+    df.to_csv(output_file_path, index=False)
+
+    logger.info(f"处理Transwell图像文件: {output_file_path}")
+
+
+# measure_transwell 函数
+# 计算 Transwell 图像中紫色（穿膜细胞）像素所占的百分比
+def measure_transwell(file_path):
+    # 读取图像（压缩包成员从内存解码）
+    if isinstance(file_path, ArchiveMember):
+        image = cv2.imdecode(np.frombuffer(file_path.read_bytes(), np.uint8), cv2.IMREAD_COLOR)
+    else:
+        image = cv2.imread(file_path)
 
     # 转换为HSV颜色空间
     hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
@@ -1435,34 +4677,31 @@ def process_transwell(file_path, output_file_path):
     # 计算紫色区域占比
     total_pixels = purple_mask.size
     purple_pixels = cv2.countNonZero(purple_mask)
-    purple_percentage = (purple_pixels / total_pixels) * 100
+    return (purple_pixels / total_pixels) * 100
 
-    # 获取文件名（不含扩展名）
-    filename = os.path.splitext(os.path.basename(file_path))[0]
 
-    # 创建DataFrame并保存
-    df = pd.DataFrame({
-        'filename': [filename],
-        'purple_percentage': [purple_percentage]
-    })
+# Transwell 可视化与总结文件中浮点数的写出格式：15 位有效数字，
+# 使从 output-*.csv 读回的值与结果库中的值（两者只差末位舍入）写出相同的文本
+TRANSWELL_FLOAT_FORMAT = '%.15g'
 
-    # 保存为CSV
-    df.to_csv(output_file_path, index=False)
 
-    print(f"处理Transwell图像文件: {output_file_path}")
+# write_transwell_csv 函数
+# 写出 Transwell 可视化或总结文件；CSV 模式与结果库模式都经由这里，保证同样的结果写出同样的文本
+def write_transwell_csv(df, file_path):
+    df.astype({'purple_percentage': float}).to_csv(file_path, index=False, float_format=TRANSWELL_FLOAT_FORMAT)
 
 
 # visualize_transwell_files 函数
 # 收集并整合所有Transwell数据文件，生成可视化汇总文件
 # 递归处理子文件夹中的Transwell分析结果，合并为单个可视化CSV文件
-def visualize_transwell_files(input_folder, output_folder):
-    print(f"开始Transwell可视化处理: {input_folder}")
+def visualize_transwell_files(input_folder, output_folder, folders=None):
+    logger.info(f"开始Transwell可视化处理: {input_folder}")
 
     # 存储所有生成的可视化文件路径
     all_visualized_files = []
 
-    # 递归处理所有子文件夹
-    for root, dirs, files in os.walk(input_folder):
+    # 递归处理所有子文件夹（folders 给定时只处理这些子文件夹）
+    for root in visualization_roots(input_folder, folders):
         # 计算当前处理的输出文件夹
         relative_path = os.path.relpath(root, input_folder)
         current_output_folder = os.path.join(output_folder, relative_path)
@@ -1482,11 +4721,11 @@ def visualize_transwell_files(input_folder, output_folder):
                     if df.columns.tolist() == ['filename', 'purple_percentage']:
                         transwell_files.append(f)
                 except Exception as e:
-                    print(f"校验文件 {f} 时出错: {e}")
+                    logger.warning(f"校验文件 {f} 时出错: {e}")
                     continue
 
         transwell_files = natsort.natsorted(transwell_files)  # 自然排序文件名
-        print(f"检测到Transwell文件: {transwell_files}")
+        logger.debug(f"检测到Transwell文件: {transwell_files}")
 
         # 如果没有文件，跳过当前文件夹
         if not transwell_files:
@@ -1501,17 +4740,17 @@ def visualize_transwell_files(input_folder, output_folder):
                 df = pd.read_csv(file_path)
                 result_df = pd.concat([result_df, df], ignore_index=True)
             except Exception as e:
-                print(f"读取文件 {file} 时出错: {e}")
+                logger.warning(f"读取文件 {file} 时出错: {e}")
 
         # 如果没有成功读取任何数据
         if result_df.empty:
-            print(f"未成功读取 {relative_path} 中的Transwell数据")
+            logger.warning(f"未成功读取 {relative_path} 中的Transwell数据")
             continue
 
         # 生成可视化CSV文件
         visualized_file_path = os.path.join(current_output_folder, f'visualized-{os.path.basename(root)}_transwell.csv')
-        result_df.to_csv(visualized_file_path, index=False)
-        print(f"生成可视化CSV: {visualized_file_path}")
+        write_transwell_csv(result_df, visualized_file_path)
+        logger.info(f"生成可视化CSV: {visualized_file_path}")
 
         # 收集所有生成的可视化文件路径
         all_visualized_files.append(visualized_file_path)
@@ -1522,75 +4761,442 @@ def visualize_transwell_files(input_folder, output_folder):
 # 生成所有Transwell实验结果的总结报告
 # 收集所有可视化后的Transwell数据，添加文件夹路径信息，整合为单个总结文件
 def summarize_transwell_files(output_folder):
-    print(f"开始Transwell总结处理: {output_folder}")
+    logger.info(f"开始Transwell总结处理: {output_folder}")
 
     # 所有整合后的数据
     final_result_df = pd.DataFrame(columns=['folderpath', 'filename', 'purple_percentage'])
 
-    # 遍历 output_folder 中的所有子文件夹
+    # 遍历 output_folder 中的所有子文件夹（按自然顺序，与结果库模式的汇总顺序一致）
     for root, dirs, files in os.walk(output_folder):
-        # 计算当前处理的文件夹的相对路径
-        relative_path = os.path.relpath(root, output_folder)
-
-        # 筛选 Transwell 可视化文件
-        transwell_visualized_files = []
-        for f in files:
-            if f.startswith('visualized-') and f.endswith('_transwell.csv'):
-                file_path = os.path.join(root, f)
-                try:
-                    # 读取文件并检查列
-                    df = pd.read_csv(file_path)
-                    # 检查是否包含严格匹配的列名
-                    if set(df.columns) == {'filename', 'purple_percentage'}:
-                        transwell_visualized_files.append(file_path)
-                except Exception as e:
-                    print(f"校验文件 {f} 时出错: {e}")
-                    continue
+        dirs[:] = natsort.natsorted(dirs)
+        folder_result_df = read_transwell_folder_summary(output_folder, root, files)
+        if folder_result_df is None:
+            continue
 
-        # 对文件名进行排序
-        transwell_visualized_files = natsort.natsorted(transwell_visualized_files)
-        print(f"检测到Transwell可视化文件: {transwell_visualized_files}")
+        # 追加到最终结果
+        final_result_df = pd.concat([final_result_df, folder_result_df], ignore_index=True)
 
-        # 如果没有符合条件的文件，跳过当前文件夹
-        if not transwell_visualized_files:
-            continue
+    # 如果没有任何数据
+    if final_result_df.empty:
+        logger.warning("未找到任何Transwell数据进行总结")
+        return None
+
+    # 生成总结 CSV 文件
+    summary_file_path = os.path.join(output_folder, 'summarized-transwell.csv')
+    write_transwell_csv(final_result_df, summary_file_path)
+    logger.info(f"生成Transwell总结文件: {summary_file_path}")
+
+    return summary_file_path
 
-        # 读取并整合当前文件夹的所有文件
-        folder_result_df = pd.DataFrame(columns=['filename', 'purple_percentage'])
-        for file_path in transwell_visualized_files:
+
+# read_transwell_folder_summary 函数
+# 读取单个输出文件夹中的 Transwell 可视化文件，返回带 folderpath 列的 DataFrame；没有数据时返回 None
+def read_transwell_folder_summary(output_folder, root, files):
+    # 计算当前处理的文件夹的相对路径
+    relative_path = os.path.relpath(root, output_folder)
+
+    # 筛选 Transwell 可视化文件
+    transwell_visualized_files = []
+    for f in files:
+        if f.startswith('visualized-') and f.endswith('_transwell.csv'):
+            file_path = os.path.join(root, f)
             try:
+                # 读取文件并检查列
                 df = pd.read_csv(file_path)
-                folder_result_df = pd.concat([folder_result_df, df], ignore_index=True)
+                # 检查是否包含严格匹配的列名
+                if set(df.columns) == {'filename', 'purple_percentage'}:
+                    transwell_visualized_files.append(file_path)
             except Exception as e:
-                print(f"读取文件 {file_path} 时出错: {e}")
-
-        # 如果没有成功读取任何数据
-        if folder_result_df.empty:
-            print(f"未成功读取 {relative_path} 中的Transwell数据")
-            continue
+                logger.warning(f"校验文件 {f} 时出错: {e}")
+                continue
 
-        # 添加 folderpath 列
-        folder_result_df['folderpath'] = relative_path
+    # 对文件名进行排序
+    transwell_visualized_files = natsort.natsorted(transwell_visualized_files)
+    logger.debug(f"检测到Transwell可视化文件: {transwell_visualized_files}")
 
-        # 重新排序列
-        folder_result_df = folder_result_df[['folderpath', 'filename', 'purple_percentage']]
+    # 如果没有符合条件的文件，跳过当前文件夹
+    if not transwell_visualized_files:
+        return None
 
-        # 追加到最终结果
-        final_result_df = pd.concat([final_result_df, folder_result_df], ignore_index=True)
+    # 读取并整合当前文件夹的所有文件
+    folder_result_df = pd.DataFrame(columns=['filename', 'purple_percentage'])
+    for file_path in transwell_visualized_files:
+        try:
+            df = pd.read_csv(file_path)
+            folder_result_df = pd.concat([folder_result_df, df], ignore_index=True)
+        except Exception as e:
+            logger.warning(f"读取文件 {file_path} 时出错: {e}")
 
-    # 如果没有任何数据
-    if final_result_df.empty:
-        print("未找到任何Transwell数据进行总结")
+    # 如果没有成功读取任何数据
+    if folder_result_df.empty:
+        logger.warning(f"未成功读取 {relative_path} 中的Transwell数据")
         return None
 
-    # 生成总结 CSV 文件
+    # 添加 folderpath 列
+    folder_result_df['folderpath'] = relative_path
+
+    # 重新排序列
+    return folder_result_df[['folderpath', 'filename', 'purple_percentage']]
+
+
+# update_transwell_summary 函数
+# 增量更新 summarized-transwell.csv：只重新读取 folders（相对输出文件夹的路径）中的可视化文件
+# 替换这些文件夹原有的行，其余文件夹的行保持不变；总结文件不存在时退回完整的 summarize_transwell_files
+def update_transwell_summary(output_folder, folders):
     summary_file_path = os.path.join(output_folder, 'summarized-transwell.csv')
-    final_result_df.to_csv(summary_file_path, index=False)
-    print(f"生成Transwell总结文件: {summary_file_path}")
+    if not os.path.exists(summary_file_path):
+        return summarize_transwell_files(output_folder)
 
+    folders = {os.path.normpath(folder) for folder in folders}
+    summary_df = pd.read_csv(summary_file_path, dtype={'folderpath': str})
+    summary_df = summary_df[~summary_df['folderpath'].map(os.path.normpath).isin(folders)]
+
+    updated = [summary_df]
+    for folder in natsort.natsorted(folders):
+        root = os.path.normpath(os.path.join(output_folder, folder))
+        if not os.path.isdir(root):
+            continue
+        folder_result_df = read_transwell_folder_summary(output_folder, root, os.listdir(root))
+        if folder_result_df is not None:
+            updated.append(folder_result_df)
+
+    final_result_df = pd.concat(updated, ignore_index=True)
+    write_transwell_csv(final_result_df, summary_file_path)
+    logger.info(f"更新Transwell总结文件: {summary_file_path}")
     return summary_file_path
 
 
+# visualize_teg_results 函数
+# 从结果库生成 TEG 可视化文件，输出与 visualize_teg_files 相同
+def visualize_teg_results(store, input_folder, output_folder, folders=None):
+    all_visualized_files = []
+    for folder, df in natsort.natsorted(store.read('teg', folders).items()):
+        all_data = {}
+        max_x_length = 0
+        for file in natsort.natsorted(df['file'].unique()):
+            trace = df[df['file'] == file]
+            max_x_length = max(max_x_length, len(trace))
+            all_data[file] = {'y': trace['y'].tolist(), 'z': trace['z'].tolist()}
+
+        root = os.path.normpath(os.path.join(input_folder, folder))
+        current_output_folder = os.path.join(output_folder, folder)
+        os.makedirs(current_output_folder, exist_ok=True)
+        visualized_file_path = os.path.join(current_output_folder, f'visualized-{os.path.basename(root)}_teg.csv')
+        write_teg_visualization(all_data, max_x_length, visualized_file_path)
+        parameters_file_path = os.path.join(current_output_folder,
+                                            f'visualized-{os.path.basename(root)}_teg_parameters.csv')
+        write_teg_parameters(all_data, max_x_length, parameters_file_path)
+        all_visualized_files.extend([visualized_file_path, parameters_file_path])
+    return all_visualized_files
+
+
+# visualize_transwell_results 函数
+# 从结果库生成 Transwell 可视化文件与 summarized-transwell.csv
+# 汇总文件始终包含结果库中的全部文件夹，因此监视模式下也不需要单独的增量更新
+def visualize_transwell_results(store, input_folder, output_folder, folders=None):
+    all_visualized_files = []
+    results = store.read('transwell')
+    summary_frames = []
+    for folder, df in natsort.natsorted(results.items()):
+        df = df.iloc[natsort.index_natsorted(df['file'])]
+        folder_df = df[['filename', 'purple_percentage']].reset_index(drop=True)
+        summary_frames.append(folder_df.assign(folderpath=folder)[['folderpath', 'filename', 'purple_percentage']])
+        if folders is not None and folder not in {os.path.normpath(f) for f in folders}:
+            continue
+
+        root = os.path.normpath(os.path.join(input_folder, folder))
+        current_output_folder = os.path.join(output_folder, folder)
+        os.makedirs(current_output_folder, exist_ok=True)
+        visualized_file_path = os.path.join(current_output_folder,
+                                            f'visualized-{os.path.basename(root)}_transwell.csv')
+        write_transwell_csv(folder_df, visualized_file_path)
+        logger.info(f"生成可视化CSV: {visualized_file_path}")
+        all_visualized_files.append(visualized_file_path)
+
+    if summary_frames:
+        summary_file_path = os.path.join(output_folder, 'summarized-transwell.csv')
+        write_transwell_csv(pd.concat(summary_frames, ignore_index=True), summary_file_path)
+        logger.info(f"生成Transwell总结文件: {summary_file_path}")
+    return all_visualized_files
+
+
+# image_dimensions 函数
+# 只读取文件头获取图像宽高（支持 JPEG / PNG / TIFF），不解码像素；无法识别时返回 None
+def image_dimensions(file_path):
+    with open_input(file_path, 'rb') as f:
+        head = f.read(26)
+        if head[:8] == b'\x89PNG\r\n\x1a\n':
+            return struct.unpack('>II', head[16:24])
+
+        if head[:4] in (b'II*\x00', b'MM\x00*'):
+            endian = '<' if head[:2] == b'II' else '>'
+            f.seek(struct.unpack(endian + 'I', head[4:8])[0])
+            (n_entries,) = struct.unpack(endian + 'H', f.read(2))
+            dims = {}
+            for _ in range(n_entries):
+                tag, value_type, _, value = struct.unpack(endian + 'HHI4s', f.read(12))
+                if tag in (256, 257):
+                    fmt = 'H2x' if value_type == 3 else 'I'
+                    dims[tag] = struct.unpack(endian + fmt, value)[0]
+            return (dims[256], dims[257]) if len(dims) == 2 else None
+
+        if head[:2] == b'\xff\xd8':
+            f.seek(2)
+            while True:
+                byte = f.read(1)
+                while byte == b'\xff':
+                    byte = f.read(1)
+                if not byte:
+                    return None
+                marker = byte[0]
+                (length,) = struct.unpack('>H', f.read(2))
+                # SOF0-SOF15（不含 DHT/JPG/DAC）记录了图像高宽
+                if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                    height, width = struct.unpack('>xHH', f.read(5))
+                    return width, height
+                f.seek(length - 2, 1)
+                byte = f.read(1)
+                if byte != b'\xff':
+                    return None
+                f.seek(-1, 1)
+    return None
+
+
+# ---- 内置处理器 ----
+# 每个处理器声明扩展名、内容嗅探、开销估计与资源类型，由 FileProcessorThread 通过 PROCESSOR_REGISTRY 分派
+
+@register_processor
+class TegProcessor(PluginBase):
+    name = 'TEG'
+    extensions = ('.txt',)
+    count_keys = ('TEG',)
+    output_suffix = '_teg.csv'
+    resource = RESOURCE_IO
+    results_module = 'teg'
+
+    def process(self, file_path, output_folder, runner=None):
+        output_file_path = self.output_path(file_path, output_folder)
+        if self.results_store(runner) is None:
+            process_teg(file_path, output_file_path)
+        else:
+            df = read_teg_trace(file_path).apply(pd.to_numeric, errors='coerce')
+            self.append_results(runner, output_folder, output_file_path, df)
+        return output_file_path
+
+
+# read_table_head 函数
+# 只读取表格文件的前 nrows 行（不设表头），用于内容嗅探
+def read_table_head(file_path, nrows=2):
+    if file_path.lower().endswith('.csv'):
+        return pd.read_csv(input_source(file_path), header=None, nrows=nrows, encoding='GB18030',
+                           encoding_errors='replace')
+    return pd.read_excel(input_source(file_path), header=None, nrows=nrows)
+
+
+@register_processor
+class AaProcessor(PluginBase):
+    """血小板聚集仪数据：第一行为 NjData、第二行为 ADPrateData"""
+    name = 'AA'
+    extensions = ('.xlsx', '.xls', '.xlsm', '.csv')
+    count_keys = ('AA',)
+    output_suffix = '.xlsx'
+    resource = RESOURCE_IO
+    priority = 0
+
+    def sniff(self, file_path):
+        df = read_table_head(file_path)
+        first_value = df.iloc[0, 0] if not df.empty else None
+        second_value = df.iloc[1, 0] if df.shape[0] > 1 else None
+        return first_value == 'NjData' and second_value == 'ADPrateData'
+
+    def process(self, file_path, output_folder, runner=None):
+        output_file_path = self.output_path(file_path, output_folder)
+        process_aa(file_path, output_file_path)
+        return output_file_path
+
+
+@register_processor
+class MrProcessor(PluginBase):
+    """酶标仪数据：同扩展名中未被其他处理器识别的表格文件"""
+    name = 'MR'
+    extensions = ('.xlsx', '.xls', '.xlsm', '.csv')
+    count_keys = ('Excel_CSV',)
+    output_suffix = '.xlsx'
+    resource = RESOURCE_IO
+    priority = 100
+
+    def process(self, file_path, output_folder, runner=None):
+        output_file_path = self.output_path(file_path, output_folder)
+        process_mr(file_path, output_file_path)
+        return output_file_path
+
+
+@register_processor
+class TranswellProcessor(PluginBase):
+    name = 'Transwell'
+    extensions = ('.tif', '.tiff', '.jpg', '.jpeg')
+    count_keys = ('Transwell',)
+    output_suffix = '_transwell.csv'
+    resource = RESOURCE_CPU
+    results_module = 'transwell'
+
+    def estimate_cost(self, file_path):
+        # 按像素数估计：BGR 原图与 HSV 图各 3 字节/像素，掩码 1 字节/像素
+        try:
+            dims = image_dimensions(file_path)
+        except (OSError, struct.error):
+            dims = None
+        pixels = dims[0] * dims[1] if dims else input_stat(file_path)[0] * 10
+        return JobCost(work=pixels, memory=pixels * 7)
+
+    def process(self, file_path, output_folder, runner=None):
+        output_file_path = self.output_path(file_path, output_folder)
+        if self.results_store(runner) is None:
+            process_transwell(file_path, output_file_path)
+        else:
+            df = pd.DataFrame({'filename': [os.path.splitext(os.path.basename(file_path))[0]],
+                               'purple_percentage': [measure_transwell(file_path)]})
+            self.append_results(runner, output_folder, output_file_path, df)
+        return output_file_path
+
+    def materialize_duplicate(self, runner, source_path, source_output, file_path, output_folder):
+        # 结果中的 filename 列为输入文件名，文件名不同的副本需要改写该列
+        filename = os.path.splitext(os.path.basename(file_path))[0]
+        if filename == os.path.splitext(os.path.basename(source_path))[0]:
+            return super().materialize_duplicate(runner, source_path, source_output, file_path, output_folder)
+        output_file_path = self.output_path(file_path, output_folder)
+        if self.results_store(runner) is not None:
+            self.copy_results(runner, source_output, output_file_path, filename=filename)
+        else:
+            pd.read_csv(source_output).assign(filename=filename).to_csv(output_file_path, index=False)
+        return output_file_path
+
+
+@register_processor
+class FaProcessor(VideoProcessorPlugin):
+    """灌注视频：FA 荧光强度分析 + 指定时间点截图"""
+    name = 'FA'
+    extensions = ('.mov', '.mp4')
+    count_keys = ('MOV_MP4', 'video2pic')
+    output_suffix = '_fa.csv'
+    resource = RESOURCE_CPU
+
+    def process(self, file_path, output_folder, runner=None):
+        # 压缩包中的视频需要真实路径供 OpenCV / ffmpeg 解码，临时写出后处理（保留原文件名）
+        with local_input_path(file_path) as video_path:
+            return self.process_video(video_path, output_folder, runner)
+
+    def process_video(self, file_path, output_folder, runner=None):
+        file = os.path.basename(file_path)
+
+        # 打开视频文件，获取 fps 和总帧数来计算时长
+        cap = cv2.VideoCapture(file_path)
+        if not cap.isOpened():
+            cap.release()
+            raise ValueError(f"无法打开视频文件: {file}")
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        duration = total_frames / fps if fps else 0
+        cap.release()  # 检测完毕后及时释放资源
+
+        # 长视频（10分钟以上）默认降低采样率，而不是跳过FA处理
+        sample_rate = getattr(runner, 'fa_sample_rate', None)
+        if sample_rate is None:
+            sample_rate = FA_SAMPLE_RATE if duration < FA_LONG_VIDEO_SECONDS else FA_LONG_VIDEO_SAMPLE_RATE
+        output_file_path = self.output_path(file_path, output_folder)
+        self.log(runner, f"处理视频: {file} 时长 {duration:.2f}s，以 {sample_rate:g} Hz 进行FA处理")
+        # 长视频按时间分片并行解码，短视频分片开销大于收益，保持顺序处理
+        # 在调度器中运行时，分片线程数不超过本作业在 CPU 线程池中的份额，避免与其他并发的 CPU 作业叠加造成过度订阅
+        workers = 1
+        if duration >= FA_SHARD_MIN_SECONDS:
+            workers = getattr(runner, 'fa_workers', FA_WORKERS)
+            if runner is not None and hasattr(runner, 'worker_limits'):
+                workers = min(workers, cpu_share(runner.worker_limits()[RESOURCE_CPU]))
+        process_fa(file_path, output_file_path, sample_rate=sample_rate,
+                   start_time=getattr(runner, 'fa_start_time', None),
+                   end_time=getattr(runner, 'fa_end_time', None), workers=workers,
+                   backend=getattr(runner, 'fa_backend', FA_BACKEND), checkpoint=getattr(runner, 'checkpoint', None))
+
+        # 根据时长确定时间点（注意这里的时间点单位均为分钟）
+        if duration < 300:  # 小于5分钟
+            timestamps = [1, 2, 3]
+        elif duration < 600:  # 5到10分钟
+            timestamps = [1, 3, 5]
+        else:  # 超过10分钟
+            timestamps = [3, 6, 9, 12, 15]
+
+        # 调用 process_video_screenshots 来生成截图
+        process_video_screenshots(file_path, output_folder, timestamps,
+                                  contact_sheet_frames=getattr(runner, 'contact_sheet_frames', 0))
+        return output_file_path
+
+    def materialize_duplicate(self, runner, source_path, source_output, file_path, output_folder):
+        output_file_path = super().materialize_duplicate(runner, source_path, source_output, file_path, output_folder)
+        # 截图文件夹与截图文件名都以视频文件名开头，复制时换成副本的文件名
+        source_name = os.path.splitext(os.path.basename(source_path))[0]
+        video_name = os.path.splitext(os.path.basename(file_path))[0]
+        source_folder = os.path.join(os.path.dirname(source_output), source_name)
+        if os.path.isdir(source_folder):
+            os.makedirs(os.path.join(output_folder, video_name), exist_ok=True)
+            for image in os.listdir(source_folder):
+                target = video_name + image[len(source_name):] if image.startswith(source_name) else image
+                link_or_copy(os.path.join(source_folder, image), os.path.join(output_folder, video_name, target))
+        return output_file_path
+
+
+@register_processor
+class Avi2Mp4Processor(VideoProcessorPlugin):
+    name = 'AVI2MP4'
+    extensions = ('.avi',)
+    count_keys = ('AVI2MP4',)
+    output_suffix = '_a2m.mp4'
+    resource = RESOURCE_SUBPROCESS  # 优先由 ffmpeg 流复制封装
+
+    def process(self, file_path, output_folder, runner=None):
+        output_file_path = self.output_path(file_path, output_folder)
+        with local_input_path(file_path) as video_path:
+            process_avi2mp4(video_path, output_file_path, checkpoint=getattr(runner, 'checkpoint', None))
+        return output_file_path
+
+
+@register_processor
+class CifProcessor(PluginBase):
+    """分子结构文件：整个文件夹收集后批量转换（原生解析优先，obabel 兜底）"""
+    name = 'CIF'
+    extensions = ('.cif',)
+    count_keys = ('cif2pdb',)
+    output_suffix = '.pdb'
+    resource = RESOURCE_SUBPROCESS
+    batch = True
+
+    def process(self, file_path, output_folder, runner=None):
+        output_file_path = self.output_path(file_path, output_folder)
+        process_cif2pdb(file_path, output_file_path)
+        return output_file_path
+
+    def process_batch(self, jobs, runner=None):
+        self.log(runner, f"正在批量转换 {len(jobs)} 个 cif 文件...")
+        return convert_cif_files(jobs, checkpoint=getattr(runner, 'checkpoint', None))
+
+
+@register_processor
+class XvgProcessor(PluginBase):
+    """GROMACS .xvg：转换结果保存在输出文件夹的 xvg_csv 子目录中"""
+    name = 'XVG'
+    extensions = ('.xvg',)
+    count_keys = ('xvg2csv',)
+    resource = RESOURCE_IO
+
+    def output_path(self, file_path, output_folder):
+        return xvg_csv_path(file_path, os.path.join(output_folder, "xvg_csv"))
+
+    def process(self, file_path, output_folder, runner=None):
+        output_file_path = self.output_path(file_path, output_folder)
+        os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+        if not convert_xvg_file(file_path, output_file_path):
+            raise ValueError(f"{os.path.basename(file_path)} 中没有数据")
+        return output_file_path
+
 
 # 顶部添加（在 __main__ 外）
 main_window = None
@@ -1598,7 +5204,7 @@ main_window = None
 if __name__ == "__main__":
     from PyQt6.QtGui import QPixmap
     from PyQt6.QtWidgets import QApplication, QSplashScreen
-    from PyQt6.QtCore import Qt, QTimer
+    from PyQt6.QtCore import Qt
     import sys
     import os
 
@@ -1608,6 +5214,12 @@ if __name__ == "__main__":
     except ImportError:
         pyi_splash = None
 
+    # 服务器 / 命令行批处理 / 分片合并模式不启动图形界面
+    if {'--server', '--batch', '--merge'} & set(sys.argv):
+        if pyi_splash:
+            pyi_splash.close()
+        sys.exit(run_command_line(sys.argv[1:]))
+
 
     def resource_path(relative_path):
         if hasattr(sys, '_MEIPASS'):
@@ -1638,21 +5250,17 @@ if __name__ == "__main__":
     splash.move((screen_width - splash_width) // 2, (screen_height - splash_height) // 2)
 
     splash.show()
+    app.processEvents()  # 先把 splash 画出来，再构建主窗口
 
+    # 主窗口构建完成后立即关闭 splash，不再等待固定计时
+    main_window = FileProcessorApp()
+    main_window.show()
+    splash.finish(main_window)
 
-    def start_app():
-        global main_window
-
-        # 1. 关闭 PyQt6 的 splash
-        splash.close()
-
-        if pyi_splash:
-            pyi_splash.close()
-
-        # 3. 显示主窗口
-        main_window = FileProcessorApp()
-        main_window.show()
+    if pyi_splash:
+        pyi_splash.close()
 
+    # 用户选择文件夹时在后台预热科学计算模块
+    threading.Thread(target=warm_up_heavy_modules, daemon=True).start()
 
-    QTimer.singleShot(2500, start_app)
-    sys.exit(app.exec())exec())
+    sys.exit(app.exec())
@@ -0,0 +1,537 @@
+# PlateletPro 性能基准脚本
+# 用于对比 RC.py 中各处理模块不同实现之间的耗时，不参与 GUI 运行
+# 用法示例：python benchmark.py fa-backends --seconds 120 --fps 30
+#          python benchmark.py fa-shards --seconds 120 --workers 4
+#          python benchmark.py cif --count 1000 --residues 300
+#          python benchmark.py startup --max-ms 500
+#          python benchmark.py suite --scale small --save-baseline baseline-small.json
+#          python benchmark.py suite --scale small --baseline baseline-small.json --threshold 0.2
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+import pandas as pd
+
+import RC
+
+
+# make_synthetic_video 函数
+# 生成强度随时间变化的合成灌注视频，四个象限亮度各不相同，便于检验 FA 结果
+def make_synthetic_video(path, seconds=60, fps=30, size=(640, 480)):
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    rng = np.random.default_rng(0)
+    noise = rng.integers(0, 20, size=(height, width, 3), dtype=np.uint8)
+    for i in range(int(seconds * fps)):
+        frame = np.full((height, width, 3), (i // 2) % 200, dtype=np.uint8)
+        frame[:height // 2, :width // 2] = (i * 3) % 200
+        frame[height // 2:, width // 2:] = (i * 5) % 200
+        writer.write(cv2.add(frame, noise))
+    writer.release()
+    return path
+
+
+# time_call 函数
+# 重复执行 repeat 次，返回最短耗时（秒），减少系统抖动的影响
+def time_call(func, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+# bench_fa_backends 函数
+# 对比 FA 的 OpenCV 解码与 ffmpeg 管道（全分辨率 / 降分辨率）两种后端
+def bench_fa_backends(video_path=None, seconds=60, fps=30, size=(640, 480), sample_rate=1.0, repeat=3):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if video_path is None:
+            video_path = make_synthetic_video(os.path.join(tmp_dir, 'synthetic.mp4'), seconds, fps, size)
+        output_path = os.path.join(tmp_dir, 'output-bench_fa.csv')
+
+        cases = [('opencv', {'backend': 'opencv'})]
+        if RC.find_ffmpeg():
+            cases.append(('ffmpeg', {'backend': 'ffmpeg'}))
+            cases.append(('ffmpeg scale=0.25', {'backend': 'ffmpeg', 'scale': 0.25}))
+        else:
+            print("未找到 ffmpeg，仅测试 OpenCV 后端")
+
+        results = {}
+        for name, kwargs in cases:
+            elapsed = time_call(lambda: RC.process_fa(video_path, output_path, sample_rate=sample_rate, **kwargs),
+                                repeat)
+            results[name] = elapsed
+            print(f"{name:<20} {elapsed:8.3f} s")
+        return results
+
+
+# check_fa_shards 函数
+# 校验 FA 分片并行解码：同一视频分别以 workers=1 与 workers=N 处理（多种采样率与时间窗口），合并后的 CSV 必须与顺序处理完全一致
+# 全部一致时返回 True，并打印两种方式的耗时
+def check_fa_shards(video_path=None, seconds=60, fps=30, workers=4):
+    cases = [('1 Hz', {'sample_rate': 1.0}),
+             ('0.2 Hz', {'sample_rate': 0.2}),
+             ('高于帧率', {'sample_rate': fps * 2}),
+             ('时间窗口', {'sample_rate': 1.0, 'start_time': seconds / 7, 'end_time': seconds * 5 / 7})]
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if video_path is None:
+            video_path = make_synthetic_video(os.path.join(tmp_dir, 'synthetic.mp4'), seconds, fps)
+        for name, kwargs in cases:
+            outputs = []
+            for n in (1, workers):
+                output_path = os.path.join(tmp_dir, f'output-w{n}_fa.csv')
+                start = time.perf_counter()
+                RC.process_fa(video_path, output_path, workers=n, backend='opencv', **kwargs)
+                elapsed = time.perf_counter() - start
+                with open(output_path, 'rb') as f:
+                    outputs.append((f.read(), elapsed))
+            same = outputs[0][0] == outputs[1][0]
+            ok = ok and same
+            print(f"{name:<12} workers=1 {outputs[0][1]:7.3f} s  workers={workers} {outputs[1][1]:7.3f} s  "
+                  f"{'一致' if same else '不一致'}")
+    return ok
+
+
+# make_synthetic_mmcif 函数
+# 生成结构预测风格的 mmCIF 文件（单模型、单链，每个残基 4 个主链原子）
+def make_synthetic_mmcif(path, residues=300, seed=0):
+    rng = np.random.default_rng(seed)
+    coords = np.cumsum(rng.normal(0, 1.2, size=(residues * 4, 3)), axis=0)
+    fields = ['group_PDB', 'id', 'type_symbol', 'label_atom_id', 'label_alt_id', 'label_comp_id',
+              'label_asym_id', 'label_entity_id', 'label_seq_id', 'pdbx_PDB_ins_code', 'Cartn_x',
+              'Cartn_y', 'Cartn_z', 'occupancy', 'B_iso_or_equiv', 'auth_seq_id', 'auth_asym_id',
+              'pdbx_PDB_model_num']
+    lines = [f"data_{os.path.splitext(os.path.basename(path))[0]}", "#", "loop_"]
+    lines += [f"_atom_site.{field}" for field in fields]
+    atom_names = [('N', 'N'), ('C', 'CA'), ('C', 'C'), ('O', 'O')]
+    for i, (x, y, z) in enumerate(coords):
+        element, name = atom_names[i % 4]
+        seq = i // 4 + 1
+        lines.append(f"ATOM {i + 1} {element} {name} . ALA A 1 {seq} ? {x:.3f} {y:.3f} {z:.3f} 1.00 "
+                     f"{rng.uniform(50, 95):.2f} {seq} A 1")
+    lines.append("#")
+    with open(path, 'w') as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+# bench_cif 函数
+# 对比原生 mmCIF 解析与 obabel 批量转换在整个结构文件夹上的耗时
+def bench_cif(count=1000, residues=300):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_dir = os.path.join(tmp_dir, 'cif')
+        os.makedirs(input_dir)
+        paths = [make_synthetic_mmcif(os.path.join(input_dir, f'model_{i}.cif'), residues, seed=i)
+                 for i in range(count)]
+
+        cases = [('native', True)]
+        if shutil.which('obabel'):
+            cases.append(('obabel', False))
+        else:
+            print("未找到 obabel，仅测试原生转换")
+
+        results = {}
+        for name, native in cases:
+            output_dir = os.path.join(tmp_dir, name)
+            os.makedirs(output_dir)
+            jobs = [(path, os.path.join(output_dir, f"output-{os.path.splitext(os.path.basename(path))[0]}.pdb"))
+                    for path in paths]
+            elapsed = time_call(lambda: RC.convert_cif_files(jobs, native=native), repeat=1)
+            results[name] = elapsed
+            print(f"{name:<20} {elapsed:8.3f} s  ({count / elapsed:8.1f} files/s)")
+        return results
+
+
+# WINDOW_READY_SCRIPT 在子进程中测量从导入 RC 到主窗口构建完成的耗时（离屏渲染，无需显示器）
+WINDOW_READY_SCRIPT = """
+import os, sys, time
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+start = time.perf_counter()
+import RC
+from PyQt6.QtWidgets import QApplication
+app = QApplication(sys.argv)
+window = RC.FileProcessorApp()
+window.show()
+app.processEvents()
+print(f"{(time.perf_counter() - start) * 1000:.1f}")
+"""
+
+
+# parse_importtime 函数
+# 解析 python -X importtime 的输出，返回 {模块名: (自身耗时ms, 累计耗时ms)}
+def parse_importtime(stderr_text):
+    timings = {}
+    for line in stderr_text.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        timings[name.strip()] = (int(self_us) / 1000, int(cumulative_us) / 1000)
+    return timings
+
+
+# bench_startup 函数
+# 冷启动子进程中测量 import RC 的累计导入耗时（-X importtime）与主窗口就绪耗时
+# 导入耗时的中位数超过 max_ms 时返回 False，用于发现启动时间回退
+def bench_startup(repeat=5, max_ms=None, top=10):
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    import_times = []
+    window_times = []
+    timings = {}
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import RC'],
+                                cwd=repo_dir, capture_output=True, text=True)
+        timings = parse_importtime(result.stderr)
+        import_times.append(timings['RC'][1])
+
+        result = subprocess.run([sys.executable, '-c', WINDOW_READY_SCRIPT],
+                                cwd=repo_dir, capture_output=True, text=True)
+        if result.returncode == 0 and result.stdout.strip():
+            window_times.append(float(result.stdout.strip().splitlines()[-1]))
+
+    import_ms = statistics.median(import_times)
+    print(f"import RC            {import_ms:8.1f} ms (median of {repeat})")
+    if window_times:
+        print(f"main window ready    {statistics.median(window_times):8.1f} ms (median of {len(window_times)})")
+
+    print(f"最耗时的 {top} 个导入（自身耗时）：")
+    for name, (self_ms, cumulative_ms) in sorted(timings.items(), key=lambda item: -item[1][0])[:top]:
+        print(f"  {name:<40} {self_ms:8.1f} ms  (累计 {cumulative_ms:8.1f} ms)")
+
+    if max_ms is not None and import_ms > max_ms:
+        print(f"启动导入耗时 {import_ms:.1f} ms 超过阈值 {max_ms} ms")
+        return False
+    return True
+
+
+# 基准套件中各规模的输入大小
+SUITE_SCALES = {
+    'small': {'teg_points': 2000, 'aa_points': 2000, 'aa_channels': 4, 'mr_plates': 20,
+              'transwell_size': (1024, 768), 'video_seconds': 10, 'xvg_rows': 100000, 'visualize_files': 20,
+              'teg_traces': 1000, 'mr_reads': 1000},
+    'medium': {'teg_points': 10000, 'aa_points': 10000, 'aa_channels': 8, 'mr_plates': 100,
+               'transwell_size': (2048, 1536), 'video_seconds': 60, 'xvg_rows': 1000000, 'visualize_files': 100,
+               'teg_traces': 3000, 'mr_reads': 5000},
+    'large': {'teg_points': 50000, 'aa_points': 50000, 'aa_channels': 12, 'mr_plates': 500,
+              'transwell_size': (4096, 3072), 'video_seconds': 300, 'xvg_rows': 5000000, 'visualize_files': 500,
+              'teg_traces': 10000, 'mr_reads': 20000},
+}
+
+
+# make_teg_trace 函数
+# 生成 TEG 仪器导出的振幅曲线（每 5 秒一个点，带单位）
+def make_teg_trace(path, points=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(points) * 5
+    amplitude = 60 * (1 - np.exp(-t / 600)) + rng.normal(0, 0.2, points)
+    with open(path, 'w') as f:
+        f.writelines(f"{x}s,{max(y, 0):.2f}mm\n" for x, y in zip(t, amplitude))
+    return path
+
+
+# make_teg_matrix 函数
+# 生成补齐后的 TEG 振幅矩阵：每行一条 2 小时（每 5 秒一个点）的曲线，R、MA 与溶解程度各不相同，末尾随机截断
+def make_teg_matrix(traces=1000, points=1440, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(points) * 5 / 60
+    r = rng.uniform(3, 10, (traces, 1))
+    ma = rng.uniform(45, 70, (traces, 1))
+    lysis = rng.uniform(0, 0.1, (traces, 1)) * np.clip((t - 60) / 30, 0, 1)
+    amplitudes = np.where(t > r, ma * (1 - np.exp(-(t - r) / rng.uniform(2, 5, (traces, 1)))), 0) * (1 - lysis)
+    amplitudes += rng.normal(0, 0.2, amplitudes.shape)
+    lengths = rng.integers(points // 2, points + 1, traces)
+    amplitudes[np.arange(points)[None, :] >= lengths[:, None]] = np.nan
+    return amplitudes
+
+
+# make_aa_workbook 函数
+# 生成血小板聚集仪导出的工作簿：前两行为 NjData / ADPrateData，之后每行一个通道，数值以 '@#' 连接
+def make_aa_workbook(path, points=2000, channels=4, seed=0):
+    rng = np.random.default_rng(seed)
+    curve = 70 * (1 - np.exp(-np.arange(points) / (points / 5)))
+    rows = [['NjData'], ['ADPrateData']]
+    for channel in range(channels):
+        values = curve * rng.uniform(0.6, 1.0) + rng.normal(0, 0.5, points)
+        rows.append(['@#'.join(f"{v:.1f}" for v in values)])
+    pd.DataFrame(rows).to_excel(path, header=False, index=False)
+    return path
+
+
+# make_aa_matrix 函数
+# 生成补齐后的聚集曲线矩阵：每行一个通道，最大聚集率与上升速度各不相同，末尾随机截断
+def make_aa_matrix(channels=1000, points=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(points)
+    curves = rng.uniform(40, 80, (channels, 1)) * (1 - np.exp(-t / rng.uniform(points / 10, points / 3, (channels, 1))))
+    curves += rng.normal(0, 0.5, curves.shape)
+    lengths = rng.integers(points // 2, points + 1, channels)
+    curves[t[None, :] >= lengths[:, None]] = np.nan
+    return curves
+
+
+# make_plate_reader_file 函数
+# 生成酶标仪导出的多块 96 孔板读数：标题行之后每块板 8 行 x 12 列，板间空一行
+def make_plate_reader_file(path, plates=20, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = [['Reading 1'] + [None] * 12]
+    for plate in range(plates):
+        for letter in 'ABCDEFGH':
+            rows.append([letter] + list(np.round(rng.random(12) + plate * 0.01, 3)))
+        rows.append([None] * 13)
+    pd.DataFrame(rows).to_excel(path, header=False, index=False)
+    return path
+
+
+# make_kinetic_readings 函数
+# 生成 384 孔板的动力学读数矩阵（读数 × 孔位）：每个孔一条中点与速率各不相同的 S 形曲线，加少量噪声
+def make_kinetic_readings(reads=1000, wells=384, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(reads)[:, None]
+    midpoint = rng.uniform(reads / 5, reads * 4 / 5, wells)
+    rate = rng.uniform(5, 20, wells) / reads
+    readings = 0.1 + rng.uniform(0.5, 1.5, wells) / (1 + np.exp(-rate * (t - midpoint)))
+    return readings + rng.normal(0, 0.005, readings.shape)
+
+
+# make_transwell_image 函数
+# 生成白色背景上随机分布紫色细胞的 Transwell 染色图像
+def make_transwell_image(path, size=(1024, 768), cells=400, seed=0):
+    rng = np.random.default_rng(seed)
+    width, height = size
+    image = np.full((height, width, 3), 245, dtype=np.uint8)
+    for _ in range(cells):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        cv2.circle(image, center, int(rng.integers(4, 12)), (170, 40, 130), -1)
+    cv2.imwrite(path, image)
+    return path
+
+
+# make_synthetic_avi 函数
+# 生成 MJPG 编码的 AVI 视频（不能直接封装为 MP4，走逐帧重新编码路径）
+def make_synthetic_avi(path, seconds=10, fps=30, size=(640, 480)):
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    for i in range(int(seconds * fps)):
+        frame = np.full((height, width, 3), (i * 3) % 200, dtype=np.uint8)
+        cv2.circle(frame, (i % width, height // 2), 30, (255, 255, 255), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+# make_xvg 函数
+# 生成 GROMACS 风格的 .xvg 文件（注释行、@ 元数据行和多列数值）
+def make_xvg(path, rows=100000, columns=4, seed=0):
+    rng = np.random.default_rng(seed)
+    data = np.column_stack([np.arange(rows) * 0.002] + [rng.normal(0, 1, rows) for _ in range(columns - 1)])
+    with open(path, 'w') as f:
+        f.write("# GROMACS synthetic benchmark\n@    title \"RMSD\"\n@    xaxis  label \"Time (ns)\"\n")
+        f.write("@TYPE xy\n")
+        np.savetxt(f, data, fmt='%.4f')
+    return path
+
+
+# make_visualize_tree 函数
+# 生成可视化阶段的输入：一个输出文件夹中有 count 个 TEG、Transwell 和 FA 的处理结果
+def make_visualize_tree(tmp_dir, count=20, seed=0):
+    rng = np.random.default_rng(seed)
+    input_dir = os.path.join(tmp_dir, 'visualize-in', 'exp')
+    output_dir = os.path.join(tmp_dir, 'visualize-out', 'exp')
+    os.makedirs(input_dir)
+    os.makedirs(output_dir)
+    for i in range(count):
+        y = np.round(rng.random(500) * 60, 2)
+        pd.DataFrame({'x': np.arange(500) * 5, 'y': y, 'z': -y}).to_csv(
+            os.path.join(output_dir, f'output-t{i}_teg.csv'), index=False)
+        pd.DataFrame({'filename': [f'w{i}'], 'purple_percentage': [rng.random() * 30]}).to_csv(
+            os.path.join(output_dir, f'output-w{i}_transwell.csv'), index=False)
+        fa = rng.random((300, len(RC.FA_REGIONS))) * 255
+        pd.DataFrame(fa, columns=RC.FA_REGIONS).assign(**{'time(sec)': np.arange(300)})[
+            ['time(sec)', *RC.FA_REGIONS]].to_csv(os.path.join(output_dir, f'output-v{i}_fa.csv'), index=False)
+    return os.path.dirname(input_dir), os.path.dirname(output_dir)
+
+
+# suite_cases 函数
+# 为给定规模生成全部输入，返回 [(名称, 待计时函数, 工作量, 工作量单位)]
+def suite_cases(tmp_dir, scale):
+    sizes = SUITE_SCALES[scale]
+    path = lambda name: os.path.join(tmp_dir, name)
+    cases = []
+
+    teg = make_teg_trace(path('trace.txt'), sizes['teg_points'])
+    cases.append(('process_teg', lambda: RC.process_teg(teg, path('output-trace_teg.csv')),
+                  sizes['teg_points'], 'rows'))
+
+    amplitudes = make_teg_matrix(sizes['teg_traces'])
+    cases.append(('teg_parameters', lambda: RC.compute_teg_parameters(amplitudes), sizes['teg_traces'], 'traces'))
+
+    aa = make_aa_workbook(path('aa.xlsx'), sizes['aa_points'], sizes['aa_channels'])
+    cases.append(('process_aa', lambda: RC.process_aa(aa, path('output-aa.xlsx')),
+                  sizes['aa_points'] * sizes['aa_channels'], 'values'))
+
+    curves = make_aa_matrix(sizes['teg_traces'], sizes['aa_points'])
+    cases.append(('aa_metrics', lambda: RC.compute_aa_metrics(curves), sizes['teg_traces'], 'channels'))
+
+    mr = make_plate_reader_file(path('mr.xlsx'), sizes['mr_plates'])
+    cases.append(('process_mr', lambda: RC.process_mr(mr, path('output-mr.xlsx')),
+                  sizes['mr_plates'], 'plates'))
+
+    readings = make_kinetic_readings(sizes['mr_reads'])
+    cases.append(('mr_kinetics', lambda: RC.compute_mr_kinetics(readings), sizes['mr_reads'], 'reads'))
+
+    image = make_transwell_image(path('transwell.jpg'), sizes['transwell_size'])
+    width, height = sizes['transwell_size']
+    cases.append(('process_transwell', lambda: RC.process_transwell(image, path('output-transwell.csv')),
+                  width * height / 1e6, 'Mpixels'))
+
+    video = make_synthetic_video(path('perfusion.mp4'), sizes['video_seconds'], 30)
+    cases.append(('process_fa', lambda: RC.process_fa(video, path('output-perfusion_fa.csv')),
+                  sizes['video_seconds'], 'video s'))
+
+    avi = make_synthetic_avi(path('movie.avi'), sizes['video_seconds'])
+    cases.append(('process_avi2mp4', lambda: RC.process_avi2mp4(avi, path('output-movie_a2m.mp4')),
+                  sizes['video_seconds'] * 30, 'frames'))
+
+    xvg_dir = path('xvg')
+    os.makedirs(xvg_dir)
+    make_xvg(os.path.join(xvg_dir, 'rmsd.xvg'), sizes['xvg_rows'])
+    cases.append(('xvg2csv', lambda: RC.xvg2csv(xvg_dir, path('xvg-out')), sizes['xvg_rows'], 'rows'))
+
+    count = sizes['visualize_files']
+    visualize_in, visualize_out = make_visualize_tree(tmp_dir, count)
+    cases.append(('visualize_teg_files', lambda: RC.visualize_teg_files(visualize_in, visualize_out),
+                  count, 'files'))
+    cases.append(('visualize_transwell_files',
+                  lambda: RC.visualize_transwell_files(visualize_in, visualize_out), count, 'files'))
+    cases.append(('summarize_transwell_files', lambda: RC.summarize_transwell_files(visualize_out),
+                  count, 'files'))
+    cases.append(('visualize_fa_files', lambda: RC.visualize_fa_files(visualize_in, visualize_out),
+                  count, 'files'))
+    return cases
+
+
+# peak_memory_mb 函数
+# 单独执行一次并用 tracemalloc 统计峰值内存（MB）；只包含 Python / NumPy / pandas 的分配，不含 OpenCV 内部缓冲
+def peak_memory_mb(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+# compare_with_baseline 函数
+# 耗时或峰值内存超过基线 (1 + threshold) 倍的用例视为回退，返回回退说明列表
+def compare_with_baseline(results, baseline, threshold):
+    regressions = []
+    for name, result in results.items():
+        reference = baseline['results'].get(name)
+        if reference is None:
+            continue
+        for key, label in (('latency', '耗时'), ('peak_mb', '峰值内存')):
+            if reference[key] > 0 and result[key] > reference[key] * (1 + threshold):
+                regressions.append(f"{name} {label} {result[key]:.3f}，基线 {reference[key]:.3f}"
+                                   f"（允许 +{threshold:.0%}）")
+    return regressions
+
+
+# bench_suite 函数
+# 用确定性的合成数据对每个处理器计时：延迟（repeat 次中最短耗时）、吞吐量和峰值内存
+# 可保存为基线 JSON，或与已有基线比较，有回退时返回 False
+def bench_suite(scale='small', repeat=3, only=None, save_baseline=None, baseline=None, threshold=0.2):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cases = suite_cases(tmp_dir, scale)
+        print(f"{'case':<28} {'latency':>10} {'throughput':>22} {'peak':>10}")
+        for name, func, units, unit_label in cases:
+            if only and name not in only:
+                continue
+            latency = time_call(func, repeat)
+            peak_mb = peak_memory_mb(func)
+            results[name] = {'latency': latency, 'throughput': units / latency, 'unit': f"{unit_label}/s",
+                             'peak_mb': peak_mb}
+            print(f"{name:<28} {latency:9.3f}s {units / latency:14.1f} {unit_label + '/s':<7} {peak_mb:8.1f}MB")
+
+    if save_baseline:
+        with open(save_baseline, 'w') as f:
+            json.dump({'scale': scale, 'results': results}, f, indent=2)
+        print(f"基线已保存: {save_baseline}")
+
+    if baseline:
+        with open(baseline) as f:
+            reference = json.load(f)
+        if reference.get('scale') != scale:
+            print(f"基线规模 {reference.get('scale')} 与本次 {scale} 不一致，跳过比较")
+            return True
+        regressions = compare_with_baseline(results, reference, threshold)
+        for message in regressions:
+            print(f"性能回退: {message}")
+        if regressions:
+            return False
+        print(f"与基线相比没有超过 {threshold:.0%} 的回退")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PlateletPro 性能基准")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    fa_parser = subparsers.add_parser('fa-backends', help="对比 FA 解码后端")
+    fa_parser.add_argument('--video', default=None, help="使用已有视频，默认生成合成视频")
+    fa_parser.add_argument('--seconds', type=float, default=60)
+    fa_parser.add_argument('--fps', type=float, default=30)
+    fa_parser.add_argument('--sample-rate', type=float, default=1.0)
+    fa_parser.add_argument('--repeat', type=int, default=3)
+
+    shards_parser = subparsers.add_parser('fa-shards', help="校验 FA 分片并行与顺序处理的结果一致")
+    shards_parser.add_argument('--video', default=None, help="使用已有视频，默认生成合成视频")
+    shards_parser.add_argument('--seconds', type=float, default=60)
+    shards_parser.add_argument('--fps', type=float, default=30)
+    shards_parser.add_argument('--workers', type=int, default=4)
+
+    cif_parser = subparsers.add_parser('cif', help="对比原生 mmCIF 转换与 obabel")
+    cif_parser.add_argument('--count', type=int, default=1000)
+    cif_parser.add_argument('--residues', type=int, default=300)
+
+    startup_parser = subparsers.add_parser('startup', help="测量 import RC 与主窗口就绪耗时")
+    startup_parser.add_argument('--repeat', type=int, default=5)
+    startup_parser.add_argument('--max-ms', type=float, default=None, help="导入耗时阈值，超过时以非零状态退出")
+
+    suite_parser = subparsers.add_parser('suite', help="对全部处理器运行合成数据基准套件")
+    suite_parser.add_argument('--scale', choices=sorted(SUITE_SCALES), default='small')
+    suite_parser.add_argument('--repeat', type=int, default=3)
+    suite_parser.add_argument('--only', default=None, help="逗号分隔的用例名，只运行这些用例")
+    suite_parser.add_argument('--save-baseline', default=None, help="把结果保存为基线 JSON")
+    suite_parser.add_argument('--baseline', default=None, help="与基线 JSON 比较，有回退时以非零状态退出")
+    suite_parser.add_argument('--threshold', type=float, default=0.2, help="允许的相对回退，默认 0.2 (20%%)")
+
+    args = parser.parse_args()
+    if args.command == 'fa-backends':
+        bench_fa_backends(args.video, args.seconds, args.fps, sample_rate=args.sample_rate, repeat=args.repeat)
+    elif args.command == 'fa-shards':
+        if not check_fa_shards(args.video, args.seconds, args.fps, args.workers):
+            sys.exit(1)
+    elif args.command == 'cif':
+        bench_cif(args.count, args.residues)
+    elif args.command == 'startup':
+        if not bench_startup(args.repeat, args.max_ms):
+            sys.exit(1)
+    elif args.command == 'suite':
+        only = set(args.only.split(',')) if args.only else None
+        if not bench_suite(args.scale, args.repeat, only, args.save_baseline, args.baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()